@@ -1,8 +1,8 @@
 # app_streamlit.py
+# pandas and plotly are imported inside the helpers that use them, so the page shell and the
+# API error message render before those imports are paid for.
 import os
 import requests
-import pandas as pd
-import plotly.express as px
 import streamlit as st
 from dotenv import load_dotenv
 
@@ -25,19 +25,50 @@ def get_json(path: str, params: dict | None = None):
     r.raise_for_status()
     return r.json()
 
+@st.cache_data(ttl=30)
+def get_all(path: str, params: dict | None = None):
+    """Every row of a paginated endpoint: follows X-Next-Cursor with the largest page size."""
+    rows, params = [], {**(params or {}), "limit": 1000}
+    while True:
+        r = requests.get(f"{API_BASE}{path}", params=params, timeout=20)
+        r.raise_for_status()
+        rows += r.json()
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            return rows
+        params["cursor"] = cursor
+
 def to_df(data):
+    import pandas as pd
+
     if not data:
         return pd.DataFrame()
     return pd.DataFrame(data)
 
+def label_chart(labels):
+    import plotly.express as px
+
+    fig = px.bar(labels, x="label", y="count", text="count", title="Sentiment counts")
+    fig.update_traces(textposition="outside")
+    return fig
+
+def rating_chart(series, bucket: str):
+    import pandas as pd
+    import plotly.express as px
+
+    series = series.assign(bucket=pd.to_datetime(series["bucket"], errors="coerce"))
+    return px.line(series, x="bucket", y="avg_rating", markers=True,
+                   hover_data=["reviews", "avg_polarity"], title=f"Average rating per {bucket}")
+
 # ===== Sidebar =====
 st.sidebar.title("Settings")
 st.sidebar.markdown(f"**API:** `{API_BASE}`")
+bucket = st.sidebar.radio("Timeline bucket", ["day", "week", "month"], index=1, horizontal=True)
+latest_n = st.sidebar.slider("Latest reviews", 10, 500, 100, step=10)
 
-# ===== Load products & metrics =====
+# ===== Load metrics (also feeds the product picker) =====
 try:
-    products = to_df(get_json("/products"))
-    metrics  = to_df(get_json("/metrics"))
+    metrics = to_df(get_all("/metrics"))
 except Exception as e:
     st.error(f"Failed to reach API at {API_BASE}. Is FastAPI running?\n\n{e}")
     st.stop()
@@ -60,44 +91,35 @@ else:
     st.dataframe(metrics[existing_cols], use_container_width=True)
 
 # ===== Product picker =====
-if products.empty:
+if metrics.empty:
     st.warning("No products found.")
     st.stop()
 
-product_map = dict(zip(products["title"], products["product_id"]))
-choice = st.selectbox("🔎 Choose a product", list(product_map.keys()))
-pid = product_map[choice]
+titles = dict(zip(metrics["product_id"], metrics["title"]))
+pid = st.selectbox("🔎 Choose a product", list(titles), format_func=lambda p: f"{titles[p]} (#{p})")
 
-# ===== Load reviews for selected product =====
-reviews = to_df(get_json(f"/products/{pid}/reviews", params={"limit": 1000}))
+# ===== Load the product dashboard (aggregated server-side in one query) =====
+dash = get_json(f"/products/{pid}/dashboard", params={"bucket": bucket, "latest": latest_n})
+labels = to_df(dash["labels"])
+series = to_df(dash["series"])
+reviews = to_df(dash["latest"])
 
 # ===== Charts row =====
 col1, col2 = st.columns(2)
 
 with col1:
     st.subheader("🙂 Sentiment distribution")
-    if "label" in reviews.columns and not reviews.empty:
-        counts = reviews["label"].value_counts().reset_index()
-        counts.columns = ["label", "count"]
-        fig = px.bar(counts, x="label", y="count", text="count", title="Sentiment counts")
-        fig.update_traces(textposition="outside")
-        st.plotly_chart(fig, use_container_width=True)
+    if not labels.empty:
+        st.plotly_chart(label_chart(labels), use_container_width=True)
     else:
         st.info("No sentiment labels yet. Run the VADER script to generate sentiment_results.")
 
 with col2:
     st.subheader("⭐ Ratings over time")
-    if {"review_date", "rating"}.issubset(reviews.columns) and not reviews.empty:
-        # ensure proper dtype
-        reviews["review_date"] = pd.to_datetime(reviews["review_date"], errors="coerce")
-        rtime = reviews.dropna(subset=["review_date"]).sort_values("review_date")
-        if not rtime.empty:
-            fig = px.line(rtime, x="review_date", y="rating", markers=True, title="Ratings timeline")
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.info("No valid review_date values to plot.")
+    if not series.empty:
+        st.plotly_chart(rating_chart(series, bucket), use_container_width=True)
     else:
-        st.info("Ratings/time columns missing to plot.")
+        st.info("No valid review_date values to plot.")
 
 # ===== Reviews table =====
 st.subheader("🧾 Latest Reviews")
@@ -108,4 +130,4 @@ else:
     st.info("No reviews for this product yet.")
 
 # ===== Footer =====
-st.caption("Backend endpoints: /products, /metrics, /metrics/{id}, /products/{id}/reviews")
+st.caption("Backend endpoints: /metrics, /products/{id}/dashboard")
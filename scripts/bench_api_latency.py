@@ -0,0 +1,82 @@
+# scripts/bench_api_latency.py
+"""Latency under concurrency for the read API.
+
+Starts N concurrent clients that hit the endpoints round-robin for a fixed duration and prints
+p50/p95/p99 latency and throughput per endpoint. Run it against a live server before and after
+a change, e.g.:
+
+    uvicorn src.app.main:app --workers 1 &
+    python -m scripts.bench_api_latency --clients 128 --seconds 30 --json before.json
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+DEFAULT_PATHS = ["/health", "/products", "/metrics", "/metrics/1", "/products/1/reviews"]
+
+
+async def client(http: httpx.AsyncClient, paths: list[str], offset: int, deadline: float, samples, errors):
+    i = offset
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            r = await http.get(path)
+            ok = r.status_code < 500
+        except httpx.HTTPError:
+            ok = False
+        if ok:
+            samples[path].append(time.perf_counter() - started)
+        else:
+            errors[path] += 1
+
+
+async def run(base_url: str, paths: list[str], clients: int, seconds: float) -> dict:
+    samples, errors = defaultdict(list), defaultdict(int)
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as http:
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*(client(http, paths, n, deadline, samples, errors) for n in range(clients)))
+
+    report = {"base_url": base_url, "clients": clients, "seconds": seconds, "endpoints": {}}
+    for path in paths:
+        lat = np.array(samples[path]) * 1000
+        report["endpoints"][path] = {
+            "requests": int(lat.size),
+            "errors": errors[path],
+            "rps": lat.size / seconds,
+            **({f"p{q}_ms": float(np.percentile(lat, q)) for q in (50, 95, 99)} if lat.size else {}),
+        }
+    return report
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Concurrent latency benchmark for the API")
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000")
+    ap.add_argument("--clients", type=int, default=100)
+    ap.add_argument("--seconds", type=float, default=20)
+    ap.add_argument("--path", action="append", dest="paths", help="endpoint to hit (repeatable)")
+    ap.add_argument("--json", dest="json_out", help="also write the report to this file")
+    args = ap.parse_args()
+
+    report = asyncio.run(run(args.base_url, args.paths or DEFAULT_PATHS, args.clients, args.seconds))
+    print(f"{args.clients} clients, {args.seconds:.0f}s against {args.base_url}")
+    for path, r in report["endpoints"].items():
+        if r["requests"]:
+            print(f"{path:<28} {r['rps']:8.1f} req/s  p50 {r['p50_ms']:7.1f} ms  "
+                  f"p95 {r['p95_ms']:7.1f} ms  p99 {r['p99_ms']:7.1f} ms  errors {r['errors']}")
+        else:
+            print(f"{path:<28} no successful requests ({r['errors']} errors)")
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
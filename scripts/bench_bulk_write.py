@@ -0,0 +1,103 @@
+# scripts/bench_bulk_write.py
+"""Compare rows/sec of DataFrame.to_sql against the COPY writer in src/db/bulk.py.
+
+Writes synthetic review-shaped rows into a scratch table (dropped afterwards):
+
+    python -m scripts.bench_bulk_write --rows 200000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from src.db.bulk import copy_rows, copy_upsert
+from src.db.engine import get_engine
+
+TABLE = "bench_bulk_write"
+
+
+def make_frame(n: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "review_id": np.arange(1, n + 1),
+            "product_id": rng.integers(1, 5_000, n),
+            "user_hash": np.char.mod("u_%06x", rng.integers(0, 1 << 24, n)),
+            "review_text": np.array(["Works well so far!", "Not worth the hype."])[rng.integers(0, 2, n)],
+            "rating": rng.integers(1, 6, n),
+            "review_date": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D"),
+        }
+    )
+
+
+def reset_table(engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        conn.execute(
+            text(
+                f"""
+                CREATE TABLE {TABLE} (
+                  review_id BIGINT PRIMARY KEY,
+                  product_id INT,
+                  user_hash TEXT,
+                  review_text TEXT,
+                  rating INT,
+                  review_date DATE
+                )
+                """
+            )
+        )
+
+
+def bench(engine, df: pd.DataFrame, name: str, write) -> dict:
+    reset_table(engine)
+    started = time.perf_counter()
+    write(df)
+    elapsed = time.perf_counter() - started
+    rate = len(df) / elapsed
+    print(f"{name:<22} {len(df):>10,} rows  {elapsed:8.2f}s  {rate:>12,.0f} rows/sec")
+    return {"method": name, "rows": len(df), "seconds": elapsed, "rows_per_sec": rate}
+
+
+def main(rows: int, skip_single: bool) -> None:
+    engine = get_engine()
+    df = make_frame(rows)
+
+    def to_sql_default(frame):
+        frame.to_sql(TABLE, engine, if_exists="append", index=False)
+
+    def to_sql_multi(frame):
+        with engine.begin() as conn:
+            frame.to_sql(TABLE, conn, if_exists="append", index=False, method="multi", chunksize=5000)
+
+    def copy(frame):
+        with engine.begin() as conn:
+            copy_rows(conn, TABLE, frame)
+
+    def copy_upsert_insert(frame):
+        with engine.begin() as conn:
+            copy_upsert(conn, TABLE, frame, ["review_id"], ["rating", "review_text"])
+
+    results = []
+    if not skip_single:
+        results.append(bench(engine, df, "to_sql (default)", to_sql_default))
+    results.append(bench(engine, df, "to_sql (multi)", to_sql_multi))
+    results.append(bench(engine, df, "COPY", copy))
+    results.append(bench(engine, df, "COPY + ON CONFLICT", copy_upsert_insert))
+
+    base = results[0]["rows_per_sec"]
+    for r in results[1:]:
+        print(f"{r['method']:<22} {r['rows_per_sec'] / base:6.1f}x vs {results[0]['method']}")
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark to_sql vs COPY bulk writes")
+    ap.add_argument("--rows", type=int, default=100_000, help="rows per method")
+    ap.add_argument("--skip-single", action="store_true", help="skip the slow row-at-a-time to_sql run")
+    args = ap.parse_args()
+    main(args.rows, args.skip_single)
@@ -0,0 +1,54 @@
+# scripts/export_parquet.py
+"""Append sentiment results scored since the last run to the Parquet snapshot (see src/db/snapshot.py).
+
+    python -m scripts.export_parquet                 # incremental, from _watermark.json
+    python -m scripts.export_parquet --full          # drop the snapshot and export everything
+"""
+import argparse
+import shutil
+import time
+
+from src.db.engine import get_engine
+from src.db.metrics import METRICS_MODEL
+from src.db.snapshot import CHUNK_SIZE, SNAPSHOT_ROOT, export_increment, read_watermark, snapshot_dir
+from src.telemetry.jobs import StageTimer
+
+
+def main(model: str = METRICS_MODEL, root: str = str(SNAPSHOT_ROOT), chunk_size: int = CHUNK_SIZE,
+         limit: int = 0, full: bool = False):
+    path = snapshot_dir(model, root)
+    if full and path.exists():
+        shutil.rmtree(path)
+    before = read_watermark(path)
+
+    timer = StageTimer("export_parquet")
+    started = time.perf_counter()
+    done = 0
+
+    def on_chunk(rows, files, fetch_s, write_s):
+        nonlocal done
+        done += rows
+        timer.add("fetch", fetch_s, rows)
+        timer.add("write", write_s, rows)
+        timer.batch(rows, {"fetch": fetch_s, "write": write_s}, files=files)
+        rate = done / max(time.perf_counter() - started, 1e-9)
+        print(f"Exported {done:,} rows ({rate:,.0f} rows/sec, {files:,} files in last chunk)")
+
+    mark = export_increment(get_engine(), model, root, chunk_size, limit, on_chunk)
+    if not done:
+        print(f"Snapshot already current at sentiment_id {before['sentiment_id']:,}.")
+        return
+    print(f"Done: {done:,} rows in {time.perf_counter() - started:.1f}s; "
+          f"{mark['rows']:,} rows up to sentiment_id {mark['sentiment_id']:,} in {path}")
+    timer.done(model=model, rows=done, watermark=mark["sentiment_id"])
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model", default=METRICS_MODEL, help="sentiment_results.model to export")
+    ap.add_argument("--root", default=str(SNAPSHOT_ROOT), help="snapshot root (one subdirectory per model)")
+    ap.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="sentiment rows per fetch")
+    ap.add_argument("--limit", type=int, default=0, help="max rows to export this run (0 = all new)")
+    ap.add_argument("--full", action="store_true", help="delete the snapshot and re-export from scratch")
+    args = ap.parse_args()
+    main(model=args.model, root=args.root, chunk_size=args.chunk_size, limit=args.limit, full=args.full)
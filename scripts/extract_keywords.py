@@ -0,0 +1,58 @@
+# scripts/extract_keywords.py
+"""Fill sentiment_results.keywords_json and product_keywords for reviews scored since the last run."""
+import argparse
+import time
+
+from src.db.engine import get_engine
+from src.db.metrics import METRICS_MODEL
+from src.nlp.keywords import TOP_K, claim_pending, ensure_keyword_tables, extract_batch
+from src.telemetry.jobs import StageTimer
+
+BATCH_SIZE = 5_000  # reviews vectorized together (one sparse matrix per batch)
+
+
+def main(limit: int = 0, batch_size: int = BATCH_SIZE, top_k: int = TOP_K, model: str = METRICS_MODEL):
+    engine = get_engine()
+    with engine.begin() as conn:
+        ensure_keyword_tables(conn)
+
+    timer = StageTimer("keywords")
+    started = time.perf_counter()
+    remaining = limit = int(limit or 0)
+    done = 0
+    while True:
+        n = min(batch_size, remaining) if limit else batch_size
+        if n <= 0:
+            break
+        # claim, DF update and writes commit together
+        mark = time.perf_counter()
+        with engine.begin() as conn:
+            batch = claim_pending(conn, model, n)
+            if batch.empty:
+                break
+            claimed = time.perf_counter()
+            extract_batch(conn, batch, top_k)
+        written = time.perf_counter()
+        timer.add("claim", claimed - mark, len(batch))
+        timer.add("extract_write", written - claimed, len(batch))
+        timer.batch(len(batch), {"claim": claimed - mark, "extract_write": written - claimed})
+        done += len(batch)
+        remaining -= len(batch)
+        rate = done / max(time.perf_counter() - started, 1e-9)
+        print(f"Extracted keywords for {done:,} reviews ({rate:,.0f} rows/sec)")
+
+    if not done:
+        print("No reviews waiting for keywords.")
+        return
+    print(f"Done: {done:,} reviews in {time.perf_counter() - started:.1f}s.")
+    timer.done(model=model, rows=done)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--limit", type=int, default=0, help="max reviews to process (0 = all pending)")
+    ap.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    ap.add_argument("--top-k", type=int, default=TOP_K, help="keywords kept per review")
+    ap.add_argument("--model", default=METRICS_MODEL, help="sentiment_results.model rows to fill")
+    args = ap.parse_args()
+    main(limit=args.limit, batch_size=args.batch_size, top_k=args.top_k, model=args.model)
@@ -0,0 +1,170 @@
+# scripts/generate_summaries.py
+"""Write LLM summaries per product and time window into ai_summaries.
+
+Windows whose prompt (aggregates + top terms) hashes the same as the stored summary are skipped,
+so re-runs only pay for windows whose data changed. A summarized window keeps its stored top
+terms, so keyword runs alone do not trigger re-summaries. Offline:
+
+    python -m scripts.llm_stub_server --port 8088 &
+    python -m scripts.generate_summaries --base-url http://127.0.0.1:8088/v1 --model stub
+"""
+import argparse
+import asyncio
+import time
+from datetime import date, datetime
+
+import pandas as pd
+from sqlalchemy import text
+
+from src.config.settings import LLM_BASE_URL, LLM_CONCURRENCY, LLM_MODEL, LLM_RATE_PER_S
+from src.db.bulk import copy_upsert
+from src.db.engine import get_engine
+from src.nlp.llm import ChatProvider, LLMError
+from src.nlp.summaries import (
+    build_context,
+    build_messages,
+    existing_summaries,
+    load_windows,
+    prompt_hash,
+    top_terms,
+    window_terms,
+)
+from src.telemetry.jobs import StageTimer
+
+PRODUCT_CHUNK = 500  # products planned per DB round trip
+WRITE_BATCH = 100  # summaries per upsert
+
+
+# --- Planning (sync, run in a thread) ---
+def product_ids(engine, granularity: str, only: list[int] | None) -> list[int]:
+    if only:
+        return only
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text("SELECT DISTINCT product_id FROM product_rollups WHERE granularity = :g ORDER BY product_id"),
+            {"g": granularity},
+        )
+        return [r[0] for r in rows]
+
+
+def plan_chunk(engine, pids: list[int], granularity: str, since, model: str) -> tuple[list[dict], int]:
+    """Windows in `pids` whose prompt changed since their stored summary, and how many were skipped."""
+    with engine.connect() as conn:
+        windows = load_windows(conn, granularity, since, pids)
+        terms = top_terms(conn, pids)
+        stored = existing_summaries(conn, model, pids)
+    todo, skipped = [], 0
+    for row in windows.to_dict("records"):
+        prev = stored.get((row["product_id"], row["time_window"]))
+        context = build_context(row, window_terms(prev, terms.get(row["product_id"], [])))
+        messages = build_messages(context)
+        h = prompt_hash(model, messages)
+        if prev and prev["prompt_hash"] == h:
+            skipped += 1
+            continue
+        todo.append({"product_id": row["product_id"], "time_window": row["time_window"],
+                     "context": context, "messages": messages, "prompt_hash": h})
+    return todo, skipped
+
+
+def write_summaries(engine, model: str, done: list[dict]) -> None:
+    df = pd.DataFrame(
+        {
+            "product_id": [d["product_id"] for d in done],
+            "time_window": [d["time_window"] for d in done],
+            "model": model,
+            "context_stats_json": [d["context"] for d in done],
+            "summary_text": [d["summary"] for d in done],
+            "prompt_hash": [d["prompt_hash"] for d in done],
+            "generated_at": datetime.utcnow(),
+        }
+    )
+    with engine.begin() as conn:
+        copy_upsert(conn, "ai_summaries", df, ["product_id", "time_window", "model"],
+                    ["context_stats_json", "summary_text", "prompt_hash", "generated_at"])
+
+
+# --- Async generation ---
+async def run(args) -> None:
+    engine = get_engine()
+    since = date.fromisoformat(args.since) if args.since else None
+    pids = await asyncio.to_thread(product_ids, engine, args.granularity, args.products)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=args.concurrency * 4)  # planning stays just ahead of the LLM
+    buffer: list[dict] = []
+    counts = {"planned": 0, "skipped": 0, "written": 0, "failed": 0}
+    timer = StageTimer("summaries")  # "llm" sums per-request latency, so it can exceed wall time
+    started = time.perf_counter()
+
+    async def flush() -> None:
+        if not buffer:
+            return
+        batch = buffer[:]
+        buffer.clear()
+        if not args.dry_run:
+            with timer.stage("write", len(batch)):
+                await asyncio.to_thread(write_summaries, engine, args.model, batch)
+        counts["written"] += len(batch)
+        rate = counts["written"] / max(time.perf_counter() - started, 1e-9)
+        verb = "Planned" if args.dry_run else "Wrote"
+        print(f"{verb} {counts['written']:,} summaries ({rate:,.1f}/sec, {counts['skipped']:,} unchanged skipped)")
+
+    async with ChatProvider(base_url=args.base_url, model=args.model, concurrency=args.concurrency,
+                            rate=args.rate) as llm:
+
+        async def produce() -> None:
+            for i in range(0, len(pids), PRODUCT_CHUNK):
+                with timer.stage("plan", min(PRODUCT_CHUNK, len(pids) - i)):
+                    todo, skipped = await asyncio.to_thread(
+                        plan_chunk, engine, pids[i : i + PRODUCT_CHUNK], args.granularity, since, args.model
+                    )
+                counts["skipped"] += skipped
+                if args.limit:
+                    todo = todo[: args.limit - counts["planned"]]
+                for item in todo:
+                    counts["planned"] += 1
+                    await queue.put(item)
+                if args.limit and counts["planned"] >= args.limit:
+                    break
+            for _ in range(args.concurrency):
+                await queue.put(None)
+
+        async def consume() -> None:
+            while (item := await queue.get()) is not None:
+                if args.dry_run:
+                    item["summary"] = ""
+                else:
+                    try:
+                        with timer.stage("llm", 1):
+                            item["summary"] = await llm.complete(item["messages"])
+                    except LLMError as exc:
+                        counts["failed"] += 1
+                        print(f"product {item['product_id']} {item['time_window']}: {exc}")
+                        continue
+                buffer.append(item)
+                if len(buffer) >= WRITE_BATCH:
+                    await flush()
+
+        await asyncio.gather(produce(), *(consume() for _ in range(args.concurrency)))
+        await flush()
+
+    elapsed = time.perf_counter() - started
+    print(f"Done in {elapsed:.1f}s: {counts['written']:,} written, {counts['skipped']:,} unchanged, "
+          f"{counts['failed']:,} failed; {llm.requests:,} requests ({llm.retries:,} retries), "
+          f"{llm.prompt_tokens:,} prompt / {llm.completion_tokens:,} completion tokens.")
+    timer.done(model=args.model, requests=llm.requests, retries=llm.retries, prompt_tokens=llm.prompt_tokens,
+               completion_tokens=llm.completion_tokens, **counts)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--granularity", choices=["week", "month"], default="month",
+                    help="time_window size (keys match product_rollups buckets)")
+    ap.add_argument("--since", help="only windows starting on/after this date (YYYY-MM-DD)")
+    ap.add_argument("--products", type=int, nargs="*", help="limit to these product ids")
+    ap.add_argument("--limit", type=int, default=0, help="max summaries to generate (0 = all changed)")
+    ap.add_argument("--model", default=LLM_MODEL)
+    ap.add_argument("--base-url", default=LLM_BASE_URL, help="OpenAI-compatible endpoint (e.g. the stub server)")
+    ap.add_argument("--concurrency", type=int, default=LLM_CONCURRENCY, help="requests in flight")
+    ap.add_argument("--rate", type=float, default=LLM_RATE_PER_S, help="max request starts per second (0 = unlimited)")
+    ap.add_argument("--dry-run", action="store_true", help="plan and count changed windows without calling the LLM")
+    asyncio.run(run(ap.parse_args()))
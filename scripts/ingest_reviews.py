@@ -1,17 +1,22 @@
 # scripts/ingest_reviews.py
 import argparse
-import os
 import random
 import secrets
-from datetime import datetime, timedelta, timezone
+import time
+from datetime import date, datetime, timedelta, timezone
 
 import numpy as np
 import pandas as pd
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
-load_dotenv()
-DB_URL = os.getenv("DATABASE_URL")
+from src.db.bulk import copy_rows
+from src.db.engine import get_engine
+from src.db.metrics import METRICS_MODEL, apply_review_deltas, ensure_aggregates
+from src.db.partitions import clear_partitions, ensure_partitions_for, is_partitioned
+from src.db.queue import ensure_scoring_queue
+from src.db.reviews import ensure_review_schema
+from src.db.version import bump_data_version
+from src.telemetry.jobs import StageTimer
 
 # ----- config -----
 DAYS_BACK = 120  # how far back to spread review_date timestamps
@@ -30,6 +35,8 @@ SENTENCES = [
     "I returned it after a week.",
 ]
 
+_HEX = np.array(list("0123456789abcdef"))
+
 
 def rand_user() -> str:
     # short pseudo-anon user id
@@ -42,28 +49,32 @@ def rand_date(within_days: int = DAYS_BACK) -> datetime.date:
     return today - timedelta(days=random.randint(0, within_days))
 
 
-def ensure_schema(conn) -> None:
-    """Make sure reviews has rating/review_date columns."""
-    conn.execute(
-        text(
-            """
-            ALTER TABLE reviews
-              ADD COLUMN IF NOT EXISTS rating integer,
-              ADD COLUMN IF NOT EXISTS review_date date;
-            """
-        )
-    )
-
-
 def reset_data(conn, reset: bool) -> None:
-    """Clear existing data using DELETE (no TRUNCATE privileges needed) and reset sequences."""
+    """Clear existing data and reset sequences.
+
+    Partitioned tables lose whole months (DROP TABLE per partition); otherwise rows are DELETEd
+    (no TRUNCATE privileges needed).
+    """
     if not reset:
         return
+    from src.nlp.keywords import reset_keywords  # deferred: pulls in sklearn / scipy, only needed here
 
     print("Clearing previous reviews (and dependent sentiment rows) ...")
-    # sentiment_results depends on reviews; delete children first
-    conn.execute(text("DELETE FROM sentiment_results;"))
-    conn.execute(text("DELETE FROM reviews;"))
+    if is_partitioned(conn):
+        print(f"Dropped {len(clear_partitions(conn)):,} monthly partitions.")
+    else:
+        # sentiment_results depends on reviews; delete children first
+        conn.execute(text("DELETE FROM sentiment_results;"))
+        conn.execute(text("DELETE FROM reviews;"))
+    conn.execute(text("DELETE FROM product_stats;"))
+    conn.execute(text("DELETE FROM product_rollups;"))
+    conn.execute(text("DELETE FROM scoring_queue;"))
+    reset_keywords(conn)
+    if conn.execute(text("SELECT to_regclass('ingest_checkpoints') IS NOT NULL")).scalar():
+        conn.execute(text("DELETE FROM ingest_checkpoints;"))  # file loads start over too
+    if conn.execute(text("SELECT to_regclass('product_drift_state') IS NOT NULL")).scalar():
+        conn.execute(text("DELETE FROM product_drift_state;"))
+        conn.execute(text("DELETE FROM sentiment_alerts;"))
 
     # Reset sequences (works if sequence names follow the usual pattern).
     # We try to discover names dynamically; fall back to common defaults.
@@ -116,47 +127,138 @@ def build_rows(product_ids: list[int], min_reviews: int, max_reviews: int) -> pd
     return pd.DataFrame(out)
 
 
+def vector_users(rng: np.random.Generator, n: int) -> np.ndarray:
+    """Vectorized rand_user(): 'u_' + 6 hex digits, built as a char matrix and viewed as strings."""
+    x = rng.integers(0, 1 << 24, n)
+    chars = np.empty((n, 8), dtype="<U1")
+    chars[:, 0], chars[:, 1] = "u", "_"
+    chars[:, 2:] = _HEX[(x[:, None] >> np.arange(20, -1, -4)) & 0xF]
+    return chars.view("<U8").ravel()
+
+
+def generate_batches(product_ids: list[int], total: int, batch_size: int, skew: float,
+                     start: date, end: date, seed: int):
+    """Yield `total` synthetic reviews as DataFrames of `batch_size` rows.
+
+    Everything comes from one seeded NumPy Generator, so the same arguments always produce the
+    same rows. Product popularity follows a Zipf-like 1/rank**skew curve (0 = uniform).
+    """
+    rng = np.random.default_rng(seed)
+    pids = rng.permutation(np.asarray(product_ids))  # popularity rank independent of product_id
+    weights = 1.0 / np.arange(1, len(pids) + 1) ** skew
+    weights /= weights.sum()
+    texts = np.array(SENTENCES, dtype=object)
+    first_day = np.datetime64(start, "D")
+    span = (end - start).days + 1
+
+    for offset in range(0, total, batch_size):
+        n = min(batch_size, total - offset)
+        yield pd.DataFrame(
+            {
+                "product_id": rng.choice(pids, size=n, p=weights),
+                "user_hash": vector_users(rng, n),
+                "review_text": texts[rng.integers(0, len(texts), n)],
+                # same positive skew as build_rows(): N(4, 1) clipped to 1–5
+                "rating": np.clip(np.rint(rng.normal(4.0, 1.0, n)), 1, 5).astype(np.int16),
+                "review_date": first_day + rng.integers(0, span, n),
+            }
+        )
+
+
+def write_stream(batches, engine) -> int:
+    """COPY each generated batch as it arrives; only one batch is ever held in memory."""
+    total = 0
+    timer = StageTimer("seed_reviews")
+    started = mark = time.perf_counter()
+    for chunk in batches:
+        generated = time.perf_counter()
+        with engine.begin() as conn:
+            ensure_partitions_for(conn, chunk["review_date"])
+            total += copy_rows(conn, "reviews", chunk)
+            apply_review_deltas(conn, chunk)
+        written = time.perf_counter()
+        timer.add("generate", generated - mark, len(chunk))
+        timer.add("write", written - generated, len(chunk))
+        timer.batch(len(chunk), {"generate": generated - mark, "write": written - generated})
+        rate = total / max(written - started, 1e-9)
+        print(f"Inserted {total:,} reviews ({rate:,.0f} rows/sec)")
+        mark = time.perf_counter()
+    timer.done(rows=total)
+    return total
+
+
 def write_in_batches(df: pd.DataFrame, engine) -> int:
     if df.empty:
         return 0
     total = 0
-    # Use engine directly (not raw DBAPI connection) so pandas uses SQLAlchemy dialect (no sqlite_master check)
+    # COPY each batch in its own transaction so a failure only loses the current batch
     for start in range(0, len(df), BATCH_SIZE):
         chunk = df.iloc[start : start + BATCH_SIZE]
-        chunk.to_sql("reviews", engine, if_exists="append", index=False)
-        total += len(chunk)
+        with engine.begin() as conn:
+            ensure_partitions_for(conn, chunk["review_date"])
+            total += copy_rows(conn, "reviews", chunk)
+            apply_review_deltas(conn, chunk)
     return total
 
 
 def main():
     parser = argparse.ArgumentParser(description="Seed synthetic reviews")
-    parser.add_argument("--products", type=int, default=200, help="How many products to seed")
+    parser.add_argument("--products", type=int, default=200, help="How many products to seed (0 = all)")
     parser.add_argument("--min", dest="min_reviews", type=int, default=5, help="Min reviews per product")
     parser.add_argument("--max", dest="max_reviews", type=int, default=12, help="Max reviews per product")
     parser.add_argument("--reset", action="store_true", help="Delete existing reviews first")
+    # vectorized generator mode (load testing)
+    parser.add_argument("--total", type=int, default=0,
+                        help="Generate exactly N reviews in streamed batches (0 = per-product mode above)")
+    parser.add_argument("--skew", type=float, default=1.0,
+                        help="Product popularity skew for --total (1/rank**skew, 0 = uniform)")
+    parser.add_argument("--start", type=date.fromisoformat, default=None,
+                        help="First review_date for --total (YYYY-MM-DD, default: today - DAYS_BACK)")
+    parser.add_argument("--end", type=date.fromisoformat, default=None,
+                        help="Last review_date for --total (YYYY-MM-DD, default: today)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for --total")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows per generated/written batch")
     args = parser.parse_args()
 
     if args.min_reviews > args.max_reviews:
         args.min_reviews, args.max_reviews = args.max_reviews, args.min_reviews
+    end = args.end or datetime.now(timezone.utc).date()
+    start = args.start or end - timedelta(days=DAYS_BACK)
+    if start > end:
+        raise SystemExit("--start must be on or before --end")
 
-    engine = create_engine(DB_URL, pool_pre_ping=True)
+    engine = get_engine()
 
     with engine.begin() as conn:
-        ensure_schema(conn)
+        ensure_review_schema(conn)
+        ensure_aggregates(conn)
+        ensure_scoring_queue(conn, METRICS_MODEL)  # new reviews are queued for scoring by trigger
         reset_data(conn, args.reset)
-        pids = pick_products(conn, args.products)
+        pids = pick_products(conn, args.products or None)
         if not pids:
             raise SystemExit("No products found. Did you load products first?")
 
+    if args.total:
+        print(f"Generating {args.total:,} synthetic reviews across {len(pids)} products "
+              f"({start} to {end}, skew={args.skew}, seed={args.seed}) ...")
+        batches = generate_batches(pids, args.total, args.batch_size, args.skew, start, end, args.seed)
+        inserted = write_stream(batches, engine)
+        with engine.begin() as conn:
+            bump_data_version(conn)
+        print(f"Done. Inserted {inserted:,} reviews.")
+        return
+
     print(f"Seeding synthetic reviews for {len(pids)} products "
           f"({args.min_reviews}–{args.max_reviews} per product) ...")
 
     df = build_rows(pids, args.min_reviews, args.max_reviews)
     inserted = write_in_batches(df, engine)
+    with engine.begin() as conn:
+        bump_data_version(conn)  # invalidates API response caches
 
     print(f"Done. Inserted {inserted} reviews.")
     print("Tip: now run the sentiment job:")
-    print("  python scripts/sentiment_vader.py --limit 0   # 0 = process all")
+    print("  python -m scripts.sentiment_vader --limit 0   # 0 = process all")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,75 @@
+# scripts/llm_stub_server.py
+"""Offline stand-in for an OpenAI-compatible /v1/chat/completions endpoint.
+
+Replies are built from the JSON context in the prompt, after a configurable delay, and a share of
+requests fail with 429/503 so the summary job's retries and rate limiting can be exercised:
+
+    python -m scripts.llm_stub_server --port 8088 --latency-ms 300 --fail-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="LLM stub")
+app.state.latency_s = 0.2
+app.state.fail_rate = 0.0
+
+
+def fake_summary(prompt: str) -> str:
+    try:
+        ctx = json.loads(prompt)
+    except ValueError:
+        return "Stub summary."
+    polarity = ctx.get("avg_polarity") or 0.0
+    tone = "positive" if polarity >= 0.05 else "negative" if polarity <= -0.05 else "mixed"
+    text = f"{ctx.get('product')}: {ctx.get('reviews')} reviews in {ctx.get('window')}, mostly {tone} (avg polarity {polarity:+.2f})."
+    prev = ctx.get("previous") or {}
+    if prev.get("avg_polarity") is not None:
+        text += f" Sentiment {'improved' if polarity > prev['avg_polarity'] else 'softened'} versus the previous period."
+    if ctx.get("top_terms"):
+        text += f" Frequent themes: {', '.join(ctx['top_terms'][:3])}."
+    return text
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: dict):
+    await asyncio.sleep(app.state.latency_s)
+    if random.random() < app.state.fail_rate:
+        status = random.choice([429, 503])
+        return JSONResponse({"error": {"message": "stub overload"}}, status_code=status, headers={"Retry-After": "1"})
+
+    messages = body.get("messages") or [{}]
+    prompt = messages[-1].get("content", "")
+    content = fake_summary(prompt)
+    prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+    completion_tokens = len(content.split())
+    return {
+        "id": f"stub-{time.time_ns()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8088)
+    ap.add_argument("--latency-ms", type=float, default=200)
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="share of requests answered with 429/503")
+    args = ap.parse_args()
+    app.state.latency_s = args.latency_ms / 1000
+    app.state.fail_rate = args.fail_rate
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
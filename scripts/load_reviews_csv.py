@@ -0,0 +1,199 @@
+# scripts/load_reviews_csv.py
+"""Stream a reviews CSV of any size into `reviews`, resumably.
+
+The file is memory-mapped and cut into ~CHUNK_BYTES pieces at line ends outside quoted fields,
+so each piece parses on its own and memory stays flat. Product titles map to product_id through
+one in-memory dict. Each review gets a dedupe_key, md5(user_hash, product_id, review_text), and
+keys already in the table are skipped. Each batch commits together with its byte-offset
+checkpoint in ingest_checkpoints. Re-running after an interruption continues from the last
+committed batch:
+
+    python -m scripts.load_reviews_csv data/raw/Reviews.csv
+    python -m scripts.load_reviews_csv data/raw/Reviews.csv --restart   # ignore the checkpoint
+
+Expected columns (as in data/raw/reviews_sample.csv): product_title, review_text and optionally
+user_hash, rating, review_date, source, lang.
+"""
+import argparse
+import hashlib
+import io
+import mmap
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import text
+
+from src.db.bulk import copy_rows
+from src.db.checkpoints import clear_checkpoint, ensure_checkpoints, load_checkpoint, save_checkpoint
+from src.db.engine import get_engine
+from src.db.metrics import METRICS_MODEL, apply_review_deltas, ensure_aggregates
+from src.db.partitions import ensure_partitions_for
+from src.db.queue import ensure_scoring_queue
+from src.db.reviews import ensure_review_schema
+from src.db.version import bump_data_version
+from src.telemetry.jobs import StageTimer
+
+CHUNK_BYTES = 32 << 20  # ~32 MiB of CSV per batch
+REQUIRED = ["product_title", "review_text"]
+OPTIONAL = ["user_hash", "rating", "review_date", "source", "lang"]
+
+
+def ensure_dedupe_key(conn) -> None:
+    conn.execute(text("ALTER TABLE reviews ADD COLUMN IF NOT EXISTS dedupe_key TEXT"))
+    # NULL for seeded / older rows; unique among loaded ones. A unique index on the partitioned
+    # reviews must include review_date; drop_existing() matches on the key alone.
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_reviews_dedupe_key ON reviews (dedupe_key, review_date)"
+    ))
+
+
+# --- Chunking ---
+def read_header(mm) -> tuple[list[str], int]:
+    """Column names and the byte offset where data starts."""
+    end = mm.find(b"\n")
+    end = len(mm) if end == -1 else end + 1
+    names = pd.read_csv(io.BytesIO(mm[:end]), nrows=0).columns
+    return [c.strip() for c in names], end
+
+
+def iter_chunks(mm, start: int, chunk_bytes: int = CHUNK_BYTES):
+    """Yield (bytes, end_offset) pieces that end on a record boundary.
+
+    A newline ends a record only if the piece so far holds an even number of '"' bytes
+    (escaped quotes come in pairs, so the parity is exact).
+    """
+    size = len(mm)
+    while start < size:
+        end = min(start + chunk_bytes, size)
+        quotes = mm[start:end].count(b'"')
+        while end < size and (mm[end - 1] != ord("\n") or quotes % 2):
+            nl = mm.find(b"\n", end)
+            nxt = size if nl == -1 else nl + 1
+            quotes += mm[end:nxt].count(b'"')
+            end = nxt
+        yield mm[start:end], end
+        start = end
+
+
+# --- Rows ---
+def load_titles(conn) -> dict[str, int]:
+    rows = conn.execute(text("SELECT title, MIN(product_id) FROM products GROUP BY title")).all()
+    return {title: pid for title, pid in rows}
+
+
+def dedupe_key(user, pid, review_text) -> str:
+    user = user if isinstance(user, str) else ""  # missing user_hash -> NaN
+    return hashlib.md5(f"{user}\x1f{pid}\x1f{review_text}".encode("utf-8")).hexdigest()
+
+
+def prepare(raw: bytes, names: list[str], titles: dict[str, int]) -> tuple[pd.DataFrame, int, int]:
+    """Parse one piece into reviews rows; returns (rows, CSV records read, records whose title
+    matched no product)."""
+    df = pd.read_csv(io.BytesIO(raw), header=None, names=names, dtype=str)
+    out = pd.DataFrame({"product_id": df["product_title"].str.strip().map(titles)})
+    unmatched = int(out["product_id"].isna().sum())
+    out["review_text"] = df["review_text"]
+    for col in OPTIONAL:
+        if col in df.columns:
+            out[col] = df[col]
+    # always present, as NA when the file lacks them: the aggregate deltas and partitioning read both
+    rating = pd.to_numeric(df["rating"], errors="coerce") if "rating" in df else pd.Series(float("nan"), df.index)
+    out["rating"] = rating.where(rating.between(1, 5)).round().astype("Int64")  # CHECK (1..5)
+    dates = df["review_date"] if "review_date" in df else pd.Series(None, df.index, dtype=object)
+    out["review_date"] = pd.to_datetime(dates, errors="coerce").dt.date
+
+    out = out[out["product_id"].notna() & out["review_text"].notna()].copy()
+    out["product_id"] = out["product_id"].astype("int64")
+    users = out["user_hash"] if "user_hash" in out else [None] * len(out)
+    out["dedupe_key"] = [dedupe_key(u, p, t) for u, p, t in zip(users, out["product_id"], out["review_text"])]
+    return out.drop_duplicates("dedupe_key"), len(df), unmatched
+
+
+def drop_existing(conn, df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty:
+        return df
+    seen = conn.execute(
+        text("SELECT dedupe_key FROM reviews WHERE dedupe_key = ANY(:k)"), {"k": df["dedupe_key"].tolist()}
+    ).scalars().all()
+    return df[~df["dedupe_key"].isin(set(seen))]
+
+
+def main(path: str, chunk_bytes: int = CHUNK_BYTES, restart: bool = False, limit_chunks: int = 0):
+    source = str(Path(path).resolve())
+    size = os.path.getsize(source)
+    if not size:
+        raise SystemExit(f"{source} is empty.")
+    engine = get_engine()
+    with engine.begin() as conn:
+        ensure_review_schema(conn)
+        ensure_dedupe_key(conn)
+        ensure_aggregates(conn)
+        ensure_scoring_queue(conn, METRICS_MODEL)  # new reviews are queued for scoring by trigger
+        ensure_checkpoints(conn)
+        if restart:
+            clear_checkpoint(conn, source)
+        mark = load_checkpoint(conn, source)
+        titles = load_titles(conn)
+    if mark["byte_offset"] > size:
+        raise SystemExit(f"Checkpoint is at byte {mark['byte_offset']:,} but {source} has {size:,} bytes; "
+                         "the file changed, re-run with --restart.")
+    if not titles:
+        raise SystemExit("No products found. Did you load products first?")
+
+    timer = StageTimer("load_reviews")
+    started = time.perf_counter()
+    read_rows, inserted = mark["rows_read"], mark["rows_inserted"]
+    end = mark["byte_offset"]
+    with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        names, data_start = read_header(mm)
+        missing = [c for c in REQUIRED if c not in names]
+        if missing:
+            raise SystemExit(f"{source} lacks required column(s): {', '.join(missing)}")
+        offset = max(mark["byte_offset"], data_start)
+        if offset > data_start:
+            print(f"Resuming at byte {offset:,} of {size:,} ({read_rows:,} rows read, {inserted:,} inserted).")
+
+        t0 = time.perf_counter()
+        for n, (raw, end) in enumerate(iter_chunks(mm, offset, chunk_bytes), 1):
+            rows, records, unmatched = prepare(raw, names, titles)
+            parsed = time.perf_counter()
+            with engine.begin() as conn:  # rows + checkpoint commit together
+                new = drop_existing(conn, rows)
+                if "review_date" in new:
+                    ensure_partitions_for(conn, new["review_date"])
+                copy_rows(conn, "reviews", new)
+                apply_review_deltas(conn, new)
+                read_rows += records
+                inserted += len(new)
+                save_checkpoint(conn, source, end, read_rows, inserted, size)
+            written = time.perf_counter()
+
+            stages = {"parse": parsed - t0, "write": written - parsed}
+            for stage, seconds in stages.items():
+                timer.add(stage, seconds, records)
+            skipped = records - unmatched - len(new)  # duplicates (in file or table) and empty texts
+            timer.batch(records, stages, inserted=len(new), skipped=skipped, unmatched=unmatched, offset=end)
+            rate = (end - offset) / max(written - started, 1e-9) / (1 << 20)
+            print(f"{end / size:6.1%}  {inserted:,} inserted; this batch skipped {skipped:,} duplicates/empty "
+                  f"and {unmatched:,} unknown titles ({rate:,.1f} MiB/s)")
+            t0 = time.perf_counter()
+            if limit_chunks and n >= limit_chunks:
+                break
+
+    if inserted > mark["rows_inserted"]:
+        with engine.begin() as conn:
+            bump_data_version(conn)  # invalidates API response caches
+    timer.done(rows=read_rows, inserted=inserted, offset=end, size=size)
+    print(f"Done: {inserted:,} reviews inserted from {read_rows:,} rows read in {time.perf_counter() - started:.1f}s.")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("path", help="reviews CSV (see module docstring for columns)")
+    ap.add_argument("--chunk-mb", type=int, default=CHUNK_BYTES >> 20, help="MiB of CSV per batch")
+    ap.add_argument("--restart", action="store_true", help="ignore the saved checkpoint and start from the top")
+    ap.add_argument("--limit-chunks", type=int, default=0, help="stop after N batches (0 = whole file)")
+    args = ap.parse_args()
+    main(args.path, args.chunk_mb << 20, args.restart, args.limit_chunks)
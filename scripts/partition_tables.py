@@ -0,0 +1,76 @@
+# scripts/partition_tables.py
+"""Monthly partitions of reviews / sentiment_results: migration, premade months and retention.
+
+    python -m scripts.partition_tables --migrate               # one-off, rewrites both tables in place
+    python -m scripts.partition_tables --ahead 6               # create partitions up to 6 months ahead
+    python -m scripts.partition_tables --drop-before 2024-01-01 [--detach]
+
+See src/db/partitions.py for the layout. The migration locks both tables for its duration;
+stop the loaders, the scoring job and the API first.
+"""
+import argparse
+import time
+from datetime import date
+
+from sqlalchemy import text
+
+from src.db.engine import get_engine
+from src.db.metrics import ensure_aggregates
+from src.db.partitions import (
+    MONTHS_AHEAD,
+    drop_months_before,
+    ensure_month_partitions,
+    is_partitioned,
+    list_months,
+    migrate_to_partitions,
+    upcoming_months,
+)
+from src.db.version import bump_data_version
+
+
+def main(migrate: bool = False, ahead: int = 0, drop_before: date | None = None, detach: bool = False):
+    engine = get_engine()
+    with engine.begin() as conn:
+        ensure_aggregates(conn)  # retention subtracts from them
+
+    if migrate:
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            counts = migrate_to_partitions(conn, ahead or MONTHS_AHEAD)
+        if counts is None:
+            print("reviews is already partitioned.")
+        else:
+            print(f"Migrated {counts['reviews']:,} reviews and {counts['sentiment_results']:,} sentiment rows "
+                  f"into {counts['months']:,} monthly partitions in {time.perf_counter() - started:.1f}s.")
+
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            raise SystemExit("reviews is not partitioned yet; run with --migrate first.")
+        if ahead:
+            created = ensure_month_partitions(conn, upcoming_months(ahead))
+            names = ", ".join(f"{m:%Y-%m}" for m in created) or "none missing"
+            print(f"Created {len(created):,} monthly partitions ({names}).")
+        if drop_before:
+            removed = drop_months_before(conn, drop_before, detach)
+            verb = "Detached" if detach else "Dropped"
+            print(f"{verb} {len(removed):,} months before {drop_before:%Y-%m}: "
+                  f"{', '.join(f'{m:%Y-%m}' for m in removed) or 'none'}.")
+            if removed:
+                bump_data_version(conn)  # invalidates API response caches
+        months = list_months(conn)
+        undated = conn.execute(text("SELECT COUNT(*) FROM reviews_default")).scalar()
+    span = f"{months[0]:%Y-%m} .. {months[-1]:%Y-%m}" if months else "none"
+    print(f"Monthly partitions: {len(months):,} ({span}); {undated:,} reviews in reviews_default.")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--migrate", action="store_true", help="convert the unpartitioned tables in place")
+    ap.add_argument("--ahead", type=int, default=0,
+                    help=f"create partitions up to N months ahead (--migrate default: {MONTHS_AHEAD})")
+    ap.add_argument("--drop-before", type=date.fromisoformat, default=None,
+                    help="drop months older than this date's month (YYYY-MM-DD)")
+    ap.add_argument("--detach", action="store_true",
+                    help="with --drop-before: detach the months as standalone tables instead of dropping them")
+    args = ap.parse_args()
+    main(migrate=args.migrate, ahead=args.ahead, drop_before=args.drop_before, detach=args.detach)
@@ -0,0 +1,24 @@
+# scripts/rebuild_metrics.py
+"""Recompute product_stats, product_rollups and the drift state from reviews + sentiment_results (repairs)."""
+from src.db.drift import ensure_drift_tables, rebuild_drift
+from src.db.engine import get_engine
+from src.db.metrics import ensure_aggregates, rebuild_aggregates
+from src.db.version import bump_data_version
+
+
+def main():
+    engine = get_engine()
+    with engine.begin() as conn:
+        ensure_aggregates(conn)
+        products, buckets = rebuild_aggregates(conn)
+        bump_data_version(conn)
+    print(f"Rebuilt product_stats for {products:,} products and {buckets:,} product_rollups rows.")
+    with engine.begin() as conn:
+        ensure_drift_tables(conn)
+        tracked = rebuild_drift(conn)
+        bump_data_version(conn)
+    print(f"Rebuilt product_drift_state for {tracked:,} products.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+# scripts/scoring_worker.py
+"""Continuous scoring: wake on NOTIFY from the scoring-queue trigger and score in micro-batches.
+
+    python -m scripts.scoring_worker                              # VADER, up to 500 rows or 0.5 s
+    python -m scripts.scoring_worker --max-batch 200 --max-wait 0.2
+
+Each notification carries the number of rows one INSERT statement queued (src/db/queue.py).
+The first one after an idle period opens a batch window. The worker claims as soon as
+`--max-batch` rows were announced or `--max-wait` seconds passed, whichever comes first. It
+then drains the queue in claims of `--max-batch` before it waits again. After `--poll` quiet
+seconds it claims anyway. That picks up work whose notification was missed while reconnecting,
+and claims of a crashed worker once their `--lease` expires.
+
+Batches go through the same cache lookup, scoring and write as scripts/sentiment_vader.py.
+Results, cache entries and aggregate deltas commit together with the queue deletion.
+
+Each review's insert-to-scored latency is its queue wait plus claim-to-commit time. It goes into
+every batch log line and the worker's `worker_heartbeats` row, which `/health` lists.
+SIGTERM / SIGINT let the batch in hand finish, then the worker marks itself stopped and exits.
+Errors (database down, lost connection) back off exponentially with jitter, up to
+`--max-backoff` seconds, and the worker then reconnects.
+"""
+import argparse
+import os
+import random
+import select
+import signal
+import socket
+import time
+from collections import deque
+
+import numpy as np
+
+from scripts.sentiment_vader import (
+    add_scorer_args,
+    iter_batches,
+    plan_batch,
+    resolve_scores,
+    score_timed,
+    scorer_opts,
+    to_results,
+    write_results,
+)
+from src.db.engine import get_engine
+from src.db.drift import ensure_drift_tables
+from src.db.metrics import ensure_aggregates
+from src.db.partitions import ensure_sentiment_dates
+from src.db.queue import NOTIFY_CHANNEL, ensure_scoring_queue, queue_depth
+from src.db.version import bump_data_version
+from src.db.workers import beat, ensure_worker_heartbeats, register_worker
+from src.nlp.score_cache import LRU_SIZE, ScoreCache, ensure_cache_table
+from src.nlp.scoring import init_worker
+from src.telemetry.jobs import StageTimer, log_json
+
+MAX_BATCH = 500  # reviews per claim
+MAX_WAIT_S = 0.5  # longest a notified review waits for its batch to fill
+POLL_S = 30.0  # claim anyway after this long without notifications
+HEARTBEAT_S = 5.0
+LEASE_S = 60  # shorter than the batch job's: a crashed worker's claims come back within a minute
+MAX_BACKOFF_S = 60.0
+LATENCY_WINDOW = 5_000  # most recent reviews summarized in the heartbeat
+
+
+class Listener:
+    """A dedicated autocommit connection LISTENing on NOTIFY_CHANNEL."""
+
+    def __init__(self, engine):
+        self.raw = engine.raw_connection()
+        self.raw.detach()  # owned by the worker, never handed back to the pool
+        self.pg = self.raw.driver_connection
+        self.pg.autocommit = True
+        with self.pg.cursor() as cur:
+            cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+
+    def fileno(self) -> int:
+        return self.pg.fileno()
+
+    def drain(self) -> int:
+        """Consume pending notifications; returns the rows they announce."""
+        self.pg.poll()
+        rows = 0
+        while self.pg.notifies:
+            payload = self.pg.notifies.pop(0).payload
+            rows += int(payload) if payload.isdigit() else 1
+        return rows
+
+    def close(self) -> None:
+        try:
+            self.raw.close()
+        except Exception:
+            pass  # already broken
+
+
+class ScoringWorker:
+    def __init__(self, backend: str = "vader", scorer_opts: dict | None = None, max_batch: int = MAX_BATCH,
+                 max_wait: float = MAX_WAIT_S, poll: float = POLL_S, heartbeat: float = HEARTBEAT_S,
+                 lease: int = LEASE_S, cache_size: int = LRU_SIZE, max_backoff: float = MAX_BACKOFF_S):
+        self.model = init_worker(backend, scorer_opts).model  # scoring runs in this process
+        self.cache = ScoreCache(self.model, maxsize=cache_size)
+        self.max_batch, self.max_wait, self.poll = max_batch, max_wait, poll
+        self.heartbeat_s, self.lease, self.max_backoff = heartbeat, lease, max_backoff
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.timer = StageTimer("scoring_worker")
+        self.latencies = deque(maxlen=LATENCY_WINDOW)  # seconds, insert to commit
+        self.status = "idle"
+        self.scored = self.batches = 0
+        self.last_error = None
+        self.stopping = False
+        self._last_beat = self._last_bump = float("-inf")
+        # signal handlers write to this pipe so a blocking select() returns at once
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_w, False)
+
+    # --- Signals / waiting ---
+    def stop(self, signum=None, frame=None) -> None:
+        self.stopping = True
+        try:
+            os.write(self._wake_w, b"x")
+        except BlockingIOError:
+            pass  # a wake-up is already pending
+
+    def wait(self, listener: Listener | None, timeout: float) -> bool:
+        """Block until a notification, a stop signal or `timeout`; True if notifications arrived."""
+        watched = [self._wake_r] + ([listener] if listener else [])
+        ready, _, _ = select.select(watched, [], [], max(timeout, 0))
+        if self._wake_r in ready:
+            os.read(self._wake_r, 1024)
+        return listener in ready if listener else False
+
+    # --- Heartbeat ---
+    def heartbeat(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_beat < self.heartbeat_s:
+            return
+        self._last_beat = now
+        lat = np.asarray(self.latencies) * 1000
+        stats = {}
+        if len(lat):
+            p50, p95 = np.percentile(lat, [50, 95])
+            stats = {"latency_p50_ms": float(p50), "latency_p95_ms": float(p95), "latency_max_ms": float(lat.max())}
+        with get_engine().begin() as conn:
+            beat(conn, self.worker_id, status=self.status, scored=self.scored, batches=self.batches,
+                 queue_depth=queue_depth(conn, self.model), last_error=self.last_error, **stats)
+
+    # --- Batches ---
+    def wait_for_batch(self, listener: Listener) -> None:
+        """Return once a batch window closes (size or deadline), after `poll` quiet seconds, or on stop."""
+        self.status = "idle"
+        announced, deadline = 0, None
+        quiet_until = time.monotonic() + self.poll
+        while not self.stopping:
+            now = time.monotonic()
+            if deadline is not None and (announced >= self.max_batch or now >= deadline):
+                return
+            if deadline is None and now >= quiet_until:
+                return
+            self.heartbeat()
+            until = min(deadline if deadline is not None else quiet_until, self._last_beat + self.heartbeat_s)
+            if self.wait(listener, until - now):
+                n = listener.drain()
+                if n and deadline is None:
+                    deadline = time.monotonic() + self.max_wait
+                announced += n
+
+    def score_batch(self, df, claim_s: float) -> int:
+        """Score one claimed batch and commit it; returns rows written."""
+        claimed = time.perf_counter() - claim_s
+        df, cached, todo, waiting, timings = plan_batch(df, self.cache, claim_s)
+        scores, tokens, timings["score"] = score_timed(list(todo.values()))
+        started = time.perf_counter()
+        fresh, per_review = resolve_scores(df, self.cache, cached, todo, waiting, scores)
+        scored = to_results(df, per_review, self.model)
+        n = write_results(self.model, df, scored, self.cache, fresh)
+        committed = time.perf_counter()
+        timings["write"] = committed - started
+
+        latency = df["queued_s"].to_numpy(dtype=float) + (committed - claimed)
+        self.latencies.extend(latency)
+        self.scored += n
+        self.batches += 1
+        for stage, seconds in timings.items():
+            self.timer.add(stage, seconds, len(todo) if stage == "score" else n)
+        self.timer.batch(n, timings, tokens=tokens, scored=len(todo),
+                         latency_p50_ms=round(float(np.median(latency)) * 1000, 1),
+                         latency_max_ms=round(float(latency.max()) * 1000, 1))
+        print(f"Scored {n:,} reviews, {np.median(latency):.2f}s median / {latency.max():.2f}s max "
+              f"after insert ({self.scored:,} since start)")
+        return n
+
+    def drain(self) -> None:
+        """Claim and score until the queue is empty; the API's caches are invalidated as rows land."""
+        self.status = "scoring"
+        written = 0
+        for df, claim_s in iter_batches(self.model, 0, self.max_batch, self.lease):
+            written += self.score_batch(df, claim_s)
+            if written and time.monotonic() - self._last_bump >= self.heartbeat_s:
+                self.bump()
+                written = 0
+            self.heartbeat()
+            if self.stopping:
+                break
+        if written:
+            self.bump()
+
+    def bump(self) -> None:
+        with get_engine().begin() as conn:
+            bump_data_version(conn)
+        self._last_bump = time.monotonic()
+
+    # --- Main loop ---
+    def run(self) -> None:
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self.stop)
+        with get_engine().begin() as conn:
+            ensure_cache_table(conn)
+            ensure_sentiment_dates(conn)
+            ensure_aggregates(conn)
+            ensure_drift_tables(conn)
+            ensure_scoring_queue(conn, self.model)  # also (re)installs the NOTIFY trigger function
+            ensure_worker_heartbeats(conn)
+            register_worker(conn, self.worker_id, "scoring", self.model, self.heartbeat_s)
+        print(f"Worker {self.worker_id} scoring '{self.model}' (batches of {self.max_batch}, "
+              f"max wait {self.max_wait}s); listening on '{NOTIFY_CHANNEL}'.")
+
+        listener, failures = None, 0
+        while not self.stopping:
+            try:
+                if listener is None:
+                    listener = Listener(get_engine())
+                    self.drain()  # work queued while nobody was listening
+                else:
+                    self.wait_for_batch(listener)
+                    if not self.stopping:
+                        self.drain()
+                failures, self.last_error = 0, None
+            except Exception as e:  # lost connection, database down, scorer failure
+                if listener is not None:
+                    listener.close()
+                    listener = None
+                failures += 1
+                delay = min(self.max_backoff, 2.0 ** (failures - 1)) * random.uniform(0.5, 1.0)
+                self.status, self.last_error = "backoff", f"{e.__class__.__name__}: {e}"[:500]
+                log_json("worker_error", job=self.timer.job, worker=self.worker_id, failures=failures,
+                         error=self.last_error, retry_in_s=round(delay, 2))
+                print(f"{self.last_error.splitlines()[0]}; retrying in {delay:.1f}s")
+                try:
+                    self.heartbeat(force=True)
+                except Exception:
+                    pass  # the database is likely what failed
+                self.wait(None, delay)
+
+        if listener is not None:
+            listener.close()
+        self.status = "stopped"
+        try:
+            self.heartbeat(force=True)
+        except Exception:
+            pass
+        print(f"Stopped after scoring {self.scored:,} reviews in {self.batches:,} batches. {self.cache.summary()}")
+        self.timer.done(model=self.model, worker=self.worker_id, rows=self.scored, batches=self.batches)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--max-batch", type=int, default=MAX_BATCH, help="reviews per claim / score / write batch")
+    ap.add_argument("--max-wait", type=float, default=MAX_WAIT_S,
+                    help="seconds a notified review may wait for its batch to fill")
+    ap.add_argument("--poll", type=float, default=POLL_S, help="claim anyway after this many quiet seconds")
+    ap.add_argument("--heartbeat", type=float, default=HEARTBEAT_S, help="seconds between heartbeat rows")
+    ap.add_argument("--lease", type=int, default=LEASE_S,
+                    help="seconds before an unfinished claim is handed out again")
+    ap.add_argument("--max-backoff", type=float, default=MAX_BACKOFF_S, help="longest pause between retries")
+    ap.add_argument("--cache-size", type=int, default=LRU_SIZE,
+                    help="in-process LRU entries (0 = Postgres tier only)")
+    add_scorer_args(ap)
+    args = ap.parse_args()
+    ScoringWorker(backend=args.backend, scorer_opts=scorer_opts(ap, args), max_batch=args.max_batch, max_wait=args.max_wait,
+                  poll=args.poll, heartbeat=args.heartbeat, lease=args.lease, cache_size=args.cache_size,
+                  max_backoff=args.max_backoff).run()
@@ -1,89 +1,248 @@
 # scripts/sentiment_vader.py
+import argparse
 import os
-import pandas as pd
-from sqlalchemy import create_engine, text
-from dotenv import load_dotenv
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from datetime import datetime
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from itertools import islice
 
+import pandas as pd
 
+from src.db.bulk import copy_rows
+from src.db.drift import ensure_drift_tables, update_drift
+from src.db.engine import get_engine
+from src.db.metrics import METRICS_MODEL, apply_sentiment_deltas, ensure_aggregates
+from src.db.partitions import ensure_sentiment_dates
+from src.db.queue import LEASE_SECONDS, claim_batch, complete, enqueue_backlog, ensure_scoring_queue, queue_depth
+from src.db.version import bump_data_version
+from src.nlp.score_cache import LRU_SIZE, ScoreCache, ensure_cache_table, normalize_text, text_hash
+from src.nlp.scoring import BACKENDS, MODEL, init_worker, score_batch, score_texts
+from src.telemetry.jobs import StageTimer
 
+BATCH_SIZE = 1_000  # reviews per claim / worker task
+INFLIGHT_PER_WORKER = 2  # bounded queue depth -> memory stays flat
 
-load_dotenv()
-DB_URL = os.getenv("DATABASE_URL")
-ENGINE = create_engine(DB_URL)
 
 # --- Sentiment scoring logic ---
-def run_vader(df: pd.DataFrame) -> pd.DataFrame:
-    sid = SentimentIntensityAnalyzer()
-    results = []
-
-    for _, row in df.iterrows():
-        text = row["review_text"] or ""
-        scores = sid.polarity_scores(text)
-
-        # classify
-        if scores["compound"] >= 0.05:
-            label = "positive"
-        elif scores["compound"] <= -0.05:
-            label = "negative"
-        else:
-            label = "neutral"
-
-        results.append(
-            {
-                "review_id": row["review_id"],
-                "model": "vader",
-                "polarity": scores["compound"],
-                "label": label,
-                "confidence": abs(scores["compound"]),  # crude proxy
-                "keywords_json": None,  # keep null for now
-                "processed_at": datetime.utcnow(),
-            }
-        )
-
-    return pd.DataFrame(results)
+def to_results(df: pd.DataFrame, scores: list[tuple[float, str, float]], model: str = MODEL) -> pd.DataFrame:
+    polarity, label, confidence = zip(*scores) if scores else ((), (), ())
+    return pd.DataFrame(
+        {
+            "review_id": df["review_id"].to_numpy(),
+            "review_date": df["review_date"].to_numpy(),  # partition key, copied from the review
+            "model": model,
+            "polarity": polarity,
+            "label": label,
+            "confidence": confidence,
+            "keywords_json": None,  # filled later by scripts.extract_keywords
+            "processed_at": datetime.utcnow(),
+        }
+    )
 
 
-def main(limit: int = 0):
-    # 1. fetch unscored reviews
-    sql = """
-    SELECT r.review_id, r.product_id, r.review_text
-    FROM reviews r
-    LEFT JOIN sentiment_results s ON s.review_id = r.review_id
-    WHERE s.review_id IS NULL
+def run_vader(df: pd.DataFrame) -> pd.DataFrame:
+    return to_results(df, score_texts(df["review_text"].tolist()))
+
+
+# --- Queue claim / write ---
+def iter_batches(model: str, limit: int, batch_size: int, lease: int = LEASE_SECONDS):
+    """Claim batches from scoring_queue until it is drained (or `limit` reviews were claimed)."""
+    remaining = limit
+    while True:
+        n = min(batch_size, remaining) if limit else batch_size
+        if n <= 0:
+            return
+        started = time.perf_counter()
+        with get_engine().begin() as conn:
+            df = claim_batch(conn, model, n, lease)
+            orphans = df["product_id"].isna()
+            if orphans.any():
+                complete(conn, model, df.loc[orphans, "review_id"])  # review deleted since it was queued
+        if df.empty:
+            return
+        df = df[~orphans].astype({"product_id": "int64"}).reset_index(drop=True)
+        remaining -= len(df)
+        if not df.empty:
+            yield df, time.perf_counter() - started
+
+
+def write_results(model: str, df: pd.DataFrame, scored: pd.DataFrame, cache: ScoreCache, fresh: dict) -> int:
+    """Queue deletion, results, cache entries, aggregate deltas and drift state commit together.
+
+    Only reviews whose queue rows this transaction deletes are written: if a lease expired and
+    another worker finished the same review first, our copy is dropped instead of duplicated.
     """
-    if limit and int(limit) > 0:
-        sql += " LIMIT :limit"
-
-    with ENGINE.begin() as conn:
-        df_reviews = pd.read_sql(text(sql), conn, params={"limit": int(limit)} if limit else {})
-
-    if df_reviews.empty:
-        print("No unscored reviews found.")
+    with get_engine().begin() as conn:
+        owned = complete(conn, model, df["review_id"])
+        if len(owned) < len(df):
+            keep = df["review_id"].isin(owned).to_numpy()
+            df, scored = df[keep], scored[keep]
+        copy_rows(conn, "sentiment_results", scored)
+        cache.store(conn, fresh)
+        if model == METRICS_MODEL:
+            scored = scored.assign(product_id=df["product_id"].to_numpy())
+            apply_sentiment_deltas(conn, scored)
+            update_drift(conn, scored)
+    return len(scored)
+
+
+# --- Cache-aware batch handling ---
+def plan_batch(df: pd.DataFrame, cache: ScoreCache, claim_s: float = 0.0):
+    """Split a batch into cached scores, the unique normalized texts it must score, and the
+    hashes an earlier batch still in flight is scoring (see ScoreCache.plan).
+
+    The last element collects this batch's stage timings as it moves through the pipeline.
+    """
+    started = time.perf_counter()
+    hashes = [text_hash(t) for t in df["review_text"]]
+    with get_engine().connect() as conn:
+        cached, mine, waiting = cache.plan(conn, hashes)
+    texts = dict(zip(hashes, df["review_text"]))
+    todo = {h: normalize_text(texts[h]) for h in mine}
+    timings = {"claim": claim_s, "plan": time.perf_counter() - started}
+    return df.assign(text_hash=hashes), cached, todo, waiting, timings
+
+
+def score_timed(texts: list[str]):
+    """Worker task: score_batch() plus the time it took inside the worker."""
+    started = time.perf_counter()
+    scores, tokens = score_batch(texts)
+    return scores, tokens, time.perf_counter() - started
+
+
+def resolve_scores(df: pd.DataFrame, cache: ScoreCache, cached: dict, todo: dict, waiting: set,
+                   scores: list) -> tuple[dict, list]:
+    """(fresh, per-review scores): settles this batch's reservations and takes the scores it
+    borrowed, which must be ready (cache.ready(waiting))."""
+    fresh = dict(zip(todo, scores))
+    cache.settle(fresh)
+    by_hash = {**cached, **fresh, **cache.take(waiting)}
+    return fresh, [by_hash[h] for h in df["text_hash"]]
+
+
+def finish_batch(df: pd.DataFrame, cache: ScoreCache, cached: dict, todo: dict, waiting: set, timings: dict,
+                 result: tuple, timer: StageTimer) -> tuple[int, int]:
+    scores, tokens, timings["score"] = result
+    started = time.perf_counter()
+    fresh, per_review = resolve_scores(df, cache, cached, todo, waiting, scores)
+    scored = to_results(df, per_review, cache.model)
+    n = write_results(cache.model, df, scored, cache, fresh)
+    timings["write"] = time.perf_counter() - started
+    for stage, seconds in timings.items():
+        timer.add(stage, seconds, len(todo) if stage == "score" else n)
+    timer.batch(n, timings, tokens=tokens, scored=len(todo))
+    return n, tokens
+
+
+def main(limit: int = 0, workers: int = 0, batch_size: int = BATCH_SIZE, cache_size: int = LRU_SIZE,
+         backfill: bool = False, backend: str = "vader", scorer_opts: dict | None = None):
+    limit = int(limit or 0)
+    workers = int(workers or 0) or os.cpu_count() or 1
+    # built in this process too: fails fast on a bad model path and serves the inline path
+    model = init_worker(backend, scorer_opts).model
+    cache = ScoreCache(model, maxsize=cache_size)
+    with get_engine().begin() as conn:
+        ensure_cache_table(conn)
+        ensure_sentiment_dates(conn)
+        ensure_aggregates(conn)
+        ensure_drift_tables(conn)
+        ensure_scoring_queue(conn, model)
+        if backfill:
+            print(f"Queued {enqueue_backlog(conn, model):,} unscored reviews.")
+
+    batches = (plan_batch(df, cache, claim_s) for df, claim_s in iter_batches(model, limit, batch_size))
+    timer = StageTimer("score")
+    started = time.perf_counter()
+    total = tokens = 0
+
+    def report(n: int, batch_tokens: int) -> None:  # (rows written, tokens scored) for one batch
+        nonlocal total, tokens
+        total += n
+        tokens += batch_tokens
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        print(f"Scored {total:,} reviews ({total / elapsed:,.0f} rows/sec, {tokens / elapsed:,.0f} tokens/sec)")
+
+    if workers == 1:
+        # inline path: no pool start-up or pickling cost
+        for df, cached, todo, waiting, timings in batches:
+            report(*finish_batch(df, cache, cached, todo, waiting, timings, score_timed(list(todo.values())), timer))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(backend, scorer_opts)) as pool:
+            pending = {
+                pool.submit(score_timed, list(item[2].values())): item
+                for item in islice(batches, workers * INFLIGHT_PER_WORKER)
+            }
+            # a scored batch that borrows texts from a batch not yet finished waits here; it only
+            # borrows from batches planned before it, so the oldest one can always finish
+            parked = []
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    parked.append((pending.pop(fut), fut.result()))
+                    nxt = next(batches, None)
+                    if nxt is not None:
+                        pending[pool.submit(score_timed, list(nxt[2].values()))] = nxt
+                finished = True
+                while finished:
+                    finished, waiting_on = False, []
+                    for item, result in parked:
+                        df, cached, todo, waiting, timings = item
+                        if cache.ready(waiting):
+                            report(*finish_batch(df, cache, cached, todo, waiting, timings, result, timer))
+                            finished = True
+                        else:
+                            waiting_on.append((item, result))
+                    parked = waiting_on
+            assert not parked
+
+    if not total:
+        print("Scoring queue is empty.")
         return
 
-    # 2. run VADER
-    scored = run_vader(df_reviews)
-
-    # 3. write back to DB
-    with ENGINE.begin() as conn:
-        scored.to_sql(
-            "sentiment_results",
-            con=conn,
-            schema="public",
-            if_exists="append",
-            index=False,
-            method="multi",
-            chunksize=5000,
-        )
-
-    print(f"Wrote {len(scored)} rows to sentiment_results.")
+    with get_engine().begin() as conn:
+        bump_data_version(conn)  # invalidates API response caches
+
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {total:,} '{model}' rows to sentiment_results in {elapsed:.1f}s "
+          f"({total / max(elapsed, 1e-9):,.0f} rows/sec, {tokens / max(elapsed, 1e-9):,.0f} tokens/sec scored, "
+          f"{workers} worker(s)).")
+    print(cache.summary())
+    timer.done(model=model, rows=total, tokens=tokens, workers=workers,
+               cache_lru_hits=cache.lru_hits, cache_db_hits=cache.db_hits, cache_shared=cache.shared,
+               cache_misses=cache.misses)
+    with get_engine().connect() as conn:
+        print(f"{queue_depth(conn, model):,} reviews left in the queue.")
+
+
+def add_scorer_args(ap: argparse.ArgumentParser) -> None:
+    """Backend options shared with scripts/scoring_worker.py."""
+    ap.add_argument("--backend", choices=BACKENDS, default="vader")
+    ap.add_argument("--model-path", help="transformer: local model directory (loaded offline)")
+    ap.add_argument("--model-name", help="transformer: sentiment_results.model value (default: directory name)")
+    ap.add_argument("--threads", type=int, default=1, help="transformer: torch threads per scoring process")
+    ap.add_argument("--quantize", action="store_true", help="transformer: int8 dynamic quantization of Linear layers")
+    ap.add_argument("--token-budget", type=int, default=8192, help="transformer: padded tokens per forward pass")
+
+
+def scorer_opts(ap: argparse.ArgumentParser, args: argparse.Namespace) -> dict | None:
+    """init_worker() options from add_scorer_args() flags (None for VADER)."""
+    if args.backend != "transformer":
+        return None
+    if not args.model_path:
+        ap.error("--backend transformer needs --model-path")
+    return {"path": args.model_path, "model": args.model_name, "threads": args.threads,
+            "quantize": args.quantize, "token_budget": args.token_budget}
 
 
 if __name__ == "__main__":
-    import argparse
     ap = argparse.ArgumentParser()
     ap.add_argument("--limit", default=0, help="limit number of reviews to score")
+    ap.add_argument("--workers", type=int, default=0, help="scoring processes (0 = one per CPU)")
+    ap.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="reviews per claim/score/write batch")
+    ap.add_argument("--cache-size", type=int, default=LRU_SIZE, help="in-process LRU entries (0 = Postgres tier only)")
+    ap.add_argument("--backfill", action="store_true", help="queue existing reviews that have no result yet")
+    add_scorer_args(ap)
     args = ap.parse_args()
-    main(limit=args.limit)
+    main(limit=args.limit, workers=args.workers, batch_size=args.batch_size, cache_size=args.cache_size,
+         backfill=args.backfill, backend=args.backend, scorer_opts=scorer_opts(ap, args))
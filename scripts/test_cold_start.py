@@ -0,0 +1,78 @@
+# scripts/test_cold_start.py
+"""Cold-start budget for the API: import time and first-request latency, each in a fresh process.
+
+Needs no database (the engine is created lazily and `/` does not touch it). Exits 1 when a
+budget is exceeded or a heavy module is imported by `src.app.main`:
+
+    python -m scripts.test_cold_start --import-budget 1.5 --request-budget 0.25
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# must stay out of the API process: they belong to the batch scripts
+HEAVY_MODULES = ("pandas", "numpy", "sklearn", "torch", "transformers", "vaderSentiment", "asyncpg")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from src.app.main import create_app
+imported = time.perf_counter() - started
+heavy = [m for m in HEAVY if m in sys.modules]
+
+from fastapi.testclient import TestClient
+started = time.perf_counter()
+with TestClient(create_app()) as client:
+    status = client.get("/").status_code
+    first_request = time.perf_counter() - started
+print(json.dumps({
+    "import_s": imported,
+    "first_request_s": first_request,
+    "status": status,
+    "heavy": heavy,
+}))
+"""
+
+
+def probe() -> dict:
+    code = f"HEAVY = {HEAVY_MODULES!r}\n" + PROBE
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=Path(__file__).resolve().parents[1])
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(runs: int, import_budget: float, request_budget: float) -> int:
+    results = [probe() for _ in range(runs)]
+    import_s = statistics.median(r["import_s"] for r in results)
+    request_s = statistics.median(r["first_request_s"] for r in results)
+    heavy = sorted({m for r in results for m in r["heavy"]})
+
+    failures = []
+    if import_s > import_budget:
+        failures.append(f"import {import_s:.3f}s > budget {import_budget:.3f}s")
+    if request_s > request_budget:
+        failures.append(f"first request {request_s:.3f}s > budget {request_budget:.3f}s")
+    if any(r["status"] != 200 for r in results):
+        failures.append(f"GET / returned {[r['status'] for r in results]}")
+    if heavy:
+        failures.append(f"heavy modules imported by the API: {', '.join(heavy)}")
+
+    print(f"import src.app.main   {import_s * 1000:8.1f} ms  (budget {import_budget * 1000:.0f} ms, median of {runs})")
+    print(f"startup + first GET / {request_s * 1000:8.1f} ms  (budget {request_budget * 1000:.0f} ms)")
+    for f in failures:
+        print(f"FAIL: {f}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=3, help="fresh processes; the median is compared")
+    ap.add_argument("--import-budget", type=float, default=1.5, help="seconds")
+    ap.add_argument("--request-budget", type=float, default=0.25, help="seconds, including app startup")
+    args = ap.parse_args()
+    sys.exit(main(args.runs, args.import_budget, args.request_budget))
@@ -0,0 +1,112 @@
+"""Versioned response cache with ETag / 304 support.
+
+Entries are keyed by path + query string and tagged with the data_version watermark that the
+loaders bump (src/db/version.py). A bump makes every older entry and ETag stale at once; TTL and
+LRU eviction bound memory between bumps.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+from fastapi import Request, Response
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from src.app.db import get_engine
+from src.app.pagination import json_default
+from src.config.settings import (
+    CACHE_MAX_AGE_S,
+    DATA_VERSION_POLL_S,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL_S,
+)
+
+
+class DataVersion:
+    """data_version watermark, re-read from Postgres at most every `poll_s` seconds."""
+
+    def __init__(self, poll_s: float = DATA_VERSION_POLL_S):
+        self.poll_s = poll_s
+        self.value = 0
+        self._checked = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def current(self, engine) -> int:
+        if time.monotonic() - self._checked < self.poll_s:
+            return self.value
+        async with self._lock:
+            if time.monotonic() - self._checked >= self.poll_s:  # another request may have refreshed it
+                try:
+                    async with engine.connect() as conn:
+                        v = (await conn.execute(text("SELECT version FROM data_version WHERE id = 1"))).scalar()
+                    self.value = v or 0
+                except (DBAPIError, OSError):
+                    pass  # table not created yet or DB hiccup: keep the last known version
+                self._checked = time.monotonic()
+        return self.value
+
+
+class ResponseCache:
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL_S):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, int, bytes, dict]] = OrderedDict()
+
+    def get(self, key: str, version: int):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, entry_version, body, headers = entry
+        if entry_version != version or expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return body, headers
+
+    def put(self, key: str, version: int, body: bytes, headers: dict) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, version, body, headers)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+def cache_key(request: Request) -> str:
+    return request.url.path + "?" + "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+
+
+def make_etag(key: str, version: int) -> str:
+    return f'W/"{version}-{hashlib.sha1(key.encode()).hexdigest()[:16]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {t.strip() for t in header.split(",")}
+    return "*" in tags or etag in tags or etag.removeprefix("W/") in tags
+
+
+async def cached_json(request: Request, compute) -> Response:
+    """Serve `await compute()` -> (payload, headers) through the cache, honouring If-None-Match.
+
+    The ETag depends only on the request and the data version, so a 304 costs no query at all.
+    """
+    state = request.app.state
+    version = await state.data_version.current(get_engine(request))
+    key = cache_key(request)
+    etag = make_etag(key, version)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={CACHE_MAX_AGE_S}"}
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    hit = state.response_cache.get(key, version)
+    if hit is None:
+        payload, extra = await compute()
+        body = json.dumps(payload, default=json_default).encode()
+        state.response_cache.put(key, version, body, extra)
+        hit = body, extra
+    body, extra = hit
+    return Response(content=body, media_type="application/json", headers={**headers, **extra})
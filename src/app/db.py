@@ -0,0 +1,61 @@
+"""Async data-access layer for the API.
+
+One pooled AsyncEngine (asyncpg) per app, created on first use and disposed on shutdown, so
+startup does not wait on the driver or the database. Pool size, prepared-statement cache and
+per-query timeouts come from src/config/settings.py.
+"""
+from fastapi import Request
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from src.config.settings import get_settings
+from src.telemetry.sql import instrument_engine, timed_connect
+
+
+def async_url(url: str, statement_cache_size: int):
+    """Point a psycopg2 DATABASE_URL at the asyncpg driver and set its statement cache size."""
+    u = make_url(url)
+    if u.drivername in ("postgresql", "postgresql+psycopg2"):
+        u = u.set(drivername="postgresql+asyncpg")
+    return u.update_query_dict({"prepared_statement_cache_size": str(statement_cache_size)})
+
+
+def create_db_engine(url: str | None = None) -> AsyncEngine:
+    s = get_settings()
+    engine = create_async_engine(
+        async_url(url or s.database_url, s.db_statement_cache_size),
+        pool_size=s.db_pool_size,
+        max_overflow=s.db_max_overflow,
+        pool_timeout=s.db_pool_timeout,
+        pool_recycle=s.db_pool_recycle,
+        pool_pre_ping=True,
+        connect_args={
+            # client-side cap per round trip, server-side cap per statement
+            "command_timeout": s.db_query_timeout_ms / 1000,
+            "server_settings": {"statement_timeout": str(s.db_query_timeout_ms)},
+        },
+    )
+    instrument_engine(engine.sync_engine)  # query timings for /telemetry
+    return engine
+
+
+def get_engine(request: Request) -> AsyncEngine:
+    """The app's engine, created on the first request that needs one.
+
+    No await between the check and the assignment, so concurrent first requests cannot race.
+    """
+    state = request.app.state
+    if state.engine is None:
+        state.engine = state.engine_factory()
+    return state.engine
+
+
+def connect(request: Request):
+    """`async with connect(request) as conn`: a pooled connection whose checkout wait is recorded."""
+    return timed_connect(get_engine(request))
+
+
+async def get_conn(request: Request):
+    """FastAPI dependency: one pooled connection per request."""
+    async with connect(request) as conn:
+        yield conn
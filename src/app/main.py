@@ -1,102 +1,460 @@
-from fastapi import FastAPI, HTTPException
-from sqlalchemy import create_engine, text
+"""FastAPI app for the sentiment API.
+
+`create_app()` builds the app; the module-level `app` is what uvicorn serves
+(`uvicorn src.app.main:app`). The database engine is created on the first request that needs it
+(src/app/db.py), so startup only pays for imports.
+"""
+import time
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Literal
+
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-import os
-from dotenv import load_dotenv
-from fastapi.responses import JSONResponse
+from sqlalchemy import JSON, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.app.cache import DataVersion, ResponseCache, cached_json
+from src.app.db import connect, create_db_engine, get_conn, get_engine
+from src.app.pagination import (
+    MAX_PAGE,
+    NEXT_CURSOR_HEADER,
+    bigint_key,
+    date_key,
+    decode_cursor,
+    encode_cursor,
+    float_key,
+    int_key,
+    ndjson_line,
+    optional,
+)
+from src.db.queries import ALERTS_SELECT, METRICS_MODEL, METRICS_SELECT, SENTIMENT_JOIN, TREND_SELECT
+from src.db.search import TS_CONFIG
+from src.db.workers import HEALTH_SQL
+from src.telemetry.registry import CONTENT_TYPE, Histogram
+from src.telemetry.registry import render as render_metrics
+from src.telemetry.sql import record_pool_state
+
+router = APIRouter()
 
-load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.engine = None  # created lazily by get_engine()
+    app.state.data_version = DataVersion()
+    app.state.response_cache = ResponseCache()
+    try:
+        yield
+    finally:
+        if app.state.engine is not None:
+            await app.state.engine.dispose()  # close pooled connections gracefully
 
-app = FastAPI(title="AI Sentiment & Insights API", version="0.1.0")
 
-@app.get("/")
+@router.get("/")
 def root():
     return JSONResponse({"message": "AI Sentiment & Insights API", "docs": "/docs", "health": "/health"})
-from fastapi.middleware.cors import CORSMiddleware
 
 
+# ---- Telemetry ----
+# Per-route latency histograms plus the SQL / pool metrics from src/telemetry, in Prometheus text
+# format. Served on /telemetry because /metrics is product data.
 
-app = FastAPI(title="AI Sentiment & Insights API", version="0.1.0")
+HTTP_SECONDS = Histogram("http_request_duration_seconds", "Request latency until response headers.",
+                         ("method", "route", "status"))
 
-@app.get("/")
-def root():
-    return JSONResponse({"message": "AI Sentiment & Insights API", "docs": "/docs", "health": "/health"})
 
+async def record_latency(request: Request, call_next):
+    """HTTP middleware (registered in create_app)."""
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_SECONDS.observe(time.perf_counter() - started, method=request.method,
+                         route=getattr(route, "path", "unmatched"), status=response.status_code)
+    return response
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],          # for dev, wide open
-    allow_methods=["GET"],        # read-only API
-    allow_headers=["*"],
-)
 
+@router.get("/telemetry", include_in_schema=False)
+def telemetry(request: Request):
+    if request.app.state.engine is not None:  # scraping should not open the pool
+        record_pool_state(request.app.state.engine.sync_engine)
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL, future=True)
 
-@app.get("/health")
-def health():
+@router.get("/health")
+async def health(request: Request):
     out = {"status": "ok", "service": "ai-sentiment-insights", "version": "0.1.0"}
     try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-        out["db"] = "up"
+        async with connect(request) as conn:
+            await conn.execute(text("SELECT 1"))
+            out["db"] = "up"
+            # worker heartbeats (scripts/scoring_worker.py); the table exists once a worker ran
+            if (await conn.execute(text("SELECT to_regclass('worker_heartbeats') IS NOT NULL"))).scalar():
+                result = await conn.execute(text(HEALTH_SQL))
+                out["workers"] = [dict(r) for r in result.mappings().all()]
+                if any(w["stale"] for w in out["workers"]):
+                    out["status"] = "degraded"
     except Exception as e:
-        out["db"] = f"down: {e.__class__.__name__}"
+        if "db" in out:
+            out["workers"] = f"unavailable: {e.__class__.__name__}"
+        else:
+            out["db"] = f"down: {e.__class__.__name__}"
     return out
 
 # ---- Day 4 endpoints ----
+# List endpoints use keyset pagination: pass the X-Next-Cursor header of one page as ?cursor= to
+# get the next. format=ndjson streams every row after the cursor through a server-side cursor.
+
+Format = Literal["json", "ndjson"]
+
+
+def stream_rows(request: Request, sql: str, params: dict) -> StreamingResponse:
+    async def gen():
+        # own connection: the request-scoped one is released before the body is sent
+        async with connect(request) as conn:
+            await conn.execute(text("SET LOCAL statement_timeout = 0"))  # exports outlive the per-query cap
+            result = await conn.stream(text(sql), params)
+            async for row in result.mappings():
+                yield ndjson_line(row)
+    return StreamingResponse(gen(), media_type="application/x-ndjson")
+
+
+async def page(conn: AsyncConnection, sql: str, params: dict, limit: int, key):
+    """Fetch limit + 1 rows; the extra row only tells us whether to emit a next cursor.
+
+    Returns (rows, headers) so cached and uncached endpoints can both use it.
+    """
+    result = await conn.execute(text(sql + " LIMIT :lim"), {**params, "lim": limit + 1})
+    rows = [dict(r) for r in result.mappings().all()]
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[-1]))
+    return rows, headers
+
+
+def cached_page(request: Request, sql: str, params: dict, limit: int, key):
+    """Compute callback for cached_json(): the connection is only checked out on a cache miss."""
+    async def compute():
+        async with connect(request) as conn:
+            return await page(conn, sql, params, limit, key)
+    return compute
+
 
 class Product(BaseModel):
     product_id: int
     title: str
 
-@app.get("/products", response_model=list[Product])
-def list_products():
-    with engine.connect() as conn:
-        rows = conn.execute(text("""
-            SELECT product_id, title
-            FROM products
-            ORDER BY product_id
-            LIMIT 200
-        """)).mappings().all()
-    return rows
+# The handler returns a ready (cached) Response, so no response_model is applied; `responses`
+# only documents the two formats in the OpenAPI schema.
+PRODUCTS_RESPONSES = {
+    200: {
+        "model": list[Product],
+        "description": f"A page of products; `{NEXT_CURSOR_HEADER}` is set when more exist. With "
+                       "format=ndjson, every product after the cursor, one JSON object per line.",
+        "content": {"application/x-ndjson": {"schema": {"type": "string"}}},
+    }
+}
+
+@router.get("/products", responses=PRODUCTS_RESPONSES)
+async def list_products(
+    request: Request,
+    limit: int = Query(200, ge=1, le=MAX_PAGE),
+    cursor: str | None = None,
+    format: Format = "json",
+):
+    after = decode_cursor(cursor, int_key)[0] if cursor else 0
+    sql = """
+        SELECT product_id, title
+        FROM products
+        WHERE product_id > :after
+        ORDER BY product_id
+    """
+    if format == "ndjson":
+        return stream_rows(request, sql, {"after": after})
+    return await cached_json(request, cached_page(request, sql, {"after": after}, limit, lambda r: (r["product_id"],)))
+
+# metrics come from the incrementally maintained product_stats table (see src/db/metrics.py)
+@router.get("/metrics")
+async def all_product_metrics(
+    request: Request,
+    limit: int = Query(200, ge=1, le=MAX_PAGE),
+    cursor: str | None = None,
+    format: Format = "json",
+):
+    after = decode_cursor(cursor, int_key)[0] if cursor else 0
+    sql = METRICS_SELECT + """
+        WHERE p.product_id > :after
+        ORDER BY p.product_id
+    """
+    if format == "ndjson":
+        return stream_rows(request, sql, {"after": after})
+    return await cached_json(request, cached_page(request, sql, {"after": after}, limit, lambda r: (r["product_id"],)))
+
+@router.get("/metrics/{product_id}")
+async def metrics_for_product(product_id: int, request: Request):
+    async def compute():
+        async with connect(request) as conn:
+            result = await conn.execute(text(METRICS_SELECT + """
+                WHERE p.product_id = :pid
+            """), {"pid": product_id})
+            row = result.mappings().first()
+        if not row:
+            raise HTTPException(status_code=404, detail="product not found")
+        return dict(row), {}
+    return await cached_json(request, compute)
 
-@app.get("/metrics")
-def all_product_metrics():
-    with engine.connect() as conn:
-        rows = conn.execute(text("""
-            SELECT *
-            FROM product_metrics
-            ORDER BY product_id
-            LIMIT 200
-        """)).mappings().all()
+@router.get("/products/{product_id}/reviews")
+async def reviews_for_product(
+    product_id: int,
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE),
+    cursor: str | None = None,
+    format: Format = "json",
+    conn: AsyncConnection = Depends(get_conn),
+):
+    # sort key is (review_date NULLS LAST, review_id); dated rows come first, then undated ones
+    params = {"pid": product_id, "model": METRICS_MODEL}
+    after = ""
+    if cursor:
+        params["d"], params["rid"] = decode_cursor(cursor, optional(date_key), bigint_key)
+        if params["d"] is None:
+            after = "AND r.review_date IS NULL AND r.review_id > :rid"
+        else:
+            after = "AND ((r.review_date, r.review_id) > (:d, :rid) OR r.review_date IS NULL)"
+    sql = f"""
+        SELECT r.review_id, r.rating, r.review_date, r.review_text,
+               COALESCE(s.label, 'unscored') AS label,
+               s.polarity
+        FROM reviews r
+        LEFT JOIN sentiment_results s ON {SENTIMENT_JOIN}
+        WHERE r.product_id = :pid
+          {after}
+        ORDER BY r.review_date NULLS LAST, r.review_id
+    """
+    if format == "ndjson":
+        return stream_rows(request, sql, params)
+    rows, headers = await page(conn, sql, params, limit, lambda r: (r["review_date"], r["review_id"]))
+    response.headers.update(headers)
     return rows
 
-@app.get("/metrics/{product_id}")
-def metrics_for_product(product_id: int):
-    with engine.connect() as conn:
-        row = conn.execute(text("""
-            SELECT *
-            FROM product_metrics
-            WHERE product_id = :pid
-        """), {"pid": product_id}).mappings().first()
-    if not row:
-        raise HTTPException(status_code=404, detail="product not found")
-    return row
-
-@app.get("/products/{product_id}/reviews")
-def reviews_for_product(product_id: int, limit: int = 100):
-    with engine.connect() as conn:
-        rows = conn.execute(text("""
-            SELECT r.review_id, r.rating, r.review_date, r.review_text,
-                   COALESCE(s.label, 'unscored') AS label,
-                   s.polarity
+
+# ---- Dashboard ----
+# Everything the Streamlit product view needs in one statement: metrics row, label distribution
+# and latest-N reviews from one pass over the product's reviews, plus the bucketed
+# rating/polarity series from product_rollups.
+
+DASHBOARD_SQL = text(f"""
+    WITH base AS MATERIALIZED (
+        SELECT r.review_id, r.rating, r.review_date, r.review_text, s.label, s.polarity
+        FROM reviews r
+        LEFT JOIN sentiment_results s ON {SENTIMENT_JOIN}
+        WHERE r.product_id = :pid
+    ),
+    labels AS (
+        SELECT COALESCE(label, 'unscored') AS label, COUNT(*) AS count
+        FROM base
+        GROUP BY 1
+    ),
+    series AS (
+        SELECT bucket_start AS bucket,
+               review_count AS reviews,
+               ROUND(rating_sum::numeric / NULLIF(rating_count, 0), 2) AS avg_rating,
+               ROUND((polarity_sum / NULLIF(scored_count, 0))::numeric, 4) AS avg_polarity
+        FROM product_rollups
+        WHERE product_id = :pid AND granularity = :bucket
+    ),
+    latest AS (
+        SELECT review_id, review_date, rating, COALESCE(label, 'unscored') AS label, review_text, polarity
+        FROM base
+        ORDER BY review_date DESC NULLS LAST, review_id DESC
+        LIMIT :latest
+    )
+    SELECT
+        (SELECT row_to_json(m) FROM ({METRICS_SELECT} WHERE p.product_id = :pid) m) AS metrics,
+        (SELECT COALESCE(json_agg(l ORDER BY l.count DESC), '[]') FROM labels l) AS labels,
+        (SELECT COALESCE(json_agg(t ORDER BY t.bucket), '[]') FROM series t) AS series,
+        (SELECT COALESCE(json_agg(x), '[]') FROM latest x) AS latest
+""").columns(metrics=JSON, labels=JSON, series=JSON, latest=JSON)
+
+
+@router.get("/products/{product_id}/dashboard")
+async def product_dashboard(
+    product_id: int,
+    request: Request,
+    bucket: Literal["day", "week", "month"] = "week",
+    latest: int = Query(50, ge=0, le=MAX_PAGE),
+):
+    async def compute():
+        async with connect(request) as conn:
+            result = await conn.execute(
+                DASHBOARD_SQL, {"pid": product_id, "model": METRICS_MODEL, "bucket": bucket, "latest": latest}
+            )
+            row = result.mappings().one()
+        if row["metrics"] is None:
+            raise HTTPException(status_code=404, detail="product not found")
+        return {"product_id": product_id, "bucket": bucket, **row}, {}
+    return await cached_json(request, compute)
+
+
+# ---- Trends ----
+
+@router.get("/products/{product_id}/trend")
+async def product_trend(
+    product_id: int,
+    request: Request,
+    granularity: Literal["day", "week", "month"] = "week",
+    start: date | None = None,
+    end: date | None = None,
+):
+    """Precomputed per-bucket counts and averages; `bucket` uses the ai_summaries.time_window keys."""
+    params = {"pid": product_id, "g": granularity}
+    where = "WHERE product_id = :pid AND granularity = :g"
+    if start:
+        where += " AND bucket_start >= :start"
+        params["start"] = start
+    if end:
+        where += " AND bucket_start <= :end"
+        params["end"] = end
+    sql = TREND_SELECT + where + " ORDER BY bucket_start"
+
+    async def compute():
+        async with connect(request) as conn:
+            result = await conn.execute(text(sql), params)
+            return [dict(r) for r in result.mappings().all()], {}
+    return await cached_json(request, compute)
+
+
+# ---- Search ----
+# Ranked full-text search over review_text via the GIN-indexed review_tsv column
+# (src/db/search.py). The matching, ranking and paging run on ids only; ts_headline() runs on
+# the returned page only, because it re-parses the full text of each row.
+
+HEADLINE_OPTS = "MaxFragments=2, MaxWords=18, MinWords=6, StartSel=<mark>, StopSel=</mark>"
+
+
+@router.get("/search")
+async def search_reviews(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200, description='web-search syntax: battery -charger "stopped working"'),
+    product_id: int | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    min_rating: int | None = Query(None, ge=1, le=5),
+    max_rating: int | None = Query(None, ge=1, le=5),
+    label: Literal["positive", "neutral", "negative"] | None = None,
+    sort: Literal["rank", "recent"] = "rank",
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+):
+    """`rank` orders by ts_rank_cd (best first); `recent` by review_id descending, which stays
+    fast for very common terms because it need not rank every match."""
+    params = {"q": q, "model": METRICS_MODEL}
+    where = ["r.review_tsv @@ query"]
+    on = [SENTIMENT_JOIN]  # date bounds are repeated here so sentiment_results partitions prune too
+    if product_id is not None:
+        where.append("r.product_id = :pid")
+        params["pid"] = product_id
+    if start:
+        where.append("r.review_date >= :start")
+        on.append("s.review_date >= :start")
+        params["start"] = start
+    if end:
+        where.append("r.review_date <= :end")
+        on.append("s.review_date <= :end")
+        params["end"] = end
+    if min_rating is not None:
+        where.append("r.rating >= :min_rating")
+        params["min_rating"] = min_rating
+    if max_rating is not None:
+        where.append("r.rating <= :max_rating")
+        params["max_rating"] = max_rating
+    if label:
+        where.append("s.label = :label")
+        params["label"] = label
+
+    if sort == "rank":
+        keys = ("rank", "review_id")
+        if cursor:
+            params["rank"], params["rid"] = decode_cursor(cursor, float_key, bigint_key)
+            where.append("(ts_rank_cd(r.review_tsv, query), r.review_id) < (:rank, :rid)")
+    else:
+        keys = ("review_id",)
+        if cursor:
+            where.append("r.review_id < :rid")
+            params["rid"] = decode_cursor(cursor, bigint_key)[0]
+
+    sql = f"""
+        WITH hits AS (
+            SELECT r.review_id, r.product_id, r.review_date, r.rating,
+                   COALESCE(s.label, 'unscored') AS label, s.polarity,
+                   ts_rank_cd(r.review_tsv, query) AS rank
             FROM reviews r
-            LEFT JOIN sentiment_results s ON s.review_id = r.review_id
-            WHERE r.product_id = :pid
-            ORDER BY r.review_date NULLS LAST, r.review_id
+            CROSS JOIN websearch_to_tsquery('{TS_CONFIG}', :q) AS query
+            {"JOIN" if label else "LEFT JOIN"} sentiment_results s ON {" AND ".join(on)}
+            WHERE {" AND ".join(where)}
+            ORDER BY {", ".join(f"{k} DESC" for k in keys)}
             LIMIT :lim
-        """), {"pid": product_id, "lim": limit}).mappings().all()
-    return rows
+        )
+        SELECT h.*,
+               ts_headline('{TS_CONFIG}', r.review_text, websearch_to_tsquery('{TS_CONFIG}', :q),
+                           '{HEADLINE_OPTS}') AS snippet
+        FROM hits h
+        JOIN reviews r ON r.review_id = h.review_id
+        ORDER BY {", ".join(f"h.{k} DESC" for k in keys)}
+    """
+    return await cached_json(request, cached_page(request, sql, params, limit, lambda r: [r[k] for k in keys]))
+
+
+# ---- Drift alerts ----
+# Running per-product drift scores kept by the scoring job (src/db/drift.py). The ranking is a
+# scan of the partial index on drift_score, so the cost is the limit, not the catalogue size.
+
+@router.get("/alerts")
+async def drift_alerts(
+    request: Request,
+    direction: Literal["worse", "better"] = "worse",
+    limit: int = Query(20, ge=1, le=100),
+    min_score: float | None = Query(None, ge=0, description="only products with |drift_score| at least this"),
+    open_only: bool = False,
+):
+    """Top movers: `worse` ranks by drift_score descending (recent sentiment below the product's
+    baseline), `better` ascending. Products with an open alert carry its id, kind and peak."""
+    params = {"lim": limit}
+    where = ""
+    if min_score is not None:
+        where += " AND d.drift_score >= :min" if direction == "worse" else " AND d.drift_score <= -:min"
+        params["min"] = min_score
+    if open_only:
+        where += " AND d.open_alert_id IS NOT NULL"
+    order = "DESC" if direction == "worse" else "ASC"
+    sql = ALERTS_SELECT + where + f" AND d.drift_score IS NOT NULL ORDER BY d.drift_score {order} LIMIT :lim"
+
+    async def compute():
+        async with connect(request) as conn:
+            # created by the first scoring run (ensure_drift_tables)
+            if not (await conn.execute(text("SELECT to_regclass('product_drift_state') IS NOT NULL"))).scalar():
+                return [], {}
+            result = await conn.execute(text(sql), params)
+            return [dict(r) for r in result.mappings().all()], {}
+    return await cached_json(request, compute)
+
+def create_app(engine_factory=create_db_engine) -> FastAPI:
+    """`engine_factory()` returns the AsyncEngine; it is called on the first request that needs one."""
+    app = FastAPI(title="AI Sentiment & Insights API", version="0.1.0", lifespan=lifespan)
+    app.state.engine_factory = engine_factory
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],          # for dev, wide open
+        allow_methods=["GET"],        # read-only API
+        allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
+    )
+    app.middleware("http")(record_latency)
+    app.include_router(router)
+    return app
+
+
+app = create_app()
@@ -0,0 +1,72 @@
+"""Keyset pagination helpers: opaque cursors and NDJSON row streaming."""
+import base64
+import binascii
+import json
+import math
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi import HTTPException
+
+MAX_PAGE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*key) -> str:
+    """Pack the sort key of the last row on a page into an opaque, URL-safe token."""
+    raw = json.dumps(key, default=json_default, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types) -> list:
+    """Unpack a cursor with one key element per converter in `types` (int_key, bigint_key,
+    float_key, date_key, optional(...)). Any malformed token or element is a 400, not a query error."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(key, list) or len(key) != len(types):
+            raise ValueError("wrong key size")
+        return [convert(v) for convert, v in zip(types, key)]
+    except (binascii.Error, ValueError, TypeError, OverflowError):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+
+
+# --- cursor key converters: raise ValueError / TypeError on a value of the wrong type ---
+def _integer(v, bits: int) -> int:
+    if isinstance(v, bool) or not isinstance(v, int) or not -2**(bits - 1) <= v < 2**(bits - 1):
+        raise ValueError(f"not an int{bits}: {v!r}")
+    return v
+
+
+def int_key(v) -> int:
+    return _integer(v, 32)  # INT columns (product_id)
+
+
+def bigint_key(v) -> int:
+    return _integer(v, 64)  # BIGINT columns (review_id)
+
+
+def float_key(v) -> float:
+    if isinstance(v, bool) or not isinstance(v, (int, float)) or not math.isfinite(v):
+        raise ValueError(f"not a number: {v!r}")
+    return float(v)
+
+
+def date_key(v) -> date:
+    return date.fromisoformat(v)  # TypeError for non-strings; asyncpg binds date objects only
+
+
+def optional(convert):
+    """Allow null (e.g. NULLS LAST sort keys), otherwise `convert`."""
+    return lambda v: None if v is None else convert(v)
+
+
+def json_default(v):
+    if isinstance(v, Decimal):
+        return float(v)
+    if isinstance(v, (date, datetime)):
+        return v.isoformat()
+    raise TypeError(f"{type(v).__name__} is not JSON serializable")
+
+
+def ndjson_line(row) -> str:
+    return json.dumps(dict(row), default=json_default) + "\n"
@@ -0,0 +1,111 @@
+"""COPY-based bulk writes shared by the loaders.
+
+Rows are rendered to CSV in an in-memory buffer and streamed with ``COPY ... FROM STDIN``
+on the caller's transaction, which is far cheaper than ``DataFrame.to_sql``.
+"""
+import io
+import json
+from itertools import count
+
+import pandas as pd
+
+CHUNK_ROWS = 50_000  # rows per in-memory COPY buffer
+NULL = r"\N"
+
+_tmp_ids = count(1)
+
+
+def _prepare(df: pd.DataFrame) -> pd.DataFrame:
+    """Make a frame COPY-safe: JSON-encode dict/list cells, keep integral floats integral."""
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if s.dtype == object and s.map(lambda v: isinstance(v, (dict, list))).any():
+            s = s.map(lambda v: json.dumps(v) if isinstance(v, (dict, list)) else v)
+        elif s.dtype.kind == "f":
+            # to_numeric() leaves INTEGER columns as float64 when NaN is present ("12.0" breaks COPY)
+            vals = s.dropna()
+            if len(vals) and (vals % 1 == 0).all():
+                s = s.astype("Int64")
+        out[col] = s
+    return pd.DataFrame(out, index=df.index)
+
+
+def _copy_frame(cursor, table: str, df: pd.DataFrame) -> None:
+    cols = ", ".join(df.columns)
+    sql = f"COPY {table} ({cols}) FROM STDIN WITH (FORMAT csv, NULL '{NULL}')"
+    for start in range(0, len(df), CHUNK_ROWS):
+        buf = io.StringIO()
+        df.iloc[start : start + CHUNK_ROWS].to_csv(buf, header=False, index=False, na_rep=NULL)
+        buf.seek(0)
+        cursor.copy_expert(sql, buf)
+
+
+def copy_rows(conn, table: str, df: pd.DataFrame) -> int:
+    """COPY every row of `df` into `table` (columns matched by name) on `conn`'s transaction."""
+    if df.empty:
+        return 0
+    cur = conn.connection.cursor()
+    try:
+        _copy_frame(cur, table, _prepare(df))
+    finally:
+        cur.close()
+    return len(df)
+
+
+def copy_upsert(conn, table: str, df: pd.DataFrame, key_cols: list[str],
+                update_cols: list[str] | None = None, additive: bool = False) -> int:
+    """COPY into a temp table, then INSERT ... ON CONFLICT (key_cols).
+
+    With `update_cols` the conflicting rows are updated from the new values (or incremented by
+    them when `additive`), otherwise they are left alone (DO NOTHING). Rows are inserted in key
+    order so concurrent writers lock shared rows in the same order. Returns rows written.
+    """
+    if df.empty:
+        return 0
+    cols = list(df.columns)
+    tmp = f"tmp_{table.replace('.', '_')}_{next(_tmp_ids)}"
+    col_list = ", ".join(cols)
+    if update_cols and additive:
+        sets = ", ".join(f"{c} = {table}.{c} + EXCLUDED.{c}" for c in update_cols)
+        action = f"DO UPDATE SET {sets}"
+    elif update_cols:
+        sets = ", ".join(f"{c} = EXCLUDED.{c}" for c in update_cols)
+        action = f"DO UPDATE SET {sets}"
+    else:
+        action = "DO NOTHING"
+
+    cur = conn.connection.cursor()
+    try:
+        cur.execute(f"CREATE TEMP TABLE {tmp} ON COMMIT DROP AS SELECT {col_list} FROM {table} WITH NO DATA")
+        _copy_frame(cur, tmp, _prepare(df))
+        cur.execute(
+            f"INSERT INTO {table} ({col_list}) SELECT {col_list} FROM {tmp} "
+            f"ORDER BY {', '.join(key_cols)} ON CONFLICT ({', '.join(key_cols)}) {action}"
+        )
+        written = cur.rowcount
+        cur.execute(f"DROP TABLE {tmp}")
+    finally:
+        cur.close()
+    return written
+
+
+def copy_update(conn, table: str, df: pd.DataFrame, key_cols: list[str], update_cols: list[str]) -> int:
+    """COPY into a temp table, then UPDATE existing `table` rows matched on `key_cols`. Returns rows updated."""
+    if df.empty:
+        return 0
+    col_list = ", ".join(df.columns)
+    tmp = f"tmp_{table.replace('.', '_')}_{next(_tmp_ids)}"
+    sets = ", ".join(f"{c} = u.{c}" for c in update_cols)
+    match = " AND ".join(f"t.{c} = u.{c}" for c in key_cols)
+
+    cur = conn.connection.cursor()
+    try:
+        cur.execute(f"CREATE TEMP TABLE {tmp} ON COMMIT DROP AS SELECT {col_list} FROM {table} WITH NO DATA")
+        _copy_frame(cur, tmp, _prepare(df))
+        cur.execute(f"UPDATE {table} t SET {sets} FROM {tmp} u WHERE {match}")
+        written = cur.rowcount
+        cur.execute(f"DROP TABLE {tmp}")
+    finally:
+        cur.close()
+    return written
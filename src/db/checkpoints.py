@@ -0,0 +1,53 @@
+"""Per-source progress for resumable file loaders.
+
+A loader saves its checkpoint in the same transaction as the rows of a batch. After a crash, the
+saved byte offset is exactly the end of the last committed batch.
+"""
+from sqlalchemy import text
+
+
+def ensure_checkpoints(conn) -> None:
+    conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+              source TEXT PRIMARY KEY,          -- resolved file path
+              byte_offset BIGINT NOT NULL DEFAULT 0,
+              rows_read BIGINT NOT NULL DEFAULT 0,
+              rows_inserted BIGINT NOT NULL DEFAULT 0,
+              file_size BIGINT,
+              updated_at TIMESTAMP DEFAULT NOW()
+            )
+            """
+        )
+    )
+
+
+def load_checkpoint(conn, source: str) -> dict:
+    row = conn.execute(
+        text("SELECT byte_offset, rows_read, rows_inserted, file_size FROM ingest_checkpoints WHERE source = :s"),
+        {"s": source},
+    ).mappings().first()
+    return dict(row) if row else {"byte_offset": 0, "rows_read": 0, "rows_inserted": 0, "file_size": None}
+
+
+def save_checkpoint(conn, source: str, byte_offset: int, rows_read: int, rows_inserted: int, file_size: int) -> None:
+    conn.execute(
+        text(
+            """
+            INSERT INTO ingest_checkpoints (source, byte_offset, rows_read, rows_inserted, file_size, updated_at)
+            VALUES (:s, :o, :r, :i, :f, NOW())
+            ON CONFLICT (source) DO UPDATE
+              SET byte_offset = EXCLUDED.byte_offset,
+                  rows_read = EXCLUDED.rows_read,
+                  rows_inserted = EXCLUDED.rows_inserted,
+                  file_size = EXCLUDED.file_size,
+                  updated_at = NOW()
+            """
+        ),
+        {"s": source, "o": byte_offset, "r": rows_read, "i": rows_inserted, "f": file_size},
+    )
+
+
+def clear_checkpoint(conn, source: str) -> None:
+    conn.execute(text("DELETE FROM ingest_checkpoints WHERE source = :s"), {"s": source})
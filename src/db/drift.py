@@ -0,0 +1,258 @@
+"""Streaming per-product sentiment drift detection.
+
+`product_drift_state` holds a compact running state per product: a fast and a slow
+exponentially weighted mean of polarity, the slow EW variance, and fast / slow EW negative-label
+rates. Each newly scored review updates its product's state in O(1), inside the scoring job's
+write transaction (scripts/sentiment_vader.py write_results, so the batch job and the worker
+both feed it).
+
+After each batch a product's drift is the gap between the fast and slow means, in units of the
+standard error of the fast EWMA under the slow baseline (sigma**2 * a / (2 - a)):
+
+    polarity_z = (fast_polarity - slow_polarity) / se(slow_polarity_var)
+    negative_z = 2 * (asin(sqrt(fast_negative)) - asin(sqrt(slow_negative))) / se(1)
+    drift_score = max(-polarity_z, negative_z)          # > 0: sentiment got worse
+
+The negative rate is compared on the arcsine scale, where a rate's variance no longer depends
+on the rate itself, so a few negatives on a mostly positive product are not over-weighted.
+
+A score of at least Z_ALERT opens a row in `sentiment_alerts`, and the alert is resolved once
+the score falls below Z_CLEAR. Products with fewer than DRIFT_MIN_REVIEWS reviews are still
+warming up and are never alerted. `/alerts` reads the top movers from a partial index on
+drift_score, so ranking never scans the state table.
+"""
+import math
+
+import pandas as pd
+from sqlalchemy import text
+
+from src.db.bulk import copy_upsert
+from src.db.queries import DRIFT_HALF_LIFE, DRIFT_MIN_REVIEWS, METRICS_MODEL, SAME_REVIEW
+
+
+def half_life_alpha(reviews: float) -> float:
+    """EWMA weight whose influence halves after `reviews` observations."""
+    return 1 - 0.5 ** (1 / reviews)
+
+
+FAST_ALPHA = half_life_alpha(20)  # the last few dozen reviews
+SLOW_ALPHA = half_life_alpha(DRIFT_HALF_LIFE)  # the product's long-run baseline
+Z_ALERT = 4.0  # every product is re-tested after each batch: 3 sigma would fire ~0.1% of looks
+Z_CLEAR = 1.5  # hysteresis: an open alert resolves only well below the threshold
+MIN_SD = 0.05  # floor on the baseline polarity spread (uniform early ratings give ~0)
+
+STATE_COLS = ["reviews_seen", "fast_polarity", "slow_polarity", "slow_polarity_var", "fast_negative",
+              "slow_negative", "polarity_z", "negative_z", "drift_score", "open_alert_id", "last_review_date"]
+
+_FAST_SE = math.sqrt(FAST_ALPHA / (2 - FAST_ALPHA))
+
+
+def _exists(conn, table: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:t) IS NOT NULL"), {"t": table}).scalar()
+
+
+def ensure_drift_tables(conn) -> None:
+    """Create the state / alert tables; a freshly created state table is rebuilt from history."""
+    if _exists(conn, "product_drift_state"):
+        return
+    conn.exec_driver_sql(
+        f"""
+        CREATE TABLE IF NOT EXISTS product_drift_state (
+          product_id INT PRIMARY KEY REFERENCES products(product_id) ON DELETE CASCADE,
+          reviews_seen BIGINT NOT NULL DEFAULT 0,
+          fast_polarity DOUBLE PRECISION,
+          slow_polarity DOUBLE PRECISION,
+          slow_polarity_var DOUBLE PRECISION,
+          fast_negative DOUBLE PRECISION,
+          slow_negative DOUBLE PRECISION,
+          polarity_z DOUBLE PRECISION,
+          negative_z DOUBLE PRECISION,
+          drift_score DOUBLE PRECISION,
+          open_alert_id BIGINT,
+          last_review_date DATE
+        );
+        -- top movers, both directions, past warm-up only; the API repeats the predicate
+        CREATE INDEX IF NOT EXISTS idx_drift_rank ON product_drift_state (drift_score)
+          WHERE reviews_seen >= {DRIFT_MIN_REVIEWS};
+        CREATE TABLE IF NOT EXISTS sentiment_alerts (
+          alert_id BIGSERIAL PRIMARY KEY,
+          product_id INT NOT NULL REFERENCES products(product_id) ON DELETE CASCADE,
+          kind TEXT NOT NULL,                -- 'polarity' | 'negative_rate': the larger z
+          raised_at TIMESTAMP NOT NULL DEFAULT NOW(),
+          resolved_at TIMESTAMP,
+          drift_score DOUBLE PRECISION NOT NULL,
+          peak_score DOUBLE PRECISION NOT NULL,
+          fast_polarity DOUBLE PRECISION,
+          slow_polarity DOUBLE PRECISION,
+          fast_negative DOUBLE PRECISION,
+          slow_negative DOUBLE PRECISION,
+          reviews_seen BIGINT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_sentiment_alerts_open
+          ON sentiment_alerts (raised_at DESC) WHERE resolved_at IS NULL;
+        CREATE INDEX IF NOT EXISTS idx_sentiment_alerts_product ON sentiment_alerts (product_id, raised_at DESC);
+        """
+    )
+    rebuild_drift(conn)
+
+
+# --- State updates ---
+def new_state() -> dict:
+    return dict.fromkeys(STATE_COLS) | {"reviews_seen": 0}
+
+
+def observe(state: dict, polarity: float, negative: bool) -> None:
+    """Fold one review into a product's state (O(1)).
+
+    The n-th review gets weight max(alpha, 1 / n): until n reaches 1 / alpha the means and the
+    variance are plain cumulative ones, so the baseline is not anchored on the first review and
+    the variance does not start from zero. After that they are the usual EWMAs.
+    """
+    x, b = float(polarity), 1.0 if negative else 0.0
+    n = state["reviews_seen"] + 1
+    if n == 1:
+        state.update(fast_polarity=x, slow_polarity=x, slow_polarity_var=0.0, fast_negative=b, slow_negative=b)
+    else:
+        slow, fast = max(SLOW_ALPHA, 1 / n), max(FAST_ALPHA, 1 / n)
+        d = x - state["slow_polarity"]
+        state["slow_polarity"] += slow * d
+        state["slow_polarity_var"] = (1 - slow) * (state["slow_polarity_var"] + slow * d * d)
+        state["fast_polarity"] += fast * (x - state["fast_polarity"])
+        state["fast_negative"] += fast * (b - state["fast_negative"])
+        state["slow_negative"] += slow * (b - state["slow_negative"])
+    state["reviews_seen"] = n
+
+
+def _asin_sqrt(rate: float) -> float:
+    """Variance-stabilizing transform of a rate: var(2 * asin(sqrt(p_hat))) ~ 1 / n for any p."""
+    return math.asin(math.sqrt(min(max(rate, 0.0), 1.0)))
+
+
+def score(state: dict) -> None:
+    """Recompute the z-scores and drift_score from the running means."""
+    sd = max(math.sqrt(state["slow_polarity_var"]), MIN_SD)
+    state["polarity_z"] = (state["fast_polarity"] - state["slow_polarity"]) / (sd * _FAST_SE)
+    state["negative_z"] = 2 * (_asin_sqrt(state["fast_negative"]) - _asin_sqrt(state["slow_negative"])) / _FAST_SE
+    state["drift_score"] = max(-state["polarity_z"], state["negative_z"])
+
+
+def observe_frame(states: dict[int, dict], rows: pd.DataFrame) -> None:
+    """Fold scored rows (product_id, review_date, review_id, polarity, label) into `states` in
+    review order, creating missing states; then rescore each touched product once."""
+    rows = rows.sort_values(["review_date", "review_id"], na_position="first")
+    negative = (rows["label"] == "negative").to_numpy()
+    for pid, pol, neg, day in zip(rows["product_id"].to_numpy(), pd.to_numeric(rows["polarity"]).to_numpy(),
+                                  negative, rows["review_date"]):
+        state = states.setdefault(int(pid), new_state())
+        observe(state, pol, neg)
+        if pd.notna(day):
+            state["last_review_date"] = pd.Timestamp(day).date()
+    for pid in rows["product_id"].unique():
+        score(states[int(pid)])
+
+
+def _alert_transitions(conn, states: dict[int, dict]) -> None:
+    """Open, refresh or resolve alerts for the products in `states` (their rows are locked)."""
+    for pid, s in states.items():
+        warm = s["reviews_seen"] >= DRIFT_MIN_REVIEWS
+        if s["open_alert_id"] is None and warm and s["drift_score"] >= Z_ALERT:
+            kind = "polarity" if -s["polarity_z"] >= s["negative_z"] else "negative_rate"
+            s["open_alert_id"] = conn.execute(
+                text(
+                    """
+                    INSERT INTO sentiment_alerts (product_id, kind, drift_score, peak_score, fast_polarity,
+                                                  slow_polarity, fast_negative, slow_negative, reviews_seen)
+                    VALUES (:pid, :kind, :score, :score, :fp, :sp, :fn, :sn, :n)
+                    RETURNING alert_id
+                    """
+                ),
+                {"pid": pid, "kind": kind, "score": s["drift_score"], "fp": s["fast_polarity"],
+                 "sp": s["slow_polarity"], "fn": s["fast_negative"], "sn": s["slow_negative"], "n": s["reviews_seen"]},
+            ).scalar()
+        elif s["open_alert_id"] is not None:
+            resolved = s["drift_score"] < Z_CLEAR
+            conn.execute(
+                text(
+                    """
+                    UPDATE sentiment_alerts
+                    SET drift_score = :score, peak_score = GREATEST(peak_score, :score),
+                        resolved_at = CASE WHEN :resolved THEN NOW() END
+                    WHERE alert_id = :id
+                    """
+                ),
+                {"score": s["drift_score"], "resolved": resolved, "id": s["open_alert_id"]},
+            )
+            if resolved:
+                s["open_alert_id"] = None
+
+
+def update_drift(conn, scored: pd.DataFrame) -> None:
+    """Fold newly written sentiment rows into product_drift_state and raise / resolve alerts.
+
+    Call in the transaction that writes the rows. The touched state rows are locked in
+    product_id order, so concurrent scorers update a product one after the other.
+    """
+    if scored.empty:
+        return
+    pids = sorted({int(p) for p in scored["product_id"]})
+    conn.execute(
+        text("INSERT INTO product_drift_state (product_id) SELECT unnest(CAST(:p AS INT[])) ON CONFLICT DO NOTHING"),
+        {"p": pids},
+    )
+    rows = conn.execute(
+        text(
+            f"""
+            SELECT product_id, {", ".join(STATE_COLS)}
+            FROM product_drift_state
+            WHERE product_id = ANY(:p)
+            ORDER BY product_id
+            FOR UPDATE
+            """
+        ),
+        {"p": pids},
+    ).mappings().all()
+    states = {r["product_id"]: {c: r[c] for c in STATE_COLS} for r in rows}
+    observe_frame(states, scored)
+    _alert_transitions(conn, states)
+    write_states(conn, states)
+
+
+def write_states(conn, states: dict[int, dict]) -> int:
+    df = pd.DataFrame.from_dict(states, orient="index", columns=STATE_COLS).rename_axis("product_id").reset_index()
+    df["open_alert_id"] = df["open_alert_id"].astype("Int64")
+    return copy_upsert(conn, "product_drift_state", df, ["product_id"], STATE_COLS)
+
+
+def rebuild_drift(conn, chunk_rows: int = 200_000) -> int:
+    """Replay every review's latest result into fresh drift states. Returns products written.
+
+    No alerts are raised during the replay; alerts still open are re-linked to their product's
+    state and resolve (or stay open) with the next scored review.
+    """
+    conn.execute(text("LOCK TABLE product_drift_state IN EXCLUSIVE MODE"))
+    conn.execute(text("DELETE FROM product_drift_state"))
+    sql = f"""
+        SELECT r.product_id, r.review_date, s.review_id, s.polarity, s.label
+        FROM (
+            SELECT DISTINCT ON (review_id) review_id, review_date, polarity, label
+            FROM sentiment_results
+            WHERE model = :m
+            ORDER BY review_id, sentiment_id DESC
+        ) s
+        JOIN reviews r ON {SAME_REVIEW}
+        ORDER BY r.product_id, r.review_date NULLS FIRST, s.review_id
+    """
+    states: dict[int, dict] = {}
+    for chunk in pd.read_sql(text(sql), conn, params={"m": METRICS_MODEL}, chunksize=chunk_rows):
+        observe_frame(states, chunk)
+    write_states(conn, states)
+    conn.execute(
+        text(
+            """
+            UPDATE product_drift_state d SET open_alert_id = a.alert_id
+            FROM sentiment_alerts a
+            WHERE a.product_id = d.product_id AND a.resolved_at IS NULL
+            """
+        )
+    )
+    return len(states)
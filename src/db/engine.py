@@ -0,0 +1,13 @@
+"""Sync engine for the batch scripts, built from the shared settings on first use."""
+from functools import lru_cache
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+from src.config.settings import get_settings
+
+
+@lru_cache(maxsize=None)
+def get_engine(url: str | None = None) -> Engine:
+    """One pooled engine per URL (default: DATABASE_URL) for the life of the process."""
+    return create_engine(url or get_settings().database_url, future=True, pool_pre_ping=True)
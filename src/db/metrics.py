@@ -0,0 +1,253 @@
+"""Incrementally maintained per-product aggregates.
+
+`product_stats` holds running counts and sums per product so the API can serve metrics in
+O(products) instead of re-aggregating reviews x sentiment_results on every request.
+`product_rollups` holds the same counters per product and day/week/month bucket for trend
+charts; bucket keys follow the ai_summaries.time_window convention ('2025-07', '2025-W31').
+
+Loaders apply deltas for the products they touch in the same transaction as their writes;
+`rebuild_aggregates()` recomputes everything from scratch for repairs.
+"""
+import pandas as pd
+from sqlalchemy import text
+
+from src.db.bulk import copy_upsert
+from src.db.queries import METRICS_MODEL
+
+REVIEW_COLS = ["review_count", "rating_count", "rating_sum"]
+SENTIMENT_COLS = ["scored_count", "polarity_sum", "positive_count", "neutral_count", "negative_count"]
+GRANULARITIES = ("day", "week", "month")
+
+_COUNTERS_DDL = """
+              review_count BIGINT NOT NULL DEFAULT 0,
+              rating_count BIGINT NOT NULL DEFAULT 0,
+              rating_sum BIGINT NOT NULL DEFAULT 0,
+              scored_count BIGINT NOT NULL DEFAULT 0,
+              polarity_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+              positive_count BIGINT NOT NULL DEFAULT 0,
+              neutral_count BIGINT NOT NULL DEFAULT 0,
+              negative_count BIGINT NOT NULL DEFAULT 0
+"""
+
+
+def _counters_select(results_filter: str = "") -> str:
+    """Counter columns over reviews r joined to each review's latest result for :m.
+
+    `results_filter` narrows the sentiment_results scan (e.g. to the months being retracted).
+    """
+    return f"""
+                   COUNT(*),
+                   COUNT(r.rating),
+                   COALESCE(SUM(r.rating), 0),
+                   COUNT(s.review_id),
+                   COALESCE(SUM(s.polarity), 0),
+                   COUNT(*) FILTER (WHERE s.label = 'positive'),
+                   COUNT(*) FILTER (WHERE s.label = 'neutral'),
+                   COUNT(*) FILTER (WHERE s.label = 'negative')
+            FROM reviews r
+            LEFT JOIN (
+                SELECT DISTINCT ON (review_id) review_id, polarity, label
+                FROM sentiment_results
+                WHERE model = :m {results_filter}
+                ORDER BY review_id, sentiment_id DESC
+            ) s ON s.review_id = r.review_id
+    """
+
+
+_BUCKETS = """
+            CROSS JOIN LATERAL (VALUES
+                ('day',   to_char(r.review_date, 'YYYY-MM-DD'),  r.review_date),
+                ('week',  to_char(r.review_date, 'IYYY-"W"IW'),  date_trunc('week', r.review_date)::date),
+                ('month', to_char(r.review_date, 'YYYY-MM'),     date_trunc('month', r.review_date)::date)
+            ) AS g(granularity, bucket, bucket_start)
+"""
+
+
+def _exists(conn, table: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:t) IS NOT NULL"), {"t": table}).scalar()
+
+
+def ensure_aggregates(conn) -> None:
+    """Create product_stats / product_rollups if needed; a freshly created table is rebuilt."""
+    if not _exists(conn, "product_stats"):
+        conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS product_stats (
+              product_id INT PRIMARY KEY REFERENCES products(product_id) ON DELETE CASCADE,
+              {_COUNTERS_DDL}
+            );
+        """))
+        rebuild_product_stats(conn)
+    if not _exists(conn, "product_rollups"):
+        conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS product_rollups (
+              product_id INT NOT NULL REFERENCES products(product_id) ON DELETE CASCADE,
+              granularity TEXT NOT NULL,    -- 'day' | 'week' | 'month'
+              bucket TEXT NOT NULL,         -- '2025-07-14' | '2025-W31' | '2025-07'
+              bucket_start DATE NOT NULL,
+              {_COUNTERS_DDL},
+              PRIMARY KEY (product_id, granularity, bucket)
+            );
+        """))
+        rebuild_product_rollups(conn)
+
+
+def rebuild_product_stats(conn) -> int:
+    """Recompute product_stats from reviews + sentiment_results. Returns products written.
+
+    The EXCLUSIVE lock makes concurrent loaders wait on their delta step, so their rows are
+    either in the rebuild snapshot or applied as deltas after it commits, never both.
+    """
+    conn.execute(text("LOCK TABLE product_stats IN EXCLUSIVE MODE"))
+    conn.execute(text("DELETE FROM product_stats"))
+    return conn.execute(
+        text(
+            f"""
+            INSERT INTO product_stats (product_id, {", ".join(REVIEW_COLS + SENTIMENT_COLS)})
+            SELECT r.product_id,
+            {_counters_select()}
+            GROUP BY r.product_id
+            """
+        ),
+        {"m": METRICS_MODEL},
+    ).rowcount
+
+
+def rebuild_product_rollups(conn) -> int:
+    """Recompute product_rollups for every granularity. Returns bucket rows written."""
+    conn.execute(text("LOCK TABLE product_rollups IN EXCLUSIVE MODE"))
+    conn.execute(text("DELETE FROM product_rollups"))
+    return conn.execute(
+        text(
+            f"""
+            INSERT INTO product_rollups (product_id, granularity, bucket, bucket_start,
+                                         {", ".join(REVIEW_COLS + SENTIMENT_COLS)})
+            SELECT r.product_id, g.granularity, g.bucket, g.bucket_start,
+            {_counters_select()}
+            {_BUCKETS}
+            WHERE r.review_date IS NOT NULL
+            GROUP BY r.product_id, g.granularity, g.bucket, g.bucket_start
+            """
+        ),
+        {"m": METRICS_MODEL},
+    ).rowcount
+
+
+def rebuild_aggregates(conn) -> tuple[int, int]:
+    return rebuild_product_stats(conn), rebuild_product_rollups(conn)
+
+
+def retract_reviews(conn, start, end) -> int:
+    """Subtract reviews dated in [start, end) and their latest results from the aggregates.
+
+    Run before those rows are dropped (partition retention). Week buckets that straddle `start`
+    or `end` keep their other days. Returns product_stats rows changed.
+    """
+    cols = REVIEW_COLS + SENTIMENT_COLS
+    sets = ", ".join(f"{c} = p.{c} - d.{c}" for c in cols)
+    counters = _counters_select("AND review_date >= :start AND review_date < :end")
+    window = "r.review_date >= :start AND r.review_date < :end"
+    params = {"m": METRICS_MODEL, "start": start, "end": end}
+    changed = conn.execute(
+        text(
+            f"""
+            UPDATE product_stats p
+            SET {sets}
+            FROM (
+                SELECT r.product_id,
+                {counters}
+                WHERE {window}
+                GROUP BY r.product_id
+            ) AS d(product_id, {", ".join(cols)})
+            WHERE p.product_id = d.product_id
+            """
+        ),
+        params,
+    ).rowcount
+    conn.execute(
+        text(
+            f"""
+            UPDATE product_rollups p
+            SET {sets}
+            FROM (
+                SELECT r.product_id, g.granularity, g.bucket,
+                {counters}
+                {_BUCKETS}
+                WHERE {window}
+                GROUP BY r.product_id, g.granularity, g.bucket
+            ) AS d(product_id, granularity, bucket, {", ".join(cols)})
+            WHERE p.product_id = d.product_id AND p.granularity = d.granularity AND p.bucket = d.bucket
+            """
+        ),
+        params,
+    )
+    conn.execute(
+        text("DELETE FROM product_rollups WHERE bucket_start < :end AND review_count = 0 AND scored_count = 0"),
+        {"end": end},
+    )
+    return changed
+
+
+def bucket_keys(dates: pd.Series) -> dict[str, tuple[pd.Series, pd.Series]]:
+    """(bucket, bucket_start) per row for each granularity, matching the SQL in the rebuild."""
+    d = pd.to_datetime(dates).dt.normalize()
+    iso = d.dt.isocalendar()
+    return {
+        "day": (d.dt.strftime("%Y-%m-%d"), d.dt.date),
+        "week": (
+            iso["year"].astype(str) + "-W" + iso["week"].astype(str).str.zfill(2),
+            (d - pd.to_timedelta(d.dt.weekday, unit="D")).dt.date,
+        ),
+        "month": (d.dt.strftime("%Y-%m"), d.dt.to_period("M").dt.start_time.dt.date),
+    }
+
+
+def _apply(conn, rows: pd.DataFrame, cols: list[str]) -> None:
+    """Sum per-row counters into product_stats and, for dated rows, product_rollups."""
+    stats = rows.groupby("product_id", as_index=False)[cols].sum()
+    copy_upsert(conn, "product_stats", stats, ["product_id"], cols, additive=True)
+
+    dated = rows[rows["review_date"].notna()]
+    if dated.empty:
+        return
+    parts = []
+    for granularity, (bucket, start) in bucket_keys(dated["review_date"]).items():
+        parts.append(dated[["product_id"] + cols].assign(
+            granularity=granularity, bucket=bucket.to_numpy(), bucket_start=start.to_numpy()))
+    keys = ["product_id", "granularity", "bucket", "bucket_start"]
+    rollups = pd.concat(parts).groupby(keys, as_index=False)[cols].sum()
+    copy_upsert(conn, "product_rollups", rollups, keys[:3], cols, additive=True)
+
+
+def apply_review_deltas(conn, reviews: pd.DataFrame) -> None:
+    """Add newly inserted reviews (product_id, rating, review_date) to the aggregates."""
+    if reviews.empty:
+        return
+    rating = pd.to_numeric(reviews["rating"], errors="coerce")
+    rows = pd.DataFrame(
+        {
+            "product_id": reviews["product_id"].to_numpy(),
+            "review_date": pd.to_datetime(reviews["review_date"], errors="coerce").to_numpy(),
+            "review_count": 1,
+            "rating_count": rating.notna().to_numpy(dtype=int),
+            "rating_sum": rating.fillna(0).to_numpy(),
+        }
+    )
+    _apply(conn, rows, REVIEW_COLS)
+
+
+def apply_sentiment_deltas(conn, scored: pd.DataFrame) -> None:
+    """Add newly written sentiment rows (product_id, review_date, polarity, label) to the aggregates."""
+    if scored.empty:
+        return
+    rows = pd.DataFrame(
+        {
+            "product_id": scored["product_id"].to_numpy(),
+            "review_date": pd.to_datetime(scored["review_date"], errors="coerce").to_numpy(),
+            "scored_count": 1,
+            "polarity_sum": pd.to_numeric(scored["polarity"]).to_numpy(),
+            "positive_count": (scored["label"] == "positive").to_numpy(dtype=int),
+            "neutral_count": (scored["label"] == "neutral").to_numpy(dtype=int),
+            "negative_count": (scored["label"] == "negative").to_numpy(dtype=int),
+        }
+    )
+    _apply(conn, rows, SENTIMENT_COLS)
@@ -0,0 +1,379 @@
+"""Monthly range partitions of reviews and sentiment_results on review_date.
+
+    reviews            -> reviews_2025_07, reviews_2025_08, ..., reviews_default
+    sentiment_results  -> sentiment_results_2025_07, ...,       sentiment_results_default
+
+sentiment_results keeps a copy of its review's review_date, so both tables split on the same
+month boundaries. Month M of sentiment_results only references month M of reviews. Retention
+and resets drop (or detach) a month of both tables instead of DELETEing it row by row, and
+date-filtered reads scan only the months they ask for. Undated reviews, and reviews dated in a
+month without a partition, land in the `_default` partitions. Loaders call
+`ensure_partitions_for()` with each batch's dates before writing, so in practice the default
+partitions only hold undated rows.
+
+A unique index on a partitioned table must include the partition key. The keys therefore
+become (review_id, review_date) and (sentiment_id, review_date), and the ids stay unique
+through their sequences. The composite foreign key does not cover undated rows: a NULL
+review_date is never checked or cascaded.
+
+`migrate_to_partitions()` converts an existing unpartitioned database in place (see
+scripts/partition_tables.py).
+"""
+import re
+from datetime import date
+
+import pandas as pd
+from sqlalchemy import text
+
+from src.db.metrics import retract_reviews
+
+TABLES = ("reviews", "sentiment_results")  # referenced table first
+MONTHS_AHEAD = 3  # empty future months created by the migration
+OLD_SUFFIX = "_unpartitioned"
+
+_MONTH_NAME = re.compile(r"_(\d{4})_(\d{2})$")
+
+
+def month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def next_month(m: date) -> date:
+    return date(m.year + m.month // 12, m.month % 12 + 1, 1)
+
+
+def upcoming_months(ahead: int) -> list[date]:
+    """This month and the `ahead` months after it."""
+    months = [month_start(date.today())]
+    for _ in range(ahead):
+        months.append(next_month(months[-1]))
+    return months
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+
+def is_partitioned(conn, table: str = "reviews") -> bool:
+    return conn.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t))"),
+        {"t": table},
+    ).scalar()
+
+
+def list_months(conn, table: str = "reviews") -> list[date]:
+    """Months that have their own partition of `table`, oldest first."""
+    names = conn.execute(
+        text(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(:t)
+            """
+        ),
+        {"t": table},
+    ).scalars()
+    months = []
+    for name in names:
+        m = _MONTH_NAME.search(name)
+        if m and name == partition_name(table, date(int(m[1]), int(m[2]), 1)):
+            months.append(date(int(m[1]), int(m[2]), 1))
+    return sorted(months)
+
+
+def _insert_cols(conn, table: str) -> list[str]:
+    """Columns an INSERT may name (generated columns such as review_tsv are computed)."""
+    return conn.execute(
+        text(
+            """
+            SELECT column_name
+            FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = :t AND is_generated = 'NEVER'
+            ORDER BY ordinal_position
+            """
+        ),
+        {"t": table},
+    ).scalars().all()
+
+
+# --- sentiment_results.review_date ---
+def ensure_sentiment_dates(conn) -> None:
+    """Add sentiment_results.review_date (the partition key) and fill it for existing rows."""
+    missing = not conn.execute(
+        text(
+            """
+            SELECT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_schema = current_schema()
+                  AND table_name = 'sentiment_results' AND column_name = 'review_date'
+            )
+            """
+        )
+    ).scalar()
+    if not missing:
+        return
+    conn.execute(text("ALTER TABLE sentiment_results ADD COLUMN review_date DATE"))
+    conn.execute(
+        text(
+            """
+            UPDATE sentiment_results s
+            SET review_date = r.review_date
+            FROM reviews r
+            WHERE r.review_id = s.review_id AND r.review_date IS NOT NULL
+            """
+        )
+    )
+
+
+# --- Month partitions ---
+def _default_has_rows(conn, table: str, month: date) -> bool:
+    return conn.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {table}_default WHERE review_date >= :lo AND review_date < :hi)"),
+        {"lo": month, "hi": next_month(month)},
+    ).scalar()
+
+
+def _split_default(conn, month: date) -> None:
+    """Move `month`'s rows out of the default partitions into new month partitions.
+
+    A month cannot be attached while the default partition holds rows for it. The rows are
+    moved into standalone tables first. sentiment_results goes first, so deleting reviews from
+    the default partition cascades to nothing. Then both tables are attached, reviews first,
+    so the foreign key check on attach finds its parent rows.
+    """
+    bounds = {"lo": month, "hi": next_month(month)}
+    for table in reversed(TABLES):
+        name = partition_name(table, month)
+        cols = ", ".join(_insert_cols(conn, table))
+        conn.execute(text(
+            f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS)"
+        ))
+        conn.execute(
+            text(
+                f"""
+                WITH moved AS (
+                    DELETE FROM {table}_default
+                    WHERE review_date >= :lo AND review_date < :hi
+                    RETURNING {cols}
+                )
+                INSERT INTO {name} ({cols}) SELECT {cols} FROM moved
+                """
+            ),
+            bounds,
+        )
+    for table in TABLES:
+        conn.execute(text(
+            f"ALTER TABLE {table} ATTACH PARTITION {partition_name(table, month)} "
+            f"FOR VALUES FROM ('{bounds['lo']}') TO ('{bounds['hi']}')"
+        ))
+
+
+def ensure_month_partitions(conn, months) -> list[date]:
+    """Create the partitions of both tables for every month in `months` that lacks one.
+
+    Returns the months created. Does nothing while the tables are not partitioned.
+    """
+    if not is_partitioned(conn):
+        return []
+    have = set(list_months(conn))
+    created = []
+    for month in sorted({month_start(m) for m in months} - have):
+        if _default_has_rows(conn, "reviews", month) or _default_has_rows(conn, "sentiment_results", month):
+            _split_default(conn, month)
+        else:
+            for table in TABLES:
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{month}') TO ('{next_month(month)}')"
+                ))
+        created.append(month)
+    return created
+
+
+def ensure_partitions_for(conn, dates) -> list[date]:
+    """Create the month partitions a batch of review dates will be routed to."""
+    months = pd.to_datetime(pd.Series(dates), errors="coerce").dropna().dt.to_period("M").unique()
+    return ensure_month_partitions(conn, [m.start_time.date() for m in months])
+
+
+# --- Retention ---
+def _detach(conn, month: date) -> None:
+    """Detach a month of both tables, keeping them as standalone tables (for archiving)."""
+    results, reviews = partition_name("sentiment_results", month), partition_name("reviews", month)
+    conn.execute(text(f"ALTER TABLE sentiment_results DETACH PARTITION {results}"))
+    # the detached results keep a foreign key to the reviews parent, which would block detaching
+    # their reviews; the pair is archived together, so the constraint is dropped
+    fks = conn.execute(
+        text("SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:t) AND contype = 'f'"),
+        {"t": results},
+    ).scalars().all()
+    for fk in fks:
+        conn.execute(text(f'ALTER TABLE {results} DROP CONSTRAINT "{fk}"'))
+    conn.execute(text(f"ALTER TABLE reviews DETACH PARTITION {reviews}"))
+
+
+def drop_months(conn, months, detach: bool = False) -> list[date]:
+    """Drop (or detach) whole months of reviews and their sentiment_results.
+
+    Leaves the aggregates alone; see drop_months_before().
+    """
+    dropped = []
+    for month in sorted(months):
+        # a partition of reviews cannot be dropped while attached: the per-partition pieces of
+        # the sentiment_results foreign key depend on it, so both are detached first
+        _detach(conn, month)
+        if not detach:
+            for table in reversed(TABLES):  # results first: they referenced the reviews
+                conn.execute(text(f"DROP TABLE {partition_name(table, month)}"))
+        dropped.append(month)
+    return dropped
+
+
+def drop_months_before(conn, before: date, detach: bool = False) -> list[date]:
+    """Retention: remove every month partition older than the month of `before`.
+
+    The reviews and latest results in those months are first subtracted from product_stats /
+    product_rollups, so the aggregates keep matching the remaining rows. Undated reviews in the
+    default partition are kept. Returns the months removed.
+    """
+    old = [m for m in list_months(conn) if m < month_start(before)]
+    for month in old:
+        retract_reviews(conn, month, next_month(month))
+    return drop_months(conn, old, detach)
+
+
+def clear_partitions(conn) -> list[date]:
+    """Reset: drop every month of both tables and empty the default partitions."""
+    dropped = drop_months(conn, list_months(conn))
+    for table in reversed(TABLES):
+        conn.execute(text(f"DELETE FROM {table}_default"))
+    return dropped
+
+
+# --- In-place migration ---
+def _dependent_views(conn) -> list[dict]:
+    """Views / materialized views reading either table, in creation order."""
+    return conn.execute(
+        text(
+            """
+            SELECT DISTINCT v.oid, v.oid::regclass::text AS name, v.relkind, pg_get_viewdef(v.oid) AS body
+            FROM pg_depend d
+            JOIN pg_rewrite w ON w.oid = d.objid
+            JOIN pg_class v ON v.oid = w.ev_class
+            WHERE d.classid = 'pg_rewrite'::regclass
+              AND d.refobjid IN ('reviews'::regclass, 'sentiment_results'::regclass)
+              AND v.oid <> d.refobjid
+            ORDER BY v.oid
+            """
+        )
+    ).mappings().all()
+
+
+def _index_defs(conn, table: str) -> list[str]:
+    """CREATE INDEX statements for `table`'s indexes that do not back a constraint.
+
+    Unique indexes gain review_date, which a partitioned table requires.
+    """
+    rows = conn.execute(
+        text(
+            """
+            SELECT pg_get_indexdef(x.indexrelid) AS ddl, x.indisunique AS is_unique
+            FROM pg_index x
+            WHERE x.indrelid = to_regclass(:t)
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+            """
+        ),
+        {"t": table},
+    ).mappings().all()
+    out = []
+    for row in rows:
+        ddl = row["ddl"]
+        if row["is_unique"] and "review_date" not in ddl:
+            ddl = re.sub(r"(USING \w+ \()(.*?)\)", r"\1\2, review_date)", ddl, count=1)
+        out.append(ddl)
+    return out
+
+
+def _trigger_defs(conn, table: str) -> list[str]:
+    return conn.execute(
+        text("SELECT pg_get_triggerdef(oid) FROM pg_trigger WHERE tgrelid = to_regclass(:t) AND NOT tgisinternal"),
+        {"t": table},
+    ).scalars().all()
+
+
+def migrate_to_partitions(conn, months_ahead: int = MONTHS_AHEAD) -> dict | None:
+    """Rebuild reviews and sentiment_results as month-partitioned tables, keeping every row.
+
+    Runs in the caller's transaction and holds ACCESS EXCLUSIVE locks on both tables until it
+    commits, so stop loaders and the API first. Sequences, indexes, triggers and dependent
+    views are carried over. Grants and comments on the old tables are not. Returns row and
+    partition counts, or None if the tables are already partitioned.
+    """
+    if is_partitioned(conn):
+        return None
+    conn.execute(text("LOCK TABLE reviews, sentiment_results IN ACCESS EXCLUSIVE MODE"))
+    conn.execute(text("ALTER TABLE sentiment_results ADD COLUMN IF NOT EXISTS review_date DATE"))
+
+    # captured while the old tables still carry their names, so the DDL names the new ones
+    views = _dependent_views(conn)
+    indexes = [ddl for table in TABLES for ddl in _index_defs(conn, table)]
+    triggers = [ddl for table in TABLES for ddl in _trigger_defs(conn, table)]
+    sequences = {
+        table: conn.execute(text("SELECT pg_get_serial_sequence(:t, :c)"), {"t": table, "c": col}).scalar()
+        for table, col in (("reviews", "review_id"), ("sentiment_results", "sentiment_id"))
+    }
+    for view in reversed(views):
+        kind = "MATERIALIZED VIEW" if view["relkind"] == "m" else "VIEW"
+        conn.execute(text(f"DROP {kind} {view['name']}"))
+    for table, seq in sequences.items():
+        if seq:
+            conn.execute(text(f"ALTER SEQUENCE {seq} OWNED BY NONE"))  # survives dropping the old table
+        conn.execute(text(f"ALTER TABLE {table} RENAME TO {table}{OLD_SUFFIX}"))
+        conn.execute(text(
+            f"CREATE TABLE {table} (LIKE {table}{OLD_SUFFIX} INCLUDING DEFAULTS INCLUDING GENERATED "
+            f"INCLUDING CONSTRAINTS) PARTITION BY RANGE (review_date)"
+        ))
+    conn.exec_driver_sql(
+        """
+        ALTER TABLE reviews ADD UNIQUE (review_id, review_date);
+        ALTER TABLE reviews ADD FOREIGN KEY (product_id) REFERENCES products(product_id) ON DELETE CASCADE;
+        ALTER TABLE sentiment_results ADD UNIQUE (sentiment_id, review_date);
+        ALTER TABLE sentiment_results ADD FOREIGN KEY (review_id, review_date)
+          REFERENCES reviews (review_id, review_date) ON DELETE CASCADE;
+        CREATE TABLE reviews_default PARTITION OF reviews DEFAULT;
+        CREATE TABLE sentiment_results_default PARTITION OF sentiment_results DEFAULT;
+        """
+    )
+
+    months = conn.execute(
+        text(f"SELECT DISTINCT date_trunc('month', review_date)::date FROM reviews{OLD_SUFFIX} "
+             "WHERE review_date IS NOT NULL")
+    ).scalars().all()
+    created = ensure_month_partitions(conn, months + upcoming_months(months_ahead))
+
+    cols = _insert_cols(conn, "reviews")
+    copied = {"reviews": conn.execute(text(
+        f"INSERT INTO reviews ({', '.join(cols)}) SELECT {', '.join(cols)} FROM reviews{OLD_SUFFIX}"
+    )).rowcount}
+    cols = _insert_cols(conn, "sentiment_results")
+    picked = ", ".join("r.review_date" if c == "review_date" else f"s.{c}" for c in cols)
+    copied["sentiment_results"] = conn.execute(text(
+        f"INSERT INTO sentiment_results ({', '.join(cols)}) SELECT {picked} "
+        f"FROM sentiment_results{OLD_SUFFIX} s JOIN reviews{OLD_SUFFIX} r ON r.review_id = s.review_id"
+    )).rowcount
+
+    for table in reversed(TABLES):
+        conn.execute(text(f"DROP TABLE {table}{OLD_SUFFIX}"))  # takes its indexes and triggers along
+    for table, seq in sequences.items():
+        if seq:
+            col = "review_id" if table == "reviews" else "sentiment_id"
+            conn.execute(text(f"ALTER SEQUENCE {seq} OWNED BY {table}.{col}"))
+    # captured DDL goes to the driver as is: literals in it may contain ':'
+    for ddl in indexes + triggers:
+        conn.exec_driver_sql(ddl)
+    for view in views:
+        kind = "MATERIALIZED VIEW" if view["relkind"] == "m" else "VIEW"
+        conn.exec_driver_sql(f"CREATE {kind} {view['name']} AS {view['body']}")
+    conn.execute(text("ANALYZE reviews, sentiment_results"))
+    return {**copied, "months": len(created)}
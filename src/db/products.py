@@ -0,0 +1,126 @@
+"""Merge of the stg_products staging table into products.
+
+Every staged row gets a `source_key` (product_page_url, falling back to the title) and an md5
+`content_hash` over its columns. data_collected_at is left out of the hash because it changes
+on every scrape. One INSERT ... ON CONFLICT (source_key) statement inserts new keys and updates
+only the rows whose hash differs. Re-loading an unchanged scrape writes no product rows, so it
+leaves no dead tuples or WAL behind.
+"""
+from sqlalchemy import text
+
+# staged columns that identify the product / go into metadata_json, in hash order
+TITLE_COL = "product_title"
+CATEGORY_COL = "product_category"
+METADATA_COLS = (
+    "product_rating",
+    "total_reviews",
+    "purchased_last_month",
+    "discounted_price",
+    "original_price",
+    "discount_percentage",
+    "is_best_seller",
+    "is_sponsored",
+    "has_coupon",
+    "buy_box_availability",
+    "delivery_date",
+    "sustainability_tags",
+    "product_image_url",
+    "product_page_url",
+)
+SOURCE_KEY = "COALESCE(NULLIF(product_page_url, ''), product_title)"
+
+
+def ensure_product_keys(conn) -> None:
+    """Add source_key / content_hash to products and key rows loaded before they existed."""
+    conn.exec_driver_sql(
+        """
+        ALTER TABLE products ADD COLUMN IF NOT EXISTS source_key TEXT;
+        ALTER TABLE products ADD COLUMN IF NOT EXISTS content_hash TEXT;
+        ALTER TABLE products ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+        CREATE TABLE IF NOT EXISTS product_merge_log (
+          merge_id BIGSERIAL PRIMARY KEY,
+          merged_at TIMESTAMP NOT NULL DEFAULT NOW(),
+          staged INT NOT NULL,
+          inserted INT NOT NULL,
+          updated INT NOT NULL,
+          unchanged INT NOT NULL
+        );
+        """
+    )
+    # older rows: key by page URL (or title); the lowest product_id wins a duplicate key
+    conn.execute(
+        text(
+            """
+            UPDATE products p
+            SET source_key = k.key
+            FROM (
+                SELECT DISTINCT ON (key) product_id, key
+                FROM (
+                    SELECT product_id, COALESCE(NULLIF(metadata_json->>'product_page_url', ''), title) AS key
+                    FROM products
+                    WHERE source_key IS NULL
+                ) x
+                ORDER BY key, product_id
+            ) k
+            WHERE p.product_id = k.product_id
+              AND NOT EXISTS (SELECT 1 FROM products q WHERE q.source_key = k.key)
+            """
+        )
+    )
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS idx_products_source_key ON products (source_key)"))
+
+
+def _merge_sql() -> str:
+    hashed = ", ".join((TITLE_COL, CATEGORY_COL) + METADATA_COLS)
+    metadata = ", ".join(f"'{c}', {c}" for c in METADATA_COLS)
+    return f"""
+        WITH staged AS (
+            SELECT DISTINCT ON (source_key) *
+            FROM (
+                SELECT {SOURCE_KEY} AS source_key,
+                       {TITLE_COL} AS title,
+                       {CATEGORY_COL} AS category,
+                       jsonb_strip_nulls(jsonb_build_object({metadata})) AS metadata_json,
+                       md5(ROW({hashed})::text) AS content_hash,
+                       data_collected_at
+                FROM stg_products
+                WHERE {TITLE_COL} IS NOT NULL
+            ) s
+            ORDER BY source_key, data_collected_at DESC NULLS LAST  -- latest scrape wins a duplicate
+        ),
+        merged AS (
+            INSERT INTO products AS p (source_key, title, category, metadata_json, content_hash, updated_at)
+            SELECT source_key, title, category, metadata_json, content_hash, NOW()
+            FROM staged
+            ON CONFLICT (source_key) DO UPDATE
+              SET title = EXCLUDED.title,
+                  category = EXCLUDED.category,
+                  metadata_json = EXCLUDED.metadata_json,
+                  content_hash = EXCLUDED.content_hash,
+                  updated_at = EXCLUDED.updated_at
+              WHERE p.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+            RETURNING (xmax = 0) AS inserted  -- xmax is 0 only for freshly inserted tuples
+        )
+        SELECT (SELECT COUNT(*) FROM staged) AS staged,
+               COUNT(*) FILTER (WHERE inserted) AS inserted,
+               COUNT(*) FILTER (WHERE NOT inserted) AS updated
+        FROM merged
+    """
+
+
+def merge_staged_products(conn) -> dict:
+    """Upsert new / changed staged products; returns and logs staged/inserted/updated/unchanged."""
+    ensure_product_keys(conn)
+    row = conn.execute(text(_merge_sql())).mappings().one()
+    counts = {k: int(v) for k, v in row.items()}
+    counts["unchanged"] = counts["staged"] - counts["inserted"] - counts["updated"]
+    conn.execute(
+        text(
+            """
+            INSERT INTO product_merge_log (staged, inserted, updated, unchanged)
+            VALUES (:staged, :inserted, :updated, :unchanged)
+            """
+        ),
+        counts,
+    )
+    return counts
@@ -0,0 +1,57 @@
+"""SQL for the API read path over the aggregate tables maintained by src/db/metrics.py.
+
+Kept apart from the loaders so importing it does not pull in pandas.
+"""
+
+METRICS_MODEL = "vader"  # sentiment model counted in product_stats / product_rollups
+
+# API read path: one row per product, no review scans
+METRICS_SELECT = """
+    SELECT p.product_id, p.title,
+           COALESCE(m.review_count, 0) AS total_reviews,
+           ROUND(m.rating_sum::numeric / NULLIF(m.rating_count, 0), 2) AS avg_rating,
+           ROUND((m.polarity_sum / NULLIF(m.scored_count, 0))::numeric, 4) AS avg_sentiment_score,
+           COALESCE(m.positive_count, 0) AS positive_count,
+           COALESCE(m.neutral_count, 0) AS neutral_count,
+           COALESCE(m.negative_count, 0) AS negative_count
+    FROM products p
+    LEFT JOIN product_stats m ON m.product_id = p.product_id
+"""
+
+TREND_SELECT = """
+    SELECT bucket, bucket_start, review_count,
+           ROUND(rating_sum::numeric / NULLIF(rating_count, 0), 2) AS avg_rating,
+           ROUND((polarity_sum / NULLIF(scored_count, 0))::numeric, 4) AS avg_polarity,
+           positive_count, neutral_count, negative_count
+    FROM product_rollups
+"""
+
+# sentiment_results s -> its review r. Matching review_date as well lets Postgres prune the
+# month-partitioned tables to the review's month (plus the default partition) per row instead of
+# probing every month (src/db/partitions.py).
+SAME_REVIEW = """
+    s.review_id = r.review_id
+    AND (s.review_date = r.review_date OR (s.review_date IS NULL AND r.review_date IS NULL))
+"""
+SENTIMENT_JOIN = SAME_REVIEW + "    AND s.model = :model\n"
+
+# Drift ranking over product_drift_state (src/db/drift.py). The reviews_seen predicate must match
+# the partial index idx_drift_rank literally, so /alerts is an index scan of the top rows.
+DRIFT_HALF_LIFE = 500  # reviews; the slow EWMA every product's recent sentiment is compared against
+DRIFT_MIN_REVIEWS = DRIFT_HALF_LIFE // 2  # warm-up: the baseline settles before products are ranked or alerted
+
+ALERTS_SELECT = f"""
+    SELECT d.product_id, p.title, ROUND(d.drift_score::numeric, 2) AS drift_score,
+           ROUND(d.polarity_z::numeric, 2) AS polarity_z, ROUND(d.negative_z::numeric, 2) AS negative_z,
+           ROUND(d.fast_polarity::numeric, 4) AS recent_polarity,
+           ROUND(d.slow_polarity::numeric, 4) AS baseline_polarity,
+           ROUND(d.fast_negative::numeric, 4) AS recent_negative_rate,
+           ROUND(d.slow_negative::numeric, 4) AS baseline_negative_rate,
+           d.reviews_seen, d.last_review_date,
+           a.alert_id, a.kind AS alert_kind, a.raised_at AS alert_raised_at,
+           ROUND(a.peak_score::numeric, 2) AS alert_peak_score
+    FROM product_drift_state d
+    JOIN products p ON p.product_id = d.product_id
+    LEFT JOIN sentiment_alerts a ON a.alert_id = d.open_alert_id
+    WHERE d.reviews_seen >= {DRIFT_MIN_REVIEWS}
+"""
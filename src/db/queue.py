@@ -0,0 +1,127 @@
+"""Scoring work queue.
+
+An AFTER INSERT trigger on reviews enqueues every new review once per enabled model, so a
+scoring run only touches new work instead of anti-joining all reviews against sentiment_results.
+The trigger also sends NOTIFY on NOTIFY_CHANNEL (payload: rows queued), which wakes the
+long-running worker in scripts/scoring_worker.py as soon as the inserting transaction commits.
+Workers claim batches with FOR UPDATE SKIP LOCKED and a lease; `complete()` deletes the queue
+rows in the same transaction that writes the results, and only the worker whose delete succeeds
+keeps its results, so an expired lease can never produce duplicate sentiment rows.
+"""
+import pandas as pd
+from sqlalchemy import text
+
+LEASE_SECONDS = 600  # a claimed batch not completed within this window is handed out again
+NOTIFY_CHANNEL = "scoring_queue"
+
+
+def ensure_scoring_queue(conn, model: str) -> None:
+    """Create the queue, its trigger and register `model`; a new registration backfills the backlog."""
+    conn.exec_driver_sql(
+        f"""
+        CREATE TABLE IF NOT EXISTS scoring_models (
+          model TEXT PRIMARY KEY,
+          enabled BOOLEAN NOT NULL DEFAULT TRUE
+        );
+        CREATE TABLE IF NOT EXISTS scoring_queue (
+          model TEXT NOT NULL,
+          review_id BIGINT NOT NULL,
+          enqueued_at TIMESTAMP NOT NULL DEFAULT NOW(),
+          claimed_at TIMESTAMP,
+          PRIMARY KEY (model, review_id)
+        );
+        CREATE OR REPLACE FUNCTION enqueue_reviews() RETURNS trigger LANGUAGE plpgsql AS $$
+        DECLARE
+          queued BIGINT;
+        BEGIN
+          INSERT INTO scoring_queue (model, review_id)
+          SELECT m.model, n.review_id
+          FROM new_rows n CROSS JOIN scoring_models m
+          WHERE m.enabled
+          ON CONFLICT DO NOTHING;
+          GET DIAGNOSTICS queued = ROW_COUNT;
+          IF queued > 0 THEN
+            PERFORM pg_notify('{NOTIFY_CHANNEL}', queued::text);  -- delivered on commit, once per statement
+          END IF;
+          RETURN NULL;
+        END $$;
+        DO $$
+        BEGIN
+          IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'reviews_enqueue') THEN
+            CREATE TRIGGER reviews_enqueue
+              AFTER INSERT ON reviews
+              REFERENCING NEW TABLE AS new_rows
+              FOR EACH STATEMENT EXECUTE FUNCTION enqueue_reviews();
+          END IF;
+        END $$;
+        """
+    )
+    registered = conn.execute(
+        text("INSERT INTO scoring_models (model) VALUES (:m) ON CONFLICT (model) DO NOTHING"),
+        {"m": model},
+    ).rowcount
+    if registered:
+        n = enqueue_backlog(conn, model)
+        print(f"Registered model '{model}' and queued {n:,} existing unscored reviews.")
+
+
+def enqueue_backlog(conn, model: str) -> int:
+    """One-off anti-join: queue every review that has no result for `model` yet."""
+    return conn.execute(
+        text(
+            """
+            INSERT INTO scoring_queue (model, review_id)
+            SELECT :m, r.review_id
+            FROM reviews r
+            WHERE NOT EXISTS (
+                SELECT 1 FROM sentiment_results s
+                WHERE s.review_id = r.review_id AND s.model = :m
+            )
+            ON CONFLICT DO NOTHING
+            """
+        ),
+        {"m": model},
+    ).rowcount
+
+
+def claim_batch(conn, model: str, size: int, lease: int = LEASE_SECONDS) -> pd.DataFrame:
+    """Lease up to `size` queued reviews; rows locked by other workers are skipped, not waited on.
+
+    Queue entries whose review no longer exists come back with a null product_id. `queued_s` is
+    how long each review waited in the queue before this claim.
+    """
+    sql = """
+    WITH claimed AS (
+        UPDATE scoring_queue q
+        SET claimed_at = NOW()
+        FROM (
+            SELECT review_id
+            FROM scoring_queue
+            WHERE model = :m
+              AND (claimed_at IS NULL OR claimed_at < NOW() - make_interval(secs => :lease))
+            ORDER BY review_id
+            LIMIT :n
+            FOR UPDATE SKIP LOCKED
+        ) c
+        WHERE q.model = :m AND q.review_id = c.review_id
+        RETURNING q.review_id, EXTRACT(EPOCH FROM NOW() - q.enqueued_at)::float8 AS queued_s
+    )
+    SELECT c.review_id, r.product_id, r.review_date, r.review_text, c.queued_s
+    FROM claimed c
+    LEFT JOIN reviews r ON r.review_id = c.review_id
+    ORDER BY c.review_id
+    """
+    return pd.read_sql(text(sql), conn, params={"m": model, "n": size, "lease": lease})
+
+
+def complete(conn, model: str, review_ids) -> set[int]:
+    """Remove finished work from the queue; returns the ids this transaction actually owned."""
+    rows = conn.execute(
+        text("DELETE FROM scoring_queue WHERE model = :m AND review_id = ANY(:ids) RETURNING review_id"),
+        {"m": model, "ids": [int(i) for i in review_ids]},
+    )
+    return {r[0] for r in rows}
+
+
+def queue_depth(conn, model: str) -> int:
+    return conn.execute(text("SELECT COUNT(*) FROM scoring_queue WHERE model = :m"), {"m": model}).scalar()
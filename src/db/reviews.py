@@ -0,0 +1,25 @@
+"""Columns and indexes on `reviews` that the loaders add on top of ai_sentiment_schema.sql.
+
+Every loader (the seeder, the CSV loader, the benchmarks) calls ensure_review_schema() before
+writing, so a database created from the original schema file is upgraded in place.
+"""
+from sqlalchemy import text
+
+from src.db.partitions import ensure_sentiment_dates
+from src.db.search import ensure_search_index
+
+
+def ensure_review_schema(conn) -> None:
+    """Make sure reviews has rating/review_date columns and the full-text search column, and
+    sentiment_results carries review_date."""
+    conn.execute(
+        text(
+            """
+            ALTER TABLE reviews
+              ADD COLUMN IF NOT EXISTS rating integer,
+              ADD COLUMN IF NOT EXISTS review_date date;
+            """
+        )
+    )
+    ensure_search_index(conn)
+    ensure_sentiment_dates(conn)
@@ -0,0 +1,22 @@
+"""Full-text search support on reviews.
+
+`review_tsv` is a stored generated column, so Postgres keeps it current on every insert or
+update of review_text and no loader has to remember it. A GIN index on it serves `@@` matches
+without scanning review_text.
+"""
+from sqlalchemy import text
+
+TS_CONFIG = "english"  # must match between the column and the API's websearch_to_tsquery()
+
+
+def ensure_search_index(conn) -> None:
+    # adding the column rewrites reviews once; later runs are no-ops
+    conn.execute(
+        text(
+            f"""
+            ALTER TABLE reviews ADD COLUMN IF NOT EXISTS review_tsv tsvector
+              GENERATED ALWAYS AS (to_tsvector('{TS_CONFIG}', COALESCE(review_text, ''))) STORED
+            """
+        )
+    )
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_reviews_tsv ON reviews USING GIN (review_tsv)"))
@@ -0,0 +1,280 @@
+"""Parquet snapshot of reviews x sentiment_results for analytical reads.
+
+Layout, one directory per sentiment model, hive-partitioned by product and review month:
+
+    data/snapshot/vader/_watermark.json
+    data/snapshot/vader/product_id=42/month=2025-07/part-000000001234.parquet
+    data/snapshot/vader/product_id=42/month=__HIVE_DEFAULT_PARTITION__/...   (undated reviews)
+
+Exports are incremental. `_watermark.json` records the highest sentiment_id written, and each run
+appends the rows above it in keyset chunks. A chunk's files are named after its first
+sentiment_id, so a chunk that is written again after a crash (with the same chunk size)
+overwrites its own files. The watermark only advances after the files exist, and `latest` reads
+drop duplicate results either way.
+
+sentiment_ids come from a sequence and commit out of order when several scorers write at once,
+so a lower id can become visible after a higher one was exported. Every id range the export
+skips over is kept in the watermark as a gap, and later runs export the rows that have since
+appeared in a gap. Ids already visible under another model share the sequence but are never
+this model's, so they are not gaps. A gap is given up after GAP_TTL: longer than any scoring
+transaction, so what is still missing by then was rolled back.
+
+Readers go through pyarrow.dataset. Only the requested columns are decoded, and product / month
+filters skip whole directories.
+"""
+import json
+import os
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from sqlalchemy import text
+
+from src.db.queries import SAME_REVIEW
+
+SNAPSHOT_ROOT = Path("data/snapshot")
+WATERMARK_FILE = "_watermark.json"
+CHUNK_SIZE = 100_000  # sentiment rows per keyset chunk
+GAP_TTL = timedelta(hours=1)  # how long a skipped id range is re-checked for late commits
+
+PARTITIONING = ds.partitioning(pa.schema([("product_id", pa.int64()), ("month", pa.string())]), flavor="hive")
+
+# columns stored in the files (the partition columns live in the directory names)
+FILE_SCHEMA = pa.schema(
+    [
+        ("sentiment_id", pa.int64()),
+        ("review_id", pa.int64()),
+        ("review_date", pa.date32()),
+        ("rating", pa.int16()),
+        ("polarity", pa.float64()),
+        ("label", pa.string()),
+        ("confidence", pa.float64()),
+        ("processed_at", pa.timestamp("us")),
+        ("review_text", pa.string()),
+    ]
+)
+
+CHUNK_SQL = f"""
+    SELECT s.sentiment_id, s.review_id, r.product_id,
+           to_char(r.review_date, 'YYYY-MM') AS month,
+           r.review_date, r.rating,
+           s.polarity::float8 AS polarity, s.label, s.confidence::float8 AS confidence,
+           s.processed_at, r.review_text
+    FROM sentiment_results s
+    JOIN reviews r ON {SAME_REVIEW}
+    WHERE s.model = :m AND s.sentiment_id > :after
+    ORDER BY s.sentiment_id
+    LIMIT :n
+"""
+
+IN_RANGES = """    JOIN unnest(CAST(:lo AS BIGINT[]), CAST(:hi AS BIGINT[])) g(lo, hi)
+      ON s.sentiment_id BETWEEN g.lo AND g.hi
+"""
+GAP_SQL = CHUNK_SQL.split("    WHERE")[0] + IN_RANGES + """    WHERE s.model = :m
+    ORDER BY s.sentiment_id
+"""
+OTHER_IDS_SQL = """
+    SELECT s.sentiment_id
+    FROM sentiment_results s
+""" + IN_RANGES + """    WHERE s.model <> :m
+"""
+
+
+def snapshot_dir(model: str, root: Path | str = SNAPSHOT_ROOT) -> Path:
+    return Path(root) / model
+
+
+# --- Watermark ---
+def read_watermark(path: Path) -> dict:
+    try:
+        mark = json.loads((path / WATERMARK_FILE).read_text())
+    except FileNotFoundError:
+        mark = {"sentiment_id": 0, "rows": 0}
+    mark.setdefault("gaps", [])  # [first_id, last_id, first seen (ISO)]; older watermarks have none
+    return mark
+
+
+def write_watermark(path: Path, mark: dict) -> None:
+    tmp = path / (WATERMARK_FILE + ".tmp")
+    tmp.write_text(json.dumps(mark, indent=2))
+    os.replace(tmp, path / WATERMARK_FILE)  # atomic: readers see the old or the new mark
+
+
+# --- Export ---
+def fetch_chunk(conn, model: str, after: int, size: int = CHUNK_SIZE) -> pd.DataFrame:
+    return pd.read_sql(text(CHUNK_SQL), conn, params={"m": model, "after": after, "n": size})
+
+
+def _ranges(model: str, ranges: list) -> dict:
+    return {"m": model, "lo": [r[0] for r in ranges], "hi": [r[1] for r in ranges]}
+
+
+def fetch_gaps(conn, model: str, gaps: list) -> pd.DataFrame:
+    """Rows that committed inside recorded gaps since they were skipped."""
+    return pd.read_sql(text(GAP_SQL), conn, params=_ranges(model, gaps))
+
+
+def other_model_ids(conn, model: str, ranges: list) -> list[int]:
+    """Ids inside `ranges` ([first, last, ...]) that are visible under other models: not gaps."""
+    return conn.execute(text(OTHER_IDS_SQL), _ranges(model, ranges)).scalars().all()
+
+
+def find_gaps(after: int, ids, seen_at: str) -> list:
+    """Id ranges above `after` that sorted `ids` skip over."""
+    gaps, prev = [], after
+    for i in ids:
+        if i > prev + 1:
+            gaps.append([prev + 1, i - 1, seen_at])
+        prev = i
+    return gaps
+
+
+def fill_gaps(gaps: list, ids) -> list:
+    """Split the recorded gaps around ids that have now been exported."""
+    ids, out = sorted(ids), []
+    for lo, hi, seen in gaps:
+        inside = ids[bisect_left(ids, lo):bisect_right(ids, hi)]
+        out += find_gaps(lo - 1, inside + [hi + 1], seen)
+    return out
+
+
+def write_chunk(path: Path, df: pd.DataFrame) -> int:
+    """Write one chunk as one file per (product_id, month) directory; returns files written."""
+    name = f"part-{int(df['sentiment_id'].iloc[0]):012d}.parquet"
+    files = 0
+    for (pid, month), part in df.groupby(["product_id", "month"], sort=False, dropna=False):
+        month_dir = "__HIVE_DEFAULT_PARTITION__" if pd.isna(month) else month
+        out = path / f"product_id={int(pid)}" / f"month={month_dir}"
+        out.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(part[FILE_SCHEMA.names], schema=FILE_SCHEMA, preserve_index=False)
+        pq.write_table(table, out / name, compression="zstd")
+        files += 1
+    return files
+
+
+def export_increment(engine, model: str, root: Path | str = SNAPSHOT_ROOT, chunk_size: int = CHUNK_SIZE,
+                     limit: int = 0, on_chunk=None) -> dict:
+    """Append sentiment rows above the watermark; returns the new watermark.
+
+    `on_chunk(rows, files, fetch_s, write_s)` is called after each chunk (progress / timings).
+    """
+    path = snapshot_dir(model, root)
+    path.mkdir(parents=True, exist_ok=True)
+    mark = read_watermark(path)
+    with engine.connect() as conn:
+        newest = conn.execute(
+            text("SELECT COALESCE(MAX(sentiment_id), 0) FROM sentiment_results WHERE model = :m"), {"m": model}
+        ).scalar()
+    if newest < mark["sentiment_id"]:
+        raise RuntimeError(
+            f"sentiment_results for {model!r} end at id {newest:,} but the snapshot is at "
+            f"{mark['sentiment_id']:,}; the table was reset, re-export with --full"
+        )
+
+    exported = 0
+    now = datetime.now(timezone.utc)
+    live = [g for g in mark["gaps"] if now - datetime.fromisoformat(g[2]) < GAP_TTL]
+    if live:
+        started = time.perf_counter()
+        with engine.connect() as conn:
+            late = fetch_gaps(conn, model, live)
+            others = other_model_ids(conn, model, live)
+        fetched = time.perf_counter()
+        files = write_chunk(path, late) if not late.empty else 0
+        filled = late["sentiment_id"].tolist() + others
+        mark = {**mark, "rows": mark["rows"] + len(late), "gaps": fill_gaps(live, filled)}
+        write_watermark(path, mark)
+        exported += len(late)
+        if on_chunk and len(late):
+            on_chunk(len(late), files, fetched - started, time.perf_counter() - fetched)
+    elif mark["gaps"]:
+        mark = {**mark, "gaps": []}
+        write_watermark(path, mark)
+
+    while not limit or exported < limit:
+        size = min(chunk_size, limit - exported) if limit else chunk_size
+        started = time.perf_counter()
+        with engine.connect() as conn:
+            df = fetch_chunk(conn, model, mark["sentiment_id"], size)
+            ids = df["sentiment_id"].tolist()
+            if ids:
+                ids = sorted(ids + other_model_ids(conn, model, [[mark["sentiment_id"] + 1, ids[-1]]]))
+        fetched = time.perf_counter()
+        if df.empty:
+            break
+        files = write_chunk(path, df)
+        stamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        mark = {
+            "model": model,
+            "sentiment_id": int(df["sentiment_id"].max()),
+            "rows": mark["rows"] + len(df),
+            "gaps": mark["gaps"] + find_gaps(mark["sentiment_id"], ids, stamp),
+            "updated_at": stamp,
+        }
+        write_watermark(path, mark)
+        exported += len(df)
+        if on_chunk:
+            on_chunk(len(df), files, fetched - started, time.perf_counter() - fetched)
+        if len(df) < size:
+            break
+    return mark
+
+
+# --- Readers ---
+def open_snapshot(model: str, root: Path | str = SNAPSHOT_ROOT) -> ds.Dataset:
+    path = snapshot_dir(model, root)
+    return ds.dataset(path, format="parquet", partitioning=PARTITIONING)  # skips _watermark.json
+
+
+def snapshot_filter(product_ids=None, start_month: str | None = None, end_month: str | None = None):
+    """Partition filter: product ids and an inclusive 'YYYY-MM' month range (undated rows are
+    dropped as soon as a month bound is given)."""
+    expr = None
+
+    def both(e):
+        return e if expr is None else expr & e
+
+    if product_ids is not None:
+        expr = both(ds.field("product_id").isin([int(p) for p in product_ids]))
+    if start_month:
+        expr = both(ds.field("month") >= start_month)
+    if end_month:
+        expr = both(ds.field("month") <= end_month)
+    return expr
+
+
+def read_snapshot(model: str, columns: list[str] | None = None, product_ids=None,
+                  start_month: str | None = None, end_month: str | None = None,
+                  latest: bool = True, root: Path | str = SNAPSHOT_ROOT) -> pd.DataFrame:
+    """Read the snapshot into a DataFrame, decoding only `columns` (default: all but review_text).
+
+    With `latest`, a review scored more than once keeps only its newest result, as the
+    product_stats aggregates do.
+    """
+    dataset = open_snapshot(model, root)
+    wanted = columns or [c for c in dataset.schema.names if c != "review_text"]
+    read = list(dict.fromkeys(wanted + (["review_id", "sentiment_id"] if latest else [])))
+    table = dataset.to_table(columns=read, filter=snapshot_filter(product_ids, start_month, end_month))
+    df = table.to_pandas()
+    if latest and not df.empty:
+        df = df.sort_values("sentiment_id").drop_duplicates("review_id", keep="last")
+    return df[wanted].reset_index(drop=True)
+
+
+def monthly_summary(model: str, product_ids=None, start_month: str | None = None,
+                    end_month: str | None = None, root: Path | str = SNAPSHOT_ROOT) -> pd.DataFrame:
+    """Reviews, average rating / polarity and label counts per product and month."""
+    df = read_snapshot(model, ["product_id", "month", "rating", "polarity", "label"],
+                       product_ids, start_month, end_month, root=root)
+    if df.empty:
+        return df
+    labels = pd.crosstab([df["product_id"], df["month"]], df["label"]).add_suffix("_count")
+    stats = df.groupby(["product_id", "month"]).agg(
+        reviews=("rating", "size"), avg_rating=("rating", "mean"), avg_polarity=("polarity", "mean")
+    )
+    return stats.join(labels).fillna({c: 0 for c in labels.columns}).reset_index()
@@ -0,0 +1,28 @@
+"""Global data-version watermark.
+
+Loaders bump it when a run finishes; the API folds it into cache keys and ETags so cached
+responses are invalidated exactly when the underlying data changes.
+"""
+from sqlalchemy import text
+
+
+def ensure_data_version(conn) -> None:
+    conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS data_version (
+              id INT PRIMARY KEY CHECK (id = 1),
+              version BIGINT NOT NULL DEFAULT 0,
+              updated_at TIMESTAMP DEFAULT NOW()
+            );
+            INSERT INTO data_version (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+            """
+        )
+    )
+
+
+def bump_data_version(conn) -> int:
+    ensure_data_version(conn)
+    return conn.execute(
+        text("UPDATE data_version SET version = version + 1, updated_at = NOW() WHERE id = 1 RETURNING version")
+    ).scalar()
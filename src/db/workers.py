@@ -0,0 +1,78 @@
+"""Heartbeats of long-running workers (scripts/scoring_worker.py).
+
+Each worker upserts one `worker_heartbeats` row every few seconds with its state, throughput
+and recent insert-to-scored latency. `/health` lists the rows, and a worker whose last beat is
+older than STALE_BEATS intervals is reported as stale (crashed or hung).
+"""
+from sqlalchemy import text
+
+STALE_BEATS = 3  # missed heartbeat intervals before a worker counts as stale
+SHOWN_FOR = "1 hour"  # stopped workers stay listed on /health this long
+
+HEARTBEAT_FIELDS = ("status", "scored", "batches", "queue_depth",
+                    "latency_p50_ms", "latency_p95_ms", "latency_max_ms", "last_error")
+
+HEALTH_SQL = f"""
+    SELECT worker_id, kind, model, status, started_at, beat_at,
+           ROUND(EXTRACT(EPOCH FROM NOW() - beat_at)::numeric, 1) AS beat_age_s,
+           status <> 'stopped' AND beat_at < NOW() - make_interval(secs => {STALE_BEATS} * interval_s) AS stale,
+           scored, batches, queue_depth, latency_p50_ms, latency_p95_ms, latency_max_ms, last_error
+    FROM worker_heartbeats
+    WHERE status <> 'stopped' OR beat_at > NOW() - INTERVAL '{SHOWN_FOR}'
+    ORDER BY kind, worker_id
+"""
+
+
+def ensure_worker_heartbeats(conn) -> None:
+    conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS worker_heartbeats (
+              worker_id TEXT PRIMARY KEY,        -- host:pid
+              kind TEXT NOT NULL,                -- 'scoring'
+              model TEXT,
+              status TEXT NOT NULL,              -- 'idle' | 'scoring' | 'backoff' | 'stopped'
+              interval_s DOUBLE PRECISION NOT NULL,
+              started_at TIMESTAMP NOT NULL DEFAULT NOW(),
+              beat_at TIMESTAMP NOT NULL DEFAULT NOW(),
+              scored BIGINT NOT NULL DEFAULT 0,
+              batches BIGINT NOT NULL DEFAULT 0,
+              queue_depth BIGINT,
+              latency_p50_ms DOUBLE PRECISION,  -- insert-to-scored, recent window
+              latency_p95_ms DOUBLE PRECISION,
+              latency_max_ms DOUBLE PRECISION,
+              last_error TEXT
+            )
+            """
+        )
+    )
+
+
+def register_worker(conn, worker_id: str, kind: str, model: str | None, interval_s: float) -> None:
+    """(Re)start a worker's row; a restarted worker with a reused id starts from zero."""
+    conn.execute(
+        text(
+            """
+            INSERT INTO worker_heartbeats (worker_id, kind, model, status, interval_s)
+            VALUES (:w, :k, :m, 'idle', :i)
+            ON CONFLICT (worker_id) DO UPDATE
+              SET kind = EXCLUDED.kind, model = EXCLUDED.model, status = 'idle',
+                  interval_s = EXCLUDED.interval_s, started_at = NOW(), beat_at = NOW(),
+                  scored = 0, batches = 0, queue_depth = NULL, latency_p50_ms = NULL,
+                  latency_p95_ms = NULL, latency_max_ms = NULL, last_error = NULL
+            """
+        ),
+        {"w": worker_id, "k": kind, "m": model, "i": interval_s},
+    )
+
+
+def beat(conn, worker_id: str, **fields) -> None:
+    """Record a heartbeat; `fields` are any of HEARTBEAT_FIELDS."""
+    unknown = set(fields) - set(HEARTBEAT_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown heartbeat field(s): {', '.join(sorted(unknown))}")
+    sets = "".join(f", {name} = :{name}" for name in fields)
+    conn.execute(
+        text(f"UPDATE worker_heartbeats SET beat_at = NOW(){sets} WHERE worker_id = :w"),
+        {"w": worker_id, **fields},
+    )
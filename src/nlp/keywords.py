@@ -0,0 +1,167 @@
+"""Incremental TF-IDF keyword extraction.
+
+Document frequencies live in Postgres (`keyword_df` per term, `keyword_docs` for the corpus size)
+and grow with every batch, so new reviews are weighted against everything seen so far without
+refitting the corpus. A review keeps the IDF that was current when it was processed.
+
+Per review, the top TF-IDF terms go into sentiment_results.keywords_json. Those same weights are
+summed per product into `product_keywords`, which ranks a product's top terms from an index.
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+from sqlalchemy import text
+
+from src.db.bulk import copy_update, copy_upsert
+from src.db.queries import SAME_REVIEW
+
+TOP_K = 5  # keywords kept per review
+NGRAMS = (1, 2)  # words and two-word phrases ("battery life")
+
+
+def ensure_keyword_tables(conn) -> None:
+    conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS keyword_df (
+              term TEXT PRIMARY KEY,
+              df BIGINT NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS keyword_docs (
+              id INT PRIMARY KEY CHECK (id = 1),
+              docs BIGINT NOT NULL DEFAULT 0
+            );
+            INSERT INTO keyword_docs (id, docs) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+            CREATE TABLE IF NOT EXISTS product_keywords (
+              product_id INT NOT NULL REFERENCES products(product_id) ON DELETE CASCADE,
+              term TEXT NOT NULL,
+              weight DOUBLE PRECISION NOT NULL DEFAULT 0,
+              review_count BIGINT NOT NULL DEFAULT 0,
+              PRIMARY KEY (product_id, term)
+            );
+            CREATE INDEX IF NOT EXISTS idx_product_keywords_rank ON product_keywords (product_id, weight DESC);
+            -- pending work only: the index shrinks as rows are filled
+            CREATE INDEX IF NOT EXISTS idx_sentiment_keywords_pending
+              ON sentiment_results (model, sentiment_id) WHERE keywords_json IS NULL;
+            """
+        )
+    )
+
+
+def reset_keywords(conn) -> None:
+    """Forget all document frequencies and product terms (used when reviews are wiped)."""
+    if conn.execute(text("SELECT to_regclass('keyword_df') IS NOT NULL")).scalar():
+        conn.execute(text("DELETE FROM keyword_df"))
+        conn.execute(text("DELETE FROM product_keywords"))
+        conn.execute(text("UPDATE keyword_docs SET docs = 0"))
+
+
+def make_vectorizer() -> CountVectorizer:
+    return CountVectorizer(stop_words="english", ngram_range=NGRAMS,
+                           token_pattern=r"(?u)\b[a-zA-Z][a-zA-Z']+\b", dtype=np.int32)
+
+
+def top_k(X: sparse.csr_matrix, k: int):
+    """(row, col, value) of the k largest entries in each row, rows ascending and best first.
+
+    One lexsort over the stored values replaces a per-row Python loop.
+    """
+    rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+    order = np.lexsort((-X.data, rows))
+    rank = np.arange(len(order)) - X.indptr[rows[order]]
+    keep = order[rank < k]
+    return rows[keep], X.indices[keep], X.data[keep]
+
+
+def claim_pending(conn, model: str, size: int) -> pd.DataFrame:
+    """Next reviews whose `model` row has no keywords yet; rows locked by another run are skipped."""
+    sql = f"""
+    SELECT s.sentiment_id, r.product_id, r.review_text
+    FROM sentiment_results s
+    JOIN reviews r ON {SAME_REVIEW}
+    WHERE s.model = :m AND s.keywords_json IS NULL
+    ORDER BY s.sentiment_id
+    LIMIT :n
+    FOR UPDATE OF s SKIP LOCKED
+    """
+    return pd.read_sql(text(sql), conn, params={"m": model, "n": size})
+
+
+def extract_batch(conn, batch: pd.DataFrame, k: int = TOP_K) -> int:
+    """Update DF counts with `batch`, then write its review keywords and product term weights.
+
+    `batch` has sentiment_id, product_id and review_text. Call inside the transaction that
+    claimed it. Returns the number of keyword terms written.
+    """
+    n = len(batch)
+    # row lock on the corpus counter serializes concurrent runs' DF reads and writes
+    docs = conn.execute(text("UPDATE keyword_docs SET docs = docs + :n WHERE id = 1 RETURNING docs"),
+                        {"n": n}).scalar()
+
+    vec = make_vectorizer()
+    try:
+        counts = vec.fit_transform(batch["review_text"].fillna("")).tocsr()
+        terms = vec.get_feature_names_out()
+    except ValueError:  # no usable words in the whole batch
+        counts, terms = sparse.csr_matrix((n, 0)), np.array([], dtype=object)
+
+    if len(terms):
+        batch_df = np.asarray((counts > 0).sum(axis=0)).ravel()
+        copy_upsert(conn, "keyword_df", pd.DataFrame({"term": terms, "df": batch_df}), ["term"], ["df"],
+                    additive=True)
+        known = dict(conn.execute(text("SELECT term, df FROM keyword_df WHERE term = ANY(:t)"),
+                                  {"t": terms.tolist()}).fetchall())
+        df = pd.Series(known).reindex(terms).to_numpy(dtype=np.float64)
+        idf = np.log((1 + docs) / (1 + df)) + 1  # smoothed, as in sklearn's TfidfTransformer
+        weights = normalize(sparse.csr_matrix(counts.multiply(idf)))
+    else:
+        weights = sparse.csr_matrix((n, 0))
+
+    rows, cols, vals = top_k(weights, k)
+    per_review = np.split(terms[cols], np.searchsorted(rows, np.arange(1, n)))
+    copy_update(
+        conn,
+        "sentiment_results",
+        pd.DataFrame({"sentiment_id": batch["sentiment_id"].to_numpy(),
+                      "keywords_json": [list(t) for t in per_review]}),
+        ["sentiment_id"],
+        ["keywords_json"],
+    )
+
+    if len(rows):
+        # products x reviews indicator times reviews x terms top-k weights -> per-product term sums
+        codes, products = pd.factorize(batch["product_id"])
+        owner = sparse.csr_matrix((np.ones(n), (codes, np.arange(n))), shape=(len(products), n))
+        picked = sparse.csr_matrix((vals, (rows, cols)), shape=weights.shape)
+        summed, hits = owner @ picked, owner @ (picked > 0).astype(np.int64)
+        summed.sort_indices()
+        hits.sort_indices()  # same sparsity pattern, so canonical order aligns the two
+        summed, hits = summed.tocoo(), hits.tocoo()
+        copy_upsert(
+            conn,
+            "product_keywords",
+            pd.DataFrame({"product_id": products[summed.row], "term": terms[summed.col],
+                          "weight": summed.data, "review_count": hits.data.astype(np.int64)}),
+            ["product_id", "term"],
+            ["weight", "review_count"],
+            additive=True,
+        )
+    return len(rows)
+
+
+def product_top_terms(conn, product_id: int, k: int = 10) -> list[dict]:
+    rows = conn.execute(
+        text(
+            """
+            SELECT term, ROUND(weight::numeric, 4) AS weight, review_count
+            FROM product_keywords
+            WHERE product_id = :pid
+            ORDER BY weight DESC
+            LIMIT :k
+            """
+        ),
+        {"pid": product_id, "k": k},
+    ).mappings()
+    return [dict(r) for r in rows]
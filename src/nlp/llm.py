@@ -0,0 +1,115 @@
+"""Async client for OpenAI-compatible chat completion endpoints.
+
+`LLM_BASE_URL` may point at OpenAI, any compatible gateway or scripts/llm_stub_server.py for
+offline runs. Requests in flight are capped by a semaphore and request starts by a token bucket;
+timeouts, connection errors, 429 and 5xx responses are retried with exponential backoff
+(honouring Retry-After).
+"""
+import asyncio
+import random
+import time
+
+import httpx
+
+from src.config.settings import (
+    LLM_BASE_URL,
+    LLM_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_MODEL,
+    LLM_RATE_PER_S,
+    LLM_TIMEOUT_S,
+    OPENAI_API_KEY,
+)
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+MAX_BACKOFF_S = 30.0
+
+
+class LLMError(RuntimeError):
+    pass
+
+
+class RateLimiter:
+    """Token bucket: `rate` acquisitions per second on average, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:  # waiters are served in arrival order
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _retry_after(resp: httpx.Response) -> float | None:
+    try:
+        return min(float(resp.headers["retry-after"]), MAX_BACKOFF_S)
+    except (KeyError, ValueError):
+        return None
+
+
+class ChatProvider:
+    """One shared HTTP connection pool; use as `async with ChatProvider() as llm`."""
+
+    def __init__(self, base_url: str = LLM_BASE_URL, model: str = LLM_MODEL, api_key: str = OPENAI_API_KEY,
+                 concurrency: int = LLM_CONCURRENCY, rate: float = LLM_RATE_PER_S,
+                 max_retries: int = LLM_MAX_RETRIES, timeout: float = LLM_TIMEOUT_S):
+        self.model = model
+        self.max_retries = max_retries
+        self._client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            timeout=timeout,
+            headers={"Authorization": f"Bearer {api_key}"} if api_key else {},
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+        self._slots = asyncio.Semaphore(concurrency)
+        self._limiter = RateLimiter(rate) if rate > 0 else None
+        self.requests = self.retries = 0
+        self.prompt_tokens = self.completion_tokens = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._client.aclose()
+
+    async def complete(self, messages: list[dict], max_tokens: int = 300, temperature: float = 0.2) -> str:
+        payload = {"model": self.model, "messages": messages, "max_tokens": max_tokens,
+                   "temperature": temperature}
+        async with self._slots:
+            for attempt in range(self.max_retries + 1):
+                if self._limiter:
+                    await self._limiter.acquire()
+                self.requests += 1
+                delay = None
+                try:
+                    resp = await self._client.post("/chat/completions", json=payload)
+                except httpx.TransportError as exc:  # timeouts and connection errors
+                    error = f"{type(exc).__name__}: {exc}"
+                else:
+                    if resp.status_code < 400:
+                        body = resp.json()
+                        usage = body.get("usage") or {}
+                        self.prompt_tokens += usage.get("prompt_tokens", 0)
+                        self.completion_tokens += usage.get("completion_tokens", 0)
+                        return body["choices"][0]["message"]["content"].strip()
+                    if resp.status_code not in RETRY_STATUS:
+                        raise LLMError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+                    error, delay = f"HTTP {resp.status_code}", _retry_after(resp)
+
+                if attempt == self.max_retries:
+                    raise LLMError(f"giving up after {attempt + 1} attempts: {error}")
+                self.retries += 1
+                if delay is None:
+                    delay = min(MAX_BACKOFF_S, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.5)
+                await asyncio.sleep(delay)
@@ -0,0 +1,176 @@
+"""Content-hash memoization for sentiment scores: in-process LRU in front of a Postgres table."""
+import hashlib
+import re
+from collections import OrderedDict
+
+import pandas as pd
+from sqlalchemy import text
+
+from src.db.bulk import copy_upsert
+
+LRU_SIZE = 100_000  # entries kept in-process (~150 bytes each)
+
+_WS = re.compile(r"\s+")
+
+
+def normalize_text(t) -> str:
+    # VADER is case- and punctuation-sensitive, so only whitespace is folded
+    return _WS.sub(" ", t).strip() if isinstance(t, str) else ""
+
+
+def text_hash(t) -> str:
+    return hashlib.sha256(normalize_text(t).encode("utf-8")).hexdigest()
+
+
+def ensure_cache_table(conn) -> None:
+    conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS sentiment_cache (
+              model TEXT NOT NULL,
+              text_hash TEXT NOT NULL,
+              polarity NUMERIC,
+              label TEXT,
+              confidence NUMERIC,
+              created_at TIMESTAMP DEFAULT NOW(),
+              PRIMARY KEY (model, text_hash)
+            );
+            """
+        )
+    )
+
+
+class ScoreCache:
+    """Scores keyed by (model, text_hash).
+
+    `lru_hits` / `db_hits` count reviews served from each tier, `shared` counts reviews whose
+    text is scored anyway for another review (in the same batch or a batch still in flight), and
+    `misses` counts the unique texts actually sent to the scorer.
+    """
+
+    def __init__(self, model: str, maxsize: int = LRU_SIZE):
+        self.model = model
+        self.maxsize = maxsize
+        self._lru: OrderedDict[str, tuple[float, str, float]] = OrderedDict()
+        # hashes reserved by a batch that is still being scored: hash -> [score once settled, waiting batches]
+        self._inflight: dict[str, list] = {}
+        self.lru_hits = 0
+        self.db_hits = 0
+        self.shared = 0
+        self.misses = 0
+
+    def _remember(self, h: str, score: tuple[float, str, float]) -> None:
+        if self.maxsize <= 0:
+            return
+        self._lru[h] = score
+        self._lru.move_to_end(h)
+        if len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def lookup(self, conn, hashes: list[str]) -> dict[str, tuple[float, str, float]]:
+        """Resolve one hash per review via the LRU, then Postgres. Returns the cached entries found
+        and counts the reviews they serve."""
+        found, from_lru = {}, set()
+        for h in set(hashes):
+            if h in self._lru:
+                self._lru.move_to_end(h)
+                found[h] = self._lru[h]
+                from_lru.add(h)
+
+        missing = [h for h in set(hashes) if h not in found]
+        if missing:
+            rows = conn.execute(
+                text(
+                    """
+                    SELECT text_hash, polarity, label, confidence
+                    FROM sentiment_cache
+                    WHERE model = :m AND text_hash = ANY(:h)
+                    """
+                ),
+                {"m": self.model, "h": missing},
+            ).fetchall()
+            for h, polarity, label, confidence in rows:
+                score = (float(polarity), label, float(confidence))
+                found[h] = score
+                self._remember(h, score)
+
+        for h in hashes:
+            if h in from_lru:
+                self.lru_hits += 1
+            elif h in found:
+                self.db_hits += 1
+        return found
+
+    # --- batches in flight ---
+    def plan(self, conn, hashes: list[str]) -> tuple[dict, list[str], set[str]]:
+        """Split one batch's review hashes into (cached scores, unique hashes this batch scores,
+        hashes an earlier batch still in flight is already scoring).
+
+        The hashes to score are reserved until settle(), so batches planned meanwhile wait for
+        those scores (take()) instead of scoring the same texts again.
+        """
+        cached = self.lookup(conn, hashes)
+        todo, waiting = {}, set()
+        for h in hashes:
+            if h in cached:
+                continue
+            if h in todo or h in waiting:
+                self.shared += 1
+            elif h in self._inflight:
+                self._inflight[h][1] += 1
+                waiting.add(h)
+                self.shared += 1
+            else:
+                todo[h] = None
+        self._inflight.update({h: [None, 0] for h in todo})
+        self.misses += len(todo)
+        return cached, list(todo), waiting
+
+    def settle(self, fresh: dict[str, tuple[float, str, float]]) -> None:
+        """Release a batch's reservations, handing its new scores to the batches waiting on them."""
+        for h, score in fresh.items():
+            entry = self._inflight.get(h)
+            if entry is None:
+                continue
+            if entry[1]:
+                entry[0] = score
+            else:
+                del self._inflight[h]
+
+    def ready(self, waiting: set[str]) -> bool:
+        return all(self._inflight[h][0] is not None for h in waiting)
+
+    def take(self, waiting: set[str]) -> dict[str, tuple[float, str, float]]:
+        """Settled scores for `waiting` (see ready()); each batch takes its share once."""
+        out = {}
+        for h in waiting:
+            entry = self._inflight[h]
+            out[h] = entry[0]
+            entry[1] -= 1
+            if not entry[1]:
+                del self._inflight[h]
+        return out
+
+    def store(self, conn, fresh: dict[str, tuple[float, str, float]]) -> None:
+        """Persist newly scored texts (first writer wins) and keep them hot in the LRU."""
+        if not fresh:
+            return
+        polarity, label, confidence = zip(*fresh.values())
+        df = pd.DataFrame(
+            {
+                "model": self.model,
+                "text_hash": list(fresh),
+                "polarity": polarity,
+                "label": label,
+                "confidence": confidence,
+            }
+        )
+        copy_upsert(conn, "sentiment_cache", df, ["model", "text_hash"])
+        for h, score in fresh.items():
+            self._remember(h, score)
+
+    def summary(self) -> str:
+        reviews = self.lru_hits + self.db_hits + self.shared + self.misses
+        rate = (self.lru_hits + self.db_hits) / reviews if reviews else 0.0
+        return (f"cache: {self.lru_hits:,} LRU hits, {self.db_hits:,} DB hits ({rate:.1%} of reviews), "
+                f"{self.misses:,} unique texts scored, {self.shared:,} reviews sharing one of them")
@@ -0,0 +1,78 @@
+"""Sentiment scorers shared by the batch job and its worker processes.
+
+A scorer turns review texts into (polarity, label, confidence) tuples, in order, and reports how
+many tokens it processed. `model` is the name written to sentiment_results.model and keys the
+score cache. The transformer backend lives in src/nlp/transformer.py and is imported only when
+selected, so VADER-only setups do not need torch; likewise VADER is imported only when built.
+"""
+from abc import ABC, abstractmethod
+
+MODEL = "vader"
+BACKENDS = ("vader", "transformer")
+
+# one scorer per process; built lazily or by the pool initializer
+_scorer = None
+
+
+def label_for(compound: float) -> str:
+    if compound >= 0.05:
+        return "positive"
+    if compound <= -0.05:
+        return "negative"
+    return "neutral"
+
+
+class Scorer(ABC):
+    """Base of the scoring backends; a subclass without score() cannot be instantiated."""
+
+    model: str
+
+    @abstractmethod
+    def score(self, texts: list[str]) -> tuple[list[tuple[float, str, float]], int]:
+        """Return ((polarity, label, confidence) per text, tokens processed)."""
+
+
+class VaderScorer(Scorer):
+    model = MODEL
+
+    def __init__(self):
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+        self._sid = SentimentIntensityAnalyzer()
+
+    def score(self, texts):
+        out, tokens = [], 0
+        for t in texts:
+            t = t if isinstance(t, str) else ""
+            compound = self._sid.polarity_scores(t)["compound"]
+            out.append((compound, label_for(compound), abs(compound)))  # confidence: crude proxy
+            tokens += len(t.split())  # VADER tokenizes on whitespace
+        return out, tokens
+
+
+def make_scorer(backend: str = "vader", **opts) -> Scorer:
+    if backend == "vader":
+        return VaderScorer()
+    if backend == "transformer":
+        from src.nlp.transformer import TransformerScorer
+
+        return TransformerScorer(**opts)
+    raise ValueError(f"unknown scoring backend {backend!r} (expected one of {BACKENDS})")
+
+
+def init_worker(backend: str = "vader", opts: dict | None = None) -> Scorer:
+    """Build this process's scorer once (lexicon / model weights load here)."""
+    global _scorer
+    _scorer = make_scorer(backend, **(opts or {}))
+    return _scorer
+
+
+def score_batch(texts: list[str]) -> tuple[list[tuple[float, str, float]], int]:
+    if _scorer is None:
+        init_worker()
+    return _scorer.score(texts)
+
+
+def score_texts(texts: list[str]) -> list[tuple[float, str, float]]:
+    """Return (polarity, label, confidence) for each text, in order."""
+    return score_batch(texts)[0]
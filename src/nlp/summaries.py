@@ -0,0 +1,143 @@
+"""Compact per-product / per-window prompt context for ai_summaries, built from aggregates only.
+
+A window's context is its product_rollups counters, the previous window's for comparison and the
+product's top keyword terms: a few hundred bytes instead of a dump of raw reviews. The prompt
+hash covers the model and the full messages, so an unchanged window is never sent twice.
+
+product_keywords weights grow with every scripts.extract_keywords run, so a product's current
+top terms are only used for a window's first summary. After that the window keeps the terms
+stored in its context (see window_terms()), and keyword runs do not change old windows' hashes.
+"""
+import hashlib
+import json
+
+import pandas as pd
+from sqlalchemy import text
+
+PROMPT_VERSION = 1  # bump when the wording below changes to regenerate every summary
+TOP_TERMS = 8
+
+SYSTEM_PROMPT = (
+    "You are a retail analyst. In 2-3 sentences, summarize customer sentiment for one product "
+    "and period: overall tone, the main themes from the top terms, and any change versus the "
+    "previous period. Use only the numbers provided."
+)
+
+WINDOWS_SQL = """
+    SELECT * FROM (
+        SELECT p.product_id, p.title, p.category,
+               w.bucket AS time_window, w.bucket_start, w.review_count, w.scored_count,
+               ROUND(w.rating_sum::numeric / NULLIF(w.rating_count, 0), 2) AS avg_rating,
+               ROUND((w.polarity_sum / NULLIF(w.scored_count, 0))::numeric, 3) AS avg_polarity,
+               w.positive_count, w.neutral_count, w.negative_count,
+               LAG(w.review_count) OVER win AS prev_review_count,
+               LAG(ROUND((w.polarity_sum / NULLIF(w.scored_count, 0))::numeric, 3)) OVER win AS prev_avg_polarity
+        FROM product_rollups w
+        JOIN products p ON p.product_id = w.product_id
+        WHERE w.granularity = :g
+          {products}
+        WINDOW win AS (PARTITION BY w.product_id ORDER BY w.bucket_start)
+    ) t
+    WHERE scored_count > 0
+      {since}
+"""
+
+
+def load_windows(conn, granularity: str = "month", since=None, product_ids=None) -> pd.DataFrame:
+    """One row per (product, window) with at least one scored review, plus the previous window."""
+    params = {"g": granularity}
+    products = since_sql = ""
+    if product_ids:
+        products = "AND w.product_id = ANY(:pids)"
+        params["pids"] = [int(p) for p in product_ids]
+    if since is not None:
+        since_sql = "AND bucket_start >= :since"  # filtered after LAG so the first window keeps its predecessor
+        params["since"] = since
+    sql = WINDOWS_SQL.format(products=products, since=since_sql) + " ORDER BY product_id, bucket_start"
+    df = pd.read_sql(text(sql), conn, params=params)
+    for col in ("avg_rating", "avg_polarity", "prev_avg_polarity"):
+        df[col] = pd.to_numeric(df[col])  # NUMERIC arrives as Decimal
+    return df
+
+
+def top_terms(conn, product_ids, k: int = TOP_TERMS) -> dict[int, list[str]]:
+    """Highest-weighted keyword terms per product; empty until scripts.extract_keywords has run."""
+    if not conn.execute(text("SELECT to_regclass('product_keywords') IS NOT NULL")).scalar():
+        return {}
+    rows = conn.execute(
+        text(
+            """
+            SELECT product_id, term
+            FROM (
+                SELECT product_id, term,
+                       ROW_NUMBER() OVER (PARTITION BY product_id ORDER BY weight DESC, term) AS rn
+                FROM product_keywords
+                WHERE product_id = ANY(:pids)
+            ) t
+            WHERE rn <= :k
+            ORDER BY product_id, rn
+            """
+        ),
+        {"pids": [int(p) for p in product_ids], "k": k},
+    )
+    out: dict[int, list[str]] = {}
+    for pid, term in rows:
+        out.setdefault(pid, []).append(term)
+    return out
+
+
+def _num(v):
+    return None if pd.isna(v) else float(v)
+
+
+def build_context(row, terms: list[str]) -> dict:
+    return {
+        "product": row["title"],
+        "category": row["category"],
+        "window": row["time_window"],
+        "reviews": int(row["review_count"]),
+        "avg_rating": _num(row["avg_rating"]),
+        "avg_polarity": _num(row["avg_polarity"]),
+        "labels": {"positive": int(row["positive_count"]), "neutral": int(row["neutral_count"]),
+                   "negative": int(row["negative_count"])},
+        "previous": None if pd.isna(row["prev_review_count"]) else {
+            "reviews": int(row["prev_review_count"]),
+            "avg_polarity": _num(row["prev_avg_polarity"]),
+        },
+        "top_terms": terms,
+    }
+
+
+def build_messages(context: dict) -> list[dict]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": json.dumps(context, sort_keys=True, separators=(",", ":"))},
+    ]
+
+
+def prompt_hash(model: str, messages: list[dict]) -> str:
+    raw = json.dumps({"v": PROMPT_VERSION, "model": model, "messages": messages}, sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def existing_summaries(conn, model: str, product_ids) -> dict[tuple[int, str], dict]:
+    """Stored prompt hash and top terms per (product_id, time_window)."""
+    rows = conn.execute(
+        text(
+            """
+            SELECT product_id, time_window, prompt_hash, context_stats_json -> 'top_terms' AS terms
+            FROM ai_summaries
+            WHERE model = :m AND product_id = ANY(:pids)
+            """
+        ),
+        {"m": model, "pids": [int(p) for p in product_ids]},
+    )
+    return {(pid, window): {"prompt_hash": h, "top_terms": terms or []} for pid, window, h, terms in rows}
+
+
+def window_terms(stored: dict | None, current: list[str]) -> list[str]:
+    """Terms frozen with the window's summary; the product's current terms for a new window, or for
+    one summarized before any keywords existed."""
+    if stored and stored["top_terms"]:
+        return stored["top_terms"]
+    return current
@@ -0,0 +1,81 @@
+"""CPU transformer sentiment backend (e.g. distilbert-base-uncased-finetuned-sst-2-english).
+
+Weights are read from a local directory only (`local_files_only`), so scoring runs offline.
+Download once with:
+
+    huggingface-cli download distilbert-base-uncased-finetuned-sst-2-english \\
+        --local-dir models/distilbert-base-uncased-finetuned-sst-2-english
+"""
+import os
+
+import numpy as np
+
+from src.nlp.scoring import Scorer, label_for
+
+MAX_LENGTH = 256  # tokens kept per review
+TOKEN_BUDGET = 8192  # padded tokens per forward pass: many short reviews or a few long ones
+
+
+class TransformerScorer(Scorer):
+    """Sequence-classification model scored in length-bucketed, token-budgeted batches.
+
+    polarity = P(positive) - P(negative), so it shares VADER's [-1, 1] range and label
+    thresholds; confidence is the top class probability.
+    """
+
+    def __init__(self, path: str, model: str | None = None, threads: int = 1, quantize: bool = False,
+                 max_length: int = MAX_LENGTH, token_budget: int = TOKEN_BUDGET):
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        torch.set_num_threads(threads)
+        self._torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(path, local_files_only=True)
+        net = AutoModelForSequenceClassification.from_pretrained(path, local_files_only=True).eval()
+
+        labels = {int(i): name.lower() for i, name in net.config.id2label.items()}
+        self._pos = [i for i, name in labels.items() if name.startswith("pos")]
+        self._neg = [i for i, name in labels.items() if name.startswith("neg")]
+        if not self._pos or not self._neg:
+            raise ValueError(f"{path}: cannot map labels {net.config.id2label} to positive/negative")
+
+        if quantize:
+            # int8 weights for Linear layers; activations stay float (no calibration needed)
+            net = torch.ao.quantization.quantize_dynamic(net, {torch.nn.Linear}, dtype=torch.qint8)
+        self.net = net
+        self.n_labels = len(labels)
+        self.model = model or os.path.basename(os.path.normpath(path))
+        self.max_length = max_length
+        self.token_budget = token_budget
+
+    def _batches(self, lengths: np.ndarray):
+        """Group indices by length so padding stays small; each batch fits the token budget."""
+        batch = []
+        for i in np.argsort(lengths, kind="stable"):
+            # ascending order: the new item is the longest, so it sets the padded width
+            if batch and (len(batch) + 1) * lengths[i] > self.token_budget:
+                yield batch
+                batch = []
+            batch.append(i)
+        if batch:
+            yield batch
+
+    def score(self, texts):
+        if not texts:
+            return [], 0
+        torch = self._torch
+        enc = self.tokenizer([t if isinstance(t, str) else "" for t in texts],
+                             truncation=True, max_length=self.max_length)
+        lengths = np.fromiter((len(ids) for ids in enc["input_ids"]), dtype=np.int64, count=len(texts))
+
+        probs = np.empty((len(texts), self.n_labels), dtype=np.float32)
+        with torch.inference_mode():
+            for batch in self._batches(lengths):
+                features = self.tokenizer.pad({k: [v[i] for i in batch] for k, v in enc.items()},
+                                              return_tensors="pt")
+                probs[batch] = torch.softmax(self.net(**features).logits, dim=-1).numpy()
+
+        polarity = probs[:, self._pos].sum(axis=1) - probs[:, self._neg].sum(axis=1)
+        confidence = probs.max(axis=1)
+        scores = [(float(p), label_for(p), float(c)) for p, c in zip(polarity, confidence)]
+        return scores, int(lengths.sum())
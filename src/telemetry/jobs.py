@@ -0,0 +1,52 @@
+"""Structured stage timings for the batch scripts.
+
+Each batch and each finished job is one JSON line on stderr, so progress prints on stdout stay
+readable and the timings can be collected with any log shipper:
+
+    {"ts": "...", "event": "batch", "job": "score", "rows": 1000, "claim_s": 0.012, "score_s": 0.41, "write_s": 0.05}
+"""
+import json
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+def log_json(event: str, **fields) -> None:
+    record = {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), "event": event, **fields}
+    print(json.dumps(record, default=str), file=sys.stderr, flush=True)
+
+
+class StageTimer:
+    """Accumulates wall time and rows per stage (fetch / score / write ...) for one job run."""
+
+    def __init__(self, job: str):
+        self.job = job
+        self.started = time.perf_counter()
+        self.seconds: dict[str, float] = {}
+        self.rows: dict[str, int] = {}
+
+    def add(self, stage: str, seconds: float, rows: int = 0) -> None:
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+        self.rows[stage] = self.rows.get(stage, 0) + rows
+
+    @contextmanager
+    def stage(self, stage: str, rows: int = 0):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started, rows)
+
+    def batch(self, rows: int, stages: dict[str, float], **fields) -> None:
+        """Log one batch: `stages` maps stage name -> seconds spent on this batch."""
+        log_json("batch", job=self.job, rows=rows, **{f"{k}_s": round(v, 4) for k, v in stages.items()}, **fields)
+
+    def done(self, **fields) -> None:
+        elapsed = time.perf_counter() - self.started
+        stages = {
+            name: {"seconds": round(sec, 4), "rows": self.rows[name],
+                   "rows_per_sec": round(self.rows[name] / sec, 1) if sec and self.rows[name] else None}
+            for name, sec in self.seconds.items()
+        }
+        log_json("job_done", job=self.job, seconds=round(elapsed, 3), stages=stages, **fields)
@@ -0,0 +1,68 @@
+"""SQLAlchemy instrumentation: per-statement timings, row counts, errors and pool checkouts."""
+import time
+from contextlib import asynccontextmanager
+
+from sqlalchemy import event
+
+from src.telemetry.registry import Counter, Gauge, Histogram
+
+QUERY_SECONDS = Histogram("db_query_duration_seconds", "SQL statement execution time.", ("op",))
+QUERY_ROWS = Counter("db_query_affected_rows_total", "Rows written by INSERT/UPDATE/DELETE/COPY statements.", ("op",))
+QUERY_ERRORS = Counter("db_query_errors_total", "Statements that raised a database error.", ("op",))
+POOL_WAIT = Histogram("db_pool_wait_seconds", "Time to check out a pooled connection (includes connect + pre-ping).")
+POOL_CONNECTS = Counter("db_pool_connections_opened_total", "New DBAPI connections opened by the pool.")
+POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently checked out of the pool.")
+POOL_SIZE = Gauge("db_pool_size", "Connections held by the pool (idle + checked out).")
+
+_OPS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "COPY", "CREATE", "ALTER", "LOCK", "SET"}
+# rowcount is only meaningful for these: asyncpg reports -1 for SELECT, psycopg2 the rows buffered
+_DML = {"INSERT", "UPDATE", "DELETE", "COPY"}
+
+
+def _op(statement: str) -> str:
+    word = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return word if word in _OPS else "OTHER"
+
+
+def instrument_engine(engine) -> None:
+    """Attach timing hooks to a sync Engine (for an AsyncEngine pass `engine.sync_engine`)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        op = _op(statement)
+        QUERY_SECONDS.observe(elapsed, op=op)
+        if op in _DML and cursor.rowcount and cursor.rowcount > 0:
+            QUERY_ROWS.inc(cursor.rowcount, op=op)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(ctx):
+        started = ctx.connection.info.get("query_started") if ctx.connection is not None else None
+        if started:
+            started.pop()
+        QUERY_ERRORS.inc(op=_op(ctx.statement or ""))
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_conn, record):
+        POOL_CONNECTS.inc()
+
+
+def record_pool_state(engine) -> None:
+    """Refresh the pool gauges (called at scrape time)."""
+    pool = engine.pool
+    if hasattr(pool, "checkedout"):
+        POOL_CHECKED_OUT.set(pool.checkedout())
+        POOL_SIZE.set(pool.checkedout() + pool.checkedin())
+
+
+@asynccontextmanager
+async def timed_connect(engine):
+    """`async with timed_connect(engine) as conn`: an AsyncEngine checkout that records its wait."""
+    started = time.perf_counter()
+    async with engine.connect() as conn:
+        POOL_WAIT.observe(time.perf_counter() - started)
+        yield conn
@@ -0,0 +1,53 @@
+"""Shared fixtures. Database tests need a throwaway Postgres database in TEST_DATABASE_URL.
+
+Each module that uses `engine` gets the database wiped (its public schema is dropped), rebuilt
+from ai_sentiment_schema.sql and seeded with 10 products. Those tests are skipped when
+TEST_DATABASE_URL is not set:
+
+    TEST_DATABASE_URL=postgresql+psycopg2://postgres@localhost/ga_test python -m pytest
+"""
+import os
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+SCHEMA = Path(__file__).resolve().parents[1] / "ai_sentiment_schema.sql"
+
+
+@pytest.fixture(scope="module")
+def engine():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    from src.config.settings import get_settings
+    from src.db.engine import get_engine
+
+    saved = os.environ.get("DATABASE_URL")
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL  # the scripts and the API build their engine from settings
+    get_settings.cache_clear()
+    get_engine.cache_clear()
+    engine = get_engine()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP SCHEMA public CASCADE; CREATE SCHEMA public;")
+        conn.exec_driver_sql(SCHEMA.read_text())
+        conn.execute(text("INSERT INTO products (title) SELECT 'Product ' || g FROM generate_series(1, 10) g"))
+    yield engine
+    engine.dispose()
+    if saved is None:
+        os.environ.pop("DATABASE_URL", None)
+    else:
+        os.environ["DATABASE_URL"] = saved
+    get_settings.cache_clear()
+    get_engine.cache_clear()
+
+
+@pytest.fixture(scope="module")
+def api(engine):
+    """TestClient over a fresh app (own engine, response cache and lifespan) on the test database."""
+    from fastapi.testclient import TestClient
+
+    from src.app.main import create_app
+
+    with TestClient(create_app()) as client:
+        yield client
@@ -0,0 +1,131 @@
+"""API behaviour against a real Postgres through TestClient (src/app/main.py).
+
+Uses the throwaway TEST_DATABASE_URL database (see conftest.py); skipped when it is not set.
+"""
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from src.app.pagination import NEXT_CURSOR_HEADER, encode_cursor
+
+REVIEWS = [  # product 1: dated rows (one tie on date) and undated ones, in insertion order
+    ("Battery died after a week", 1, date(2025, 3, 2)),
+    ("Great battery, great screen", 5, None),
+    ("Screen scratches easily", 2, date(2025, 1, 5)),
+    ("Battery battery battery, lasts forever", 5, date(2025, 3, 2)),
+    ("Arrived late", 3, None),
+    ("Charger stopped working", 1, date(2025, 2, 14)),
+    ("Fine for the price", 4, None),
+]
+
+
+@pytest.fixture(scope="module")
+def reviews(engine) -> pd.DataFrame:
+    from src.db.bulk import copy_rows
+    from src.db.reviews import ensure_review_schema
+
+    df = pd.DataFrame(REVIEWS, columns=["review_text", "rating", "review_date"]).assign(product_id=1)
+    with engine.begin() as conn:
+        ensure_review_schema(conn)
+        copy_rows(conn, "reviews", df)
+    return df.assign(review_id=range(1, len(df) + 1))
+
+
+def walk(api, path: str, **params) -> tuple[list[dict], int]:
+    """Follow X-Next-Cursor to the end; returns (rows, pages)."""
+    rows, pages, cursor = [], 0, None
+    while True:
+        r = api.get(path, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200, r.text
+        rows += r.json()
+        pages += 1
+        cursor = r.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return rows, pages
+
+
+def test_review_pages_sort_undated_last(api, reviews):
+    rows, pages = walk(api, "/products/1/reviews", limit=2)
+    assert pages == 4
+    dated = reviews[reviews["review_date"].notna()].sort_values(["review_date", "review_id"])
+    undated = reviews[reviews["review_date"].isna()].sort_values("review_id")
+    assert [r["review_id"] for r in rows] == [*dated["review_id"], *undated["review_id"]]
+    assert [r["review_date"] for r in rows[-3:]] == [None] * 3
+
+
+def test_review_cursor_from_undated_row(api, reviews):
+    """A cursor whose date is null (NULLS LAST) continues among the undated rows only."""
+    first_undated = int(reviews.loc[reviews["review_date"].isna(), "review_id"].min())
+    r = api.get("/products/1/reviews", params={"cursor": encode_cursor(None, first_undated)})
+    assert r.status_code == 200
+    assert [row["review_id"] for row in r.json()] == [5, 7]
+
+
+@pytest.mark.parametrize(
+    "path, cursor",
+    [
+        ("/products/1/reviews", "not-a-cursor"),
+        ("/products/1/reviews", encode_cursor(17)),
+        ("/products/1/reviews", encode_cursor("2025-02-30", 1)),
+        ("/products/1/reviews", encode_cursor(None, "1")),
+        ("/products", encode_cursor(2**31)),
+        ("/metrics", encode_cursor("1")),
+    ],
+)
+def test_bad_cursor_is_400(api, reviews, path, cursor):
+    r = api.get(path, params={"cursor": cursor})
+    assert r.status_code == 400
+    assert r.json() == {"detail": "invalid cursor"}
+
+
+# ---- /search ----
+@pytest.fixture(scope="module")
+def battery_reviews(engine, reviews) -> int:
+    """Product 2: 30 reviews mentioning "battery" once to three times, so ranks repeat."""
+    from src.db.bulk import copy_rows
+
+    texts = [" ".join(["battery"] * (1 + i % 3) + [f"note {i}"]) for i in range(30)]
+    with engine.begin() as conn:
+        copy_rows(conn, "reviews", pd.DataFrame({"product_id": 2, "review_text": texts, "rating": 1 + (
+            pd.Series(range(30)) % 5), "review_date": date(2025, 4, 1)}))
+    return len(texts)
+
+
+@pytest.mark.parametrize(
+    "params",
+    [{}, {"q": ""}, {"q": "battery", "min_rating": 0}, {"q": "battery", "max_rating": 6},
+     {"q": "battery", "min_rating": "high"}, {"q": "battery", "label": "angry"}, {"q": "battery", "limit": 0}],
+)
+def test_search_rejects_bad_parameters(api, params):
+    assert api.get("/search", params=params).status_code == 422
+
+
+@pytest.mark.parametrize(
+    "sort, cursor",
+    [
+        ("rank", "%%%"),
+        ("rank", encode_cursor(0.5)),  # rank keys are (rank, review_id)
+        ("rank", encode_cursor("0.5", 3)),
+        ("rank", encode_cursor(0.5, 2**63)),
+        ("recent", encode_cursor(0.5, 3)),
+        ("recent", encode_cursor("3")),
+    ],
+)
+def test_search_bad_cursor_is_400(api, battery_reviews, sort, cursor):
+    r = api.get("/search", params={"q": "battery", "sort": sort, "cursor": cursor})
+    assert r.status_code == 400
+    assert r.json() == {"detail": "invalid cursor"}
+
+
+@pytest.mark.parametrize("sort", ["rank", "recent"])
+def test_search_cursor_pages_are_continuous(api, battery_reviews, sort):
+    params = {"q": "battery", "product_id": 2, "sort": sort}
+    one_page = api.get("/search", params={**params, "limit": 200}).json()
+    assert len(one_page) == battery_reviews
+    ranks = [r["rank"] for r in one_page]
+    assert sort == "recent" or (ranks == sorted(ranks, reverse=True) and len(set(ranks)) < len(ranks))
+    rows, pages = walk(api, "/search", **params, limit=4)
+    assert pages == 8
+    assert [r["review_id"] for r in rows] == [r["review_id"] for r in one_page]  # no row repeated or skipped
+    assert all("<mark>battery</mark>" in r["snippet"] for r in rows)
@@ -0,0 +1,44 @@
+"""Cold-start budgets for the API and the loaders, each measured in fresh processes.
+
+Same probe and budgets as `python -m scripts.test_cold_start`; needs no database.
+"""
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from scripts.test_cold_start import probe
+
+IMPORT_BUDGET_S = 1.5
+REQUEST_BUDGET_S = 0.25  # app startup + first GET /
+RUNS = 3
+REPO = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture(scope="module")
+def probes() -> list[dict]:
+    return [probe() for _ in range(RUNS)]
+
+
+def test_api_import_within_budget(probes):
+    assert statistics.median(p["import_s"] for p in probes) <= IMPORT_BUDGET_S
+
+
+def test_first_request_within_budget(probes):
+    assert [p["status"] for p in probes] == [200] * RUNS
+    assert statistics.median(p["first_request_s"] for p in probes) <= REQUEST_BUDGET_S
+
+
+def test_api_imports_no_heavy_modules(probes):
+    """None of scripts.test_cold_start.HEAVY_MODULES (pandas, numpy, sklearn, ...)."""
+    assert sorted({m for p in probes for m in p["heavy"]}) == []
+
+
+@pytest.mark.parametrize("module", ["scripts.ingest_reviews", "scripts.load_reviews_csv"])
+def test_loaders_do_not_import_keyword_stack(module):
+    """The keyword extractor (sklearn / scipy) is only imported when --reset needs it."""
+    code = f"import sys, {module}; print(' '.join(m for m in ('sklearn', 'scipy') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=REPO)
+    assert out.stdout.strip() == ""
@@ -0,0 +1,53 @@
+"""Drift scoring (src/db/drift.py) on synthetic streams fed through observe_frame; needs no database."""
+import numpy as np
+import pandas as pd
+
+from src.db.drift import SLOW_ALPHA, Z_ALERT, new_state, observe, observe_frame
+from src.db.queries import DRIFT_MIN_REVIEWS
+
+PRODUCTS = 50
+BATCH = 1_000  # reviews per scoring batch, spread over all products like the real queue
+
+
+def reviews(rng: np.random.Generator, n: int, mean: float = 0.23, sd: float = 0.26, first_id: int = 1,
+            product_ids=None) -> pd.DataFrame:
+    polarity = np.clip(rng.normal(mean, sd, n), -1, 1).round(4)
+    return pd.DataFrame(
+        {
+            "product_id": rng.integers(1, PRODUCTS + 1, n) if product_ids is None else product_ids,
+            "review_date": pd.Timestamp("2025-01-01").date(),
+            "review_id": np.arange(first_id, first_id + n),
+            "polarity": polarity,
+            "label": np.where(polarity >= 0.05, "positive", np.where(polarity <= -0.05, "negative", "neutral")),
+        }
+    )
+
+
+def test_stationary_stream_raises_no_alert():
+    rng = np.random.default_rng(7)
+    states: dict[int, dict] = {}
+    for start in range(1, 40_000, BATCH):
+        observe_frame(states, reviews(rng, BATCH, first_id=start))
+        warm = [s for s in states.values() if s["reviews_seen"] >= DRIFT_MIN_REVIEWS]
+        assert max((s["drift_score"] for s in warm), default=0.0) < Z_ALERT
+    assert min(s["reviews_seen"] for s in states.values()) > 1 / SLOW_ALPHA  # past the cumulative phase
+
+
+def test_baseline_is_unbiased_during_warm_up():
+    rng = np.random.default_rng(1)
+    state = new_state()
+    observe(state, 1.0, False)  # an outlying first review must not anchor the baseline
+    for x in rng.normal(0.2, 0.25, DRIFT_MIN_REVIEWS - 1):
+        observe(state, x, False)
+    assert abs(state["slow_polarity"] - 0.2) < 0.05
+    assert abs(state["slow_polarity_var"] ** 0.5 - 0.25) < 0.03
+
+
+def test_negative_shift_raises_alert():
+    rng = np.random.default_rng(3)
+    states: dict[int, dict] = {}
+    observe_frame(states, reviews(rng, 600, product_ids=1))
+    assert states[1]["drift_score"] < Z_ALERT
+    observe_frame(states, reviews(rng, 40, mean=-0.05, first_id=601, product_ids=1))
+    assert states[1]["drift_score"] >= Z_ALERT
+    assert states[1]["polarity_z"] <= -Z_ALERT and states[1]["negative_z"] >= Z_ALERT
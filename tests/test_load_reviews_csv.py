@@ -0,0 +1,81 @@
+"""Record-boundary chunking and row preparation of the CSV loader (scripts/load_reviews_csv.py);
+needs no database."""
+import io
+import mmap
+
+import pandas as pd
+import pytest
+
+from scripts.load_reviews_csv import iter_chunks, prepare, read_header
+
+TRICKY = pd.DataFrame(
+    {
+        "product_title": ["Phone", 'Cable, 2m "braided"', "Phone", "Lamp", "Phone", "Lamp"],
+        "review_text": [
+            "plain",
+            'says "great", then\nbreaks',
+            '""',
+            "line one\nline two\n\nline four",
+            'ends with a quote"',
+            "",
+        ],
+        "user_hash": ["u_1", "u_2", None, "u_4", "u_5", "u_6"],
+        "rating": ["5", "1", "3", "", "4", "2"],
+        "review_date": ["2025-01-02", "2025-01-03", "", "2025-02-01", "not a date", "2025-03-01"],
+    }
+)
+
+
+def write_csv(tmp_path, df: pd.DataFrame, line_end: str = "\n", trailing: bool = True):
+    path = tmp_path / "reviews.csv"
+    text = df.to_csv(index=False, lineterminator=line_end)
+    path.write_bytes((text if trailing else text.rstrip("\r\n")).encode())
+    return path
+
+
+def read_in_pieces(path, chunk_bytes: int) -> tuple[pd.DataFrame, list[int]]:
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        names, start = read_header(mm)
+        pieces, ends = [], []
+        for raw, end in iter_chunks(mm, start, chunk_bytes):
+            pieces.append(pd.read_csv(io.BytesIO(raw), header=None, names=names, dtype=str))
+            ends.append(end)
+    return pd.concat(pieces, ignore_index=True), ends
+
+
+@pytest.mark.parametrize("chunk_bytes", [1, 2, 3, 7, 16, 64, 1 << 20])
+@pytest.mark.parametrize("line_end, trailing", [("\n", True), ("\r\n", True), ("\n", False)])
+def test_pieces_parse_like_the_whole_file(tmp_path, chunk_bytes, line_end, trailing):
+    path = write_csv(tmp_path, pd.concat([TRICKY] * 3, ignore_index=True), line_end, trailing)
+    whole = pd.read_csv(path, dtype=str)
+    chunked, ends = read_in_pieces(path, chunk_bytes)
+    pd.testing.assert_frame_equal(chunked, whole)
+    assert ends == sorted(set(ends)) and ends[-1] == path.stat().st_size
+
+
+def test_every_piece_ends_on_a_record(tmp_path):
+    path = write_csv(tmp_path, TRICKY)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        _, start = read_header(mm)
+        sizes = [len(pd.read_csv(io.BytesIO(raw), header=None, dtype=str)) for raw, _ in iter_chunks(mm, start, 1)]
+    assert sizes == [1] * len(TRICKY)  # a 1-byte piece grows to exactly one whole record
+
+
+def test_prepare_maps_titles_and_normalizes(tmp_path):
+    path = write_csv(tmp_path, TRICKY)
+    raw = path.read_bytes()
+    names = TRICKY.columns.tolist()
+    rows, read, unmatched = prepare(raw[raw.index(b"\n") + 1:], names, {"Phone": 1, "Lamp": 3})
+    assert (read, unmatched) == (6, 1)  # the cable has no product
+    assert rows["product_id"].tolist() == [1, 1, 3, 1]  # the empty review_text row is dropped
+    assert rows["rating"].fillna(0).tolist() == [5, 3, 0, 4]
+    assert rows["review_date"].isna().tolist() == [False, True, False, True]
+    assert rows["dedupe_key"].is_unique
+
+
+def test_prepare_without_optional_columns():
+    raw = b'Phone,"fine ""really"""\nLamp,ok\n'
+    rows, read, unmatched = prepare(raw, ["product_title", "review_text"], {"Phone": 1, "Lamp": 3})
+    assert (read, unmatched) == (2, 0)
+    assert rows["review_text"].tolist() == ['fine "really"', "ok"]
+    assert rows["rating"].isna().all() and rows["review_date"].isna().all()
@@ -0,0 +1,77 @@
+"""Cursor encoding and validation (src/app/pagination.py); needs no database."""
+import base64
+import json
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from src.app.pagination import (
+    bigint_key,
+    date_key,
+    decode_cursor,
+    encode_cursor,
+    float_key,
+    int_key,
+    optional,
+)
+
+
+def raw_cursor(payload: str) -> str:
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def assert_invalid(cursor: str, *types) -> None:
+    with pytest.raises(HTTPException) as err:
+        decode_cursor(cursor, *types)
+    assert err.value.status_code == 400
+    assert err.value.detail == "invalid cursor"
+
+
+def test_round_trip():
+    assert decode_cursor(encode_cursor(42), int_key) == [42]
+    assert decode_cursor(encode_cursor(date(2025, 3, 1), 2**40), optional(date_key), bigint_key) == [
+        date(2025, 3, 1), 2**40]
+    assert decode_cursor(encode_cursor(0.0625, 7), float_key, bigint_key) == [0.0625, 7]
+
+
+def test_nulls_last_key_round_trips():
+    """Reviews sort by (review_date NULLS LAST, review_id): the cursor of an undated row carries null."""
+    cursor = encode_cursor(None, 17)
+    assert decode_cursor(cursor, optional(date_key), bigint_key) == [None, 17]
+    assert_invalid(cursor, date_key, bigint_key)  # null only where the key allows it
+
+
+@pytest.mark.parametrize("cursor", ["!!!", "a", "abc$", raw_cursor("not json"), raw_cursor("")])
+def test_malformed_token(cursor):
+    assert_invalid(cursor, int_key)
+
+
+@pytest.mark.parametrize("payload", ["5", '{"id": 5}', "[]", "[1, 2]", '"[1]"'])
+def test_wrong_shape(payload):
+    assert_invalid(raw_cursor(payload), int_key)
+
+
+@pytest.mark.parametrize(
+    "key, types",
+    [
+        (["5"], (int_key,)),
+        ([5.0], (int_key,)),
+        ([True], (int_key,)),
+        ([2**31], (int_key,)),  # past INT: would be a DataError in the query
+        ([2**63], (bigint_key,)),
+        ([None], (bigint_key,)),
+        (["0.5", 1], (float_key, bigint_key)),
+        ([False, 1], (float_key, bigint_key)),
+        ([2025, 1], (optional(date_key), bigint_key)),
+        (["2025-13-01", 1], (optional(date_key), bigint_key)),
+        (["yesterday", 1], (optional(date_key), bigint_key)),
+    ],
+)
+def test_wrong_element_types(key, types):
+    assert_invalid(raw_cursor(json.dumps(key)), *types)
+
+
+@pytest.mark.parametrize("payload", ["[NaN, 1]", "[Infinity, 1]", "[1e999, 1]"])
+def test_non_finite_rank(payload):
+    assert_invalid(raw_cursor(payload), float_key, bigint_key)
@@ -0,0 +1,124 @@
+"""Partition migration, retention and reset against a real Postgres (src/db/partitions.py).
+
+Uses the throwaway TEST_DATABASE_URL database (see conftest.py); skipped when it is not set.
+"""
+from datetime import date
+
+import pandas as pd
+from sqlalchemy import text
+
+START, END = date(2025, 1, 1), date(2025, 4, 30)
+
+
+def seed(engine, total: int, start: date, end: date, undated: int = 0) -> None:
+    from scripts import sentiment_vader
+    from scripts.ingest_reviews import generate_batches, pick_products, write_stream
+    from src.db.bulk import copy_rows
+    from src.db.metrics import apply_review_deltas, ensure_aggregates
+    from src.db.queries import METRICS_MODEL
+    from src.db.queue import ensure_scoring_queue
+    from src.db.reviews import ensure_review_schema
+
+    with engine.begin() as conn:
+        ensure_review_schema(conn)
+        ensure_aggregates(conn)
+        ensure_scoring_queue(conn, METRICS_MODEL)
+        pids = pick_products(conn, None)
+    write_stream(generate_batches(pids, total, 500, 1.0, start, end, seed=7), engine)
+    if undated:
+        rows = pd.DataFrame({"product_id": [1 + i % 10 for i in range(undated)], "review_text": "undated and fine",
+                             "rating": 4, "review_date": None})
+        with engine.begin() as conn:
+            copy_rows(conn, "reviews", rows)
+            apply_review_deltas(conn, rows)
+    sentiment_vader.main(workers=1)
+
+
+def counts(conn) -> dict:
+    return {t: conn.execute(text(f"SELECT COUNT(*) FROM {t}")).scalar() for t in ("reviews", "sentiment_results")}
+
+
+def aggregates(conn) -> tuple[list, list]:
+    """product_stats and product_rollups counters; float sums are rounded (summation order differs)."""
+    counters = "review_count, scored_count, rating_sum, negative_count, ROUND(polarity_sum::numeric, 6)"
+    return (
+        conn.execute(text(f"SELECT product_id, {counters} FROM product_stats ORDER BY 1")).all(),
+        conn.execute(text(f"SELECT product_id, granularity, bucket, {counters} FROM product_rollups "
+                          "ORDER BY 1, 2, 3")).all(),
+    )
+
+
+def assert_aggregates_match_rows(conn) -> None:
+    from src.db.metrics import rebuild_aggregates
+
+    before = aggregates(conn)
+    rebuild_aggregates(conn)
+    assert aggregates(conn) == before
+
+
+def test_migrate_retention_and_reset(engine):
+    from scripts.ingest_reviews import reset_data
+    from src.db.bulk import copy_rows
+    from src.db.metrics import apply_review_deltas
+    from src.db.partitions import (
+        drop_months_before,
+        ensure_month_partitions,
+        is_partitioned,
+        list_months,
+        migrate_to_partitions,
+        partition_name,
+    )
+
+    seed(engine, 4_000, START, END, undated=5)
+    with engine.begin() as conn:
+        unpartitioned = counts(conn)
+        # --- migration: rows, keys and the queue trigger survive ---
+        migrated = migrate_to_partitions(conn, months_ahead=1)
+        assert is_partitioned(conn) and is_partitioned(conn, "sentiment_results")
+        assert migrated["reviews"] == unpartitioned["reviews"]
+        assert migrated["sentiment_results"] == unpartitioned["sentiment_results"]
+        assert counts(conn) == unpartitioned
+        assert migrate_to_partitions(conn) is None
+        assert conn.execute(text("SELECT COUNT(*) FROM reviews_default")).scalar() == 5
+        assert conn.execute(text("SELECT to_regclass('reviews_unpartitioned')")).scalar() is None
+        assert [m for m in list_months(conn) if m <= END] == [date(2025, m, 1) for m in range(1, 5)]
+
+    # new rows after the migration are routed, queued by trigger and scored
+    seed(engine, 500, date(2025, 4, 1), date(2025, 5, 31))
+    with engine.begin() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM scoring_queue")).scalar() == 0
+        assert counts(conn)["reviews"] == counts(conn)["sentiment_results"] == unpartitioned["reviews"] + 500
+        assert_aggregates_match_rows(conn)
+
+    # --- a month that landed in the default partition is split out ---
+    with engine.begin() as conn:
+        late = pd.DataFrame({"product_id": [1], "review_text": ["late arrival"], "rating": [2],
+                             "review_date": [date(2024, 6, 15)]})
+        copy_rows(conn, "reviews", late)  # no partition for June 2024 yet: lands in reviews_default
+        apply_review_deltas(conn, late)
+        assert ensure_month_partitions(conn, [date(2024, 6, 1)]) == [date(2024, 6, 1)]
+        where = conn.execute(text("SELECT tableoid::regclass::text FROM reviews WHERE review_date = '2024-06-15'"))
+        assert where.scalar() == "reviews_2024_06"
+
+    # --- retention: drop, then detach, keeping the aggregates consistent ---
+    with engine.begin() as conn:
+        total = counts(conn)["reviews"]
+        feb = conn.execute(text("SELECT COUNT(*) FROM reviews WHERE review_date < '2025-02-01'")).scalar()
+        assert drop_months_before(conn, date(2025, 2, 1)) == [date(2024, 6, 1), date(2025, 1, 1)]
+        assert counts(conn)["reviews"] == total - feb
+        assert conn.execute(text("SELECT to_regclass('reviews_2025_01')")).scalar() is None
+        assert_aggregates_match_rows(conn)
+
+        assert drop_months_before(conn, date(2025, 3, 1), detach=True) == [date(2025, 2, 1)]
+        for table in ("reviews", "sentiment_results"):
+            archived = partition_name(table, date(2025, 2, 1))
+            assert conn.execute(text(f"SELECT COUNT(*) FROM {archived}")).scalar() > 0
+        assert conn.execute(text("SELECT COUNT(*) FROM reviews WHERE review_date < '2025-03-01'")).scalar() == 0
+        assert_aggregates_match_rows(conn)
+
+    # --- reset (ingest_reviews --reset) ---
+    with engine.begin() as conn:
+        reset_data(conn, True)
+        assert counts(conn) == {"reviews": 0, "sentiment_results": 0}
+        assert list_months(conn) == []
+        assert conn.execute(text("SELECT COUNT(*) FROM product_stats")).scalar() == 0
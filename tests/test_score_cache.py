@@ -0,0 +1,67 @@
+"""Hit/miss accounting and in-flight sharing of ScoreCache (src/nlp/score_cache.py) against the
+TEST_DATABASE_URL database (see conftest.py)."""
+import pytest
+
+from src.nlp.score_cache import ScoreCache, ensure_cache_table, text_hash
+
+A, B, C, D = (text_hash(t) for t in ["good", "bad", "meh", "fine"])
+SCORE = {A: (0.6, "positive", 0.6), B: (-0.5, "negative", 0.5), C: (0.0, "neutral", 0.0), D: (0.2, "neutral", 0.2)}
+
+
+@pytest.fixture
+def conn(engine):
+    with engine.connect() as conn:
+        ensure_cache_table(conn)
+        yield conn
+        conn.rollback()
+
+
+def counts(cache: ScoreCache) -> tuple[int, int, int, int]:
+    return cache.lru_hits, cache.db_hits, cache.shared, cache.misses
+
+
+def test_misses_count_unique_texts(conn):
+    cache = ScoreCache("test")
+    cached, todo, waiting = cache.plan(conn, [A, B, A, A, B, C])
+    assert (cached, todo, waiting) == ({}, [A, B, C], set())
+    assert counts(cache) == (0, 0, 3, 3)  # six reviews, three texts to score
+
+
+def test_hits_count_reviews_per_tier(conn):
+    writer = ScoreCache("test")
+    writer.plan(conn, [A, B])
+    writer.settle({A: SCORE[A], B: SCORE[B]})
+    writer.store(conn, {A: SCORE[A], B: SCORE[B]})
+    assert writer.plan(conn, [A, A, B])[0] == {A: SCORE[A], B: SCORE[B]}
+    assert counts(writer) == (3, 0, 0, 2)
+
+    fresh = ScoreCache("test")  # same table, empty LRU
+    cached, todo, _ = fresh.plan(conn, [A, A, C])
+    assert (cached, todo) == ({A: SCORE[A]}, [C])
+    assert counts(fresh) == (0, 2, 0, 1)
+    fresh.plan(conn, [A])
+    assert counts(fresh) == (1, 2, 0, 1)  # the DB hit was kept in the LRU
+
+    assert ScoreCache("other").plan(conn, [A])[1] == [A]  # entries are per model
+
+
+def test_in_flight_texts_are_scored_once(conn):
+    cache = ScoreCache("test")
+    _, first, _ = cache.plan(conn, [A, B])
+    _, second, waiting = cache.plan(conn, [B, C, A, C])
+    _, third, waiting3 = cache.plan(conn, [A, D])
+    assert (first, second, waiting) == ([A, B], [C], {A, B})
+    assert (third, waiting3) == ([D], {A})
+    assert counts(cache) == (0, 0, 4, 4)  # 4 texts scored for 8 reviews
+
+    assert not cache.ready(waiting)
+    cache.settle({C: SCORE[C]})  # the second batch comes back first
+    assert not cache.ready(waiting)
+    cache.settle({A: SCORE[A], B: SCORE[B]})
+    assert cache.ready(waiting) and cache.ready(waiting3)
+    assert cache.take(waiting) == {A: SCORE[A], B: SCORE[B]}
+    assert cache.take(waiting3) == {A: SCORE[A]}
+    cache.settle({D: SCORE[D]})
+    assert cache._inflight == {}  # every reservation released
+
+    assert cache.plan(conn, [A])[1] == [A]  # nothing in flight, nothing stored: scored again
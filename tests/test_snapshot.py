@@ -0,0 +1,66 @@
+"""Incremental Parquet export (src/db/snapshot.py): gap bookkeeping, and late commits below the
+watermark against the TEST_DATABASE_URL database (see conftest.py)."""
+from datetime import date
+
+import pandas as pd
+
+from src.db.snapshot import export_increment, fill_gaps, find_gaps, read_snapshot
+
+T = "2025-01-01T00:00:00+00:00"
+
+
+# --- find_gaps / fill_gaps ---
+def test_find_gaps_contiguous():
+    assert find_gaps(10, [11, 12, 13], T) == []
+    assert find_gaps(0, [], T) == []
+
+
+def test_find_gaps_reports_skipped_ranges():
+    assert find_gaps(10, [13, 14, 20], T) == [[11, 12, T], [15, 19, T]]
+    assert find_gaps(0, [5], T) == [[1, 4, T]]
+
+
+def test_fill_gaps_removes_and_splits():
+    gaps = [[11, 12, T], [15, 19, "later"]]
+    assert fill_gaps(gaps, [11, 12]) == [[15, 19, "later"]]
+    assert fill_gaps(gaps, [17, 15]) == [[11, 12, T], [16, 16, "later"], [18, 19, "later"]]
+    assert fill_gaps(gaps, [15, 16, 17, 18, 19, 11, 12]) == []
+
+
+def test_fill_gaps_ignores_ids_outside_gaps():
+    gaps = [[11, 12, T]]
+    assert fill_gaps(gaps, [5, 10, 13, 99]) == gaps
+    assert fill_gaps([], [1, 2]) == []
+
+
+# --- export against Postgres ---
+def results(ids: list[int], model: str) -> pd.DataFrame:
+    return pd.DataFrame({"sentiment_id": ids, "review_id": ids, "review_date": date(2025, 3, 1), "model": model,
+                         "polarity": 0.5, "label": "positive", "confidence": 0.5})
+
+
+def test_export_picks_up_late_commits_and_skips_other_models(engine, tmp_path):
+    from src.db.bulk import copy_rows
+    from src.db.reviews import ensure_review_schema
+
+    with engine.begin() as conn:
+        ensure_review_schema(conn)
+        copy_rows(conn, "reviews", pd.DataFrame({"product_id": 1, "review_text": [f"review {i}" for i in range(1, 11)],
+                                                 "rating": 4, "review_date": date(2025, 3, 1)}))
+        # one sequence, two models: 6-7 are another model's, 5 is still uncommitted
+        copy_rows(conn, "sentiment_results", results([1, 2, 3, 4, 8, 9, 10], "vader"))
+        copy_rows(conn, "sentiment_results", results([6, 7], "other"))
+
+    mark = export_increment(engine, "vader", root=tmp_path)
+    assert (mark["sentiment_id"], mark["rows"]) == (10, 7)
+    assert [g[:2] for g in mark["gaps"]] == [[5, 5]]
+
+    with engine.begin() as conn:
+        copy_rows(conn, "sentiment_results", results([5], "vader"))  # commits below the watermark
+    mark = export_increment(engine, "vader", root=tmp_path)
+    assert (mark["sentiment_id"], mark["rows"], mark["gaps"]) == (10, 8, [])
+    assert sorted(read_snapshot("vader", ["sentiment_id"], root=tmp_path)["sentiment_id"]) == [1, 2, 3, 4, 5, 8, 9, 10]
+
+    other = export_increment(engine, "other", root=tmp_path)
+    assert (other["rows"], other["gaps"]) == (2, [])  # 1-5 are vader's, so not gaps for "other" either
+